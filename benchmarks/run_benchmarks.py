@@ -0,0 +1,199 @@
+"""
+Benchmark suite for the simulation engines
+
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks --suite quick --save baseline.json
+    python -m benchmarks.run_benchmarks --suite quick --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.event_driven import EventDrivenSimulation
+from src.scenario import load_scenario
+from src.sharded import ShardedSimulation
+from src.simulation import Simulation
+from src.vectorized import VectorizedSimulation
+
+from .scenarios import FULL_SUITE, QUICK_SUITE, CarArguments, ScenarioSpec, build_simulation, generate_cars, scenario_text
+
+
+ENGINES: Dict[str, type] = {
+    'simulation': Simulation,
+    'vectorized': VectorizedSimulation,
+    'event_driven': EventDrivenSimulation,
+    'sharded': ShardedSimulation,
+}
+
+SUITES: Dict[str, List[ScenarioSpec]] = {'quick': QUICK_SUITE, 'full': FULL_SUITE}
+
+Result = Dict[str, object]
+
+
+def best_time(setup: Callable[[], object], measured: Callable[[object], None], repeat: int) -> Tuple[float, object]:
+    """Return the fastest of repeat runs of measured on a fresh setup() value, and the value of that run."""
+    best, best_value = float('inf'), None
+    for _ in range(repeat):
+        value = setup()
+        start = time.perf_counter()
+        measured(value)
+        elapsed = time.perf_counter() - start
+        if elapsed < best:
+            best, best_value = elapsed, value
+    return best, best_value
+
+
+def bench_add_cars(spec: ScenarioSpec, cars: List[CarArguments], repeat: int) -> Result:
+    """Time building a simulation with add_car."""
+    seconds, _ = best_time(lambda: None, lambda _: build_simulation(spec, cars), repeat)
+    return {'seconds': seconds, 'cars_per_second': len(cars) / seconds}
+
+
+def bench_add_cars_bulk(spec: ScenarioSpec, cars: List[CarArguments], repeat: int) -> Result:
+    """Time building a simulation with one add_cars call on columns of the cars."""
+    names, positions, orientations, programs = zip(*cars)
+    xs, ys = zip(*positions)
+
+    def build(_: object) -> None:
+        simulation = Simulation(field_size=spec.field_size)
+        simulation.add_cars(names, xs, ys, orientations, programs)
+
+    seconds, _ = best_time(lambda: None, build, repeat)
+    return {'seconds': seconds, 'cars_per_second': len(cars) / seconds}
+
+
+def bench_parse(spec: ScenarioSpec, cars: List[CarArguments], repeat: int) -> Result:
+    """Time loading the scenario from a text file, the way the CLI does."""
+    text = scenario_text(spec, cars)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'scenario.txt')
+        with open(path, 'w') as file:
+            file.write(text)
+        seconds, _ = best_time(lambda: None, lambda _: load_scenario(path), repeat)
+
+    return {'seconds': seconds, 'cars_per_second': len(cars) / seconds, 'megabytes_per_second': len(text) / seconds / 1e6}
+
+
+def bench_run(spec: ScenarioSpec, cars: List[CarArguments], engine: type, repeat: int) -> Result:
+    """Time run_simulation on a freshly built simulation."""
+    seconds, simulation = best_time(lambda: build_simulation(spec, cars, engine), lambda simulation: simulation.run_simulation(), repeat)
+    commands = sum(car.program_counter for car in simulation.cars.values())
+    collided = sum(1 for car in simulation.cars.values() if car.collision)
+
+    return {
+        'seconds': seconds, 'steps': simulation.step, 'commands': commands, 'collided': collided,
+        'steps_per_second': simulation.step / seconds, 'commands_per_second': commands / seconds,
+    }
+
+
+def run_suite(specs: List[ScenarioSpec], engines: List[str], repeat: int, seed: int,
+              report: Callable[[str, Result], None] = lambda key, result: None) -> Dict[str, Result]:
+    """Run every benchmark of the given scenarios and return the results keyed by scenario/benchmark."""
+    results: Dict[str, Result] = {}
+
+    def record(key: str, benchmark: Callable[[], Result]) -> None:
+        """Run a benchmark, keeping the error instead of the timings if it fails."""
+        try:
+            results[key] = benchmark()
+        except Exception as e:
+            results[key] = {'error': f"{type(e).__name__}: {e}"}
+        report(key, results[key])
+
+    for spec in specs:
+        cars = generate_cars(spec, seed)
+        record(f"{spec.name}/add_car", lambda: bench_add_cars(spec, cars, repeat))
+        record(f"{spec.name}/add_cars", lambda: bench_add_cars_bulk(spec, cars, repeat))
+        record(f"{spec.name}/parse", lambda: bench_parse(spec, cars, repeat))
+        for engine in engines:
+            record(f"{spec.name}/run/{engine}", lambda: bench_run(spec, cars, ENGINES[engine], repeat))
+
+    return results
+
+
+def compare(results: Dict[str, Result], baseline: Dict[str, Result], threshold: float) -> List[str]:
+    """Return a line for every benchmark that got slower than its baseline by more than threshold."""
+    regressions = []
+    for key, result in results.items():
+        old = baseline.get(key, {})
+        if 'seconds' in result and 'seconds' in old:
+            ratio = result['seconds'] / old['seconds']
+            if ratio > 1 + threshold:
+                regressions.append(f"{key}: {old['seconds']:.4f}s -> {result['seconds']:.4f}s ({ratio:.2f}x)")
+        elif 'error' in result and 'seconds' in old:
+            regressions.append(f"{key}: now fails with {result['error']}")
+    return regressions
+
+
+def metadata() -> Dict[str, str]:
+    """Return where the results were measured."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = 'unknown'
+
+    return {
+        'commit': commit, 'python': platform.python_version(), 'platform': platform.platform(),
+        'cpus': str(os.cpu_count()), 'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def format_result(key: str, result: Result) -> str:
+    """Return one line of the results table."""
+    if 'error' in result:
+        return f"{key:<45} {'failed':>10}  {result['error']}"
+
+    rates = ', '.join(f"{value:,.0f} {name.replace('_per_second', '/s')}" for name, value in result.items() if name.endswith('_per_second'))
+    return f"{key:<45} {result['seconds']:>9.4f}s  {rates}"
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark the simulation engines on synthetic scenarios")
+    parser.add_argument("--suite", choices=sorted(SUITES), default='quick', help="scenarios to run")
+    parser.add_argument("--only", nargs='+', metavar="NAME", help="run only the named scenarios of the suite")
+    parser.add_argument("--engines", nargs='+', choices=sorted(ENGINES), default=['simulation', 'vectorized', 'event_driven'],
+                        help="engines to time run_simulation with")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark, the fastest is kept")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated scenarios")
+    parser.add_argument("--save", metavar="FILE", help="save the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare the results with a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown over the baseline reported as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmarks and return the exit status, 1 if there were regressions."""
+    args = parse_args(argv)
+
+    specs = SUITES[args.suite]
+    if args.only:
+        specs = [spec for spec in specs if spec.name in args.only]
+
+    results = run_suite(specs, args.engines, args.repeat, args.seed, report=lambda key, result: print(format_result(key, result)))
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump({'meta': metadata(), 'seed': args.seed, 'results': results}, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline['results'], args.threshold)
+        print(f"\n{len(regressions)} regression(s) against {args.compare} ({baseline['meta'].get('commit', 'unknown')})")
+        for line in regressions:
+            print(f"- {line}")
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
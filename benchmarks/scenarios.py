@@ -0,0 +1,78 @@
+import math
+import random
+from typing import List, NamedTuple, Tuple
+
+from src.car import Car
+from src.simulation import Simulation
+
+
+CarArguments = Tuple[str, Tuple[int, int], str, str]
+
+
+class ScenarioSpec(NamedTuple):
+    """Shape of a synthetic scenario.
+
+    density is the share of cells holding a car in the square the cars start in, so higher densities mean more
+    collisions; mix gives the relative weights of F, L and R in the programs.
+    """
+
+    name: str
+    field_size: Tuple[int, int]
+    cars: int
+    program_length: int
+    density: float
+    mix: Tuple[int, int, int] = (4, 1, 1)
+
+
+def generate_cars(spec: ScenarioSpec, seed: int = 0) -> List[CarArguments]:
+    """Generate the cars of a scenario as (name, position, orientation, commands), the same for the same seed."""
+    rng = random.Random(seed)
+    width, height = spec.field_size
+
+    # Cars start in a square around the centre of the field that holds them at the requested density
+    side = min(max(math.ceil(math.sqrt(spec.cars / spec.density)), 1), width, height)
+    if side * side < spec.cars:
+        raise ValueError("Too many cars for the field.")
+
+    left, bottom = (width - side) // 2, (height - side) // 2
+    cells = rng.sample(range(side * side), spec.cars)
+
+    cars = []
+    for car_index, cell in enumerate(cells):
+        commands = ''.join(rng.choices('FLR', weights=spec.mix, k=spec.program_length))
+        position = (left + cell % side, bottom + cell // side)
+        cars.append((f"Car{car_index}", position, rng.choice('NESW'), commands))
+    return cars
+
+
+def build_simulation(spec: ScenarioSpec, cars: List[CarArguments], simulation_class: type = Simulation) -> Simulation:
+    """Return a simulation of the given class holding the generated cars."""
+    simulation = simulation_class(field_size=spec.field_size)
+    for name, position, orientation, instructions in cars:
+        simulation.add_car(Car(name=name, position=position, orientation=orientation, instructions=instructions))
+    return simulation
+
+
+def scenario_text(spec: ScenarioSpec, cars: List[CarArguments]) -> str:
+    """Return the generated scenario in the scenario file format."""
+    lines = [f"{spec.field_size[0]} {spec.field_size[1]}"]
+    lines += [f"{name} {x} {y} {orientation} {commands}" for name, (x, y), orientation, commands in cars]
+    return '\n'.join(lines) + '\n'
+
+
+# Each suite varies one dimension at a time around a common baseline
+QUICK_SUITE: List[ScenarioSpec] = [
+    ScenarioSpec("baseline", (200, 200), 200, 200, 0.05),
+    ScenarioSpec("many-cars", (400, 400), 2000, 100, 0.05),
+    ScenarioSpec("long-programs", (200, 200), 20, 5000, 0.01),
+    ScenarioSpec("dense", (100, 100), 500, 200, 0.5),
+    ScenarioSpec("sparse-large-field", (100000, 100000), 200, 500, 0.0001),
+    ScenarioSpec("rotation-heavy", (200, 200), 200, 200, 0.05, mix=(1, 4, 4)),
+]
+
+FULL_SUITE: List[ScenarioSpec] = QUICK_SUITE + [
+    ScenarioSpec("many-cars-xl", (2000, 2000), 50000, 100, 0.05),
+    ScenarioSpec("long-programs-xl", (2000, 2000), 100, 100000, 0.001),
+    ScenarioSpec("dense-xl", (1000, 1000), 50000, 500, 0.5),
+    ScenarioSpec("forward-only", (1000, 1000), 1000, 2000, 0.01, mix=(1, 0, 0)),
+]
@@ -2,12 +2,48 @@
 Auto Driving Car Simulation CLI Interface
 """
 
+import argparse
+import sys
+from typing import List, Optional
+
 from src.CLI import CLI
+from src.metrics import PROFILE_MODES, profiled
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(description="Auto Driving Car Simulation")
+    parser.add_argument("--scenario", metavar="FILE", help="run the scenario described by a file instead of the interactive prompts")
+    parser.add_argument("--output", metavar="FILE", help="write the results of --scenario to a binary scenario file")
+    parser.add_argument("--checkpoint", metavar="FILE", help="write checkpoints of the --scenario run to a file, which --scenario can resume")
+    parser.add_argument("--checkpoint-steps", type=int, default=None, help="steps between checkpoints")
+    parser.add_argument("--checkpoint-seconds", type=float, default=None, help="seconds between checkpoints")
+    parser.add_argument("--metrics", action="store_true", help="display command counts and step timings of the --scenario run")
+    parser.add_argument("--profile", choices=PROFILE_MODES, default=None, help="profile the run with cProfile or tracemalloc")
+    parser.add_argument("--batch", metavar="FILE", help="run every scenario of a JSON lines file instead of the interactive prompts")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes for --batch (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=1, help="scenarios sent to a worker at a time for --batch")
+    return parser.parse_args(argv)
 
-def main():
+def main(argv: Optional[List[str]] = None):
     """Main function to run the CLI."""
+    args = parse_args(argv)
     cli = CLI()
-    cli.main_loop()
+
+    with profiled(args.profile):
+        if args.scenario or args.batch:
+            try:
+                if args.scenario:
+                    cli.run_scenario_file(args.scenario, output=args.output, checkpoint=args.checkpoint,
+                                          checkpoint_steps=args.checkpoint_steps,
+                                          checkpoint_seconds=args.checkpoint_seconds, metrics=args.metrics)
+                else:
+                    cli.run_batch(args.batch, workers=args.workers, chunksize=args.chunksize)
+            except (ValueError, OSError) as e:
+                # Report bad input files like the interactive prompts do, without a traceback
+                print(e)
+                sys.exit(1)
+        else:
+            cli.main_loop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,7 +1,8 @@
-import re
 from typing import Optional, Tuple
 
+from src.batch import ScenarioResult, load_scenarios, run_scenarios
 from src.car import Car
+from src.scenario import load_scenario, parse_car_name, parse_field_size, parse_instructions, parse_position_and_orientation
 from src.simulation import Simulation
 
 class CLI:
@@ -55,6 +56,13 @@ class CLI:
             for car in self.simulation.cars.values():
                 print(f"- {car}")
 
+    def batch_results_message(self, scenario_number: int, result: ScenarioResult) -> None:
+        """Display the results of one scenario of a batch run."""
+        print(f"\nScenario {scenario_number}, after simulation, the result is:")
+
+        for car in result.cars:
+            print(f"- {car}")
+
     def after_simulation_options_menu_message(self) -> None:
         """Display options after simulation."""
         print("\nPlease choose from the following options:")
@@ -72,15 +80,8 @@ class CLI:
 
         field_size = input()
 
-        pattern = r'^\d+\s+\d+$'
-        if not re.match(pattern, field_size):
-            raise ValueError("Invalid input. Please enter two positive integers separated by a space.")
-
         try:
-            width, height = map(int, field_size.split())
-            if width <= 0 or height <= 0:
-                raise ValueError("Width and height must be positive integers.")
-            return width, height
+            return parse_field_size(field_size)
         except ValueError as e:
             raise ValueError(e)
         except KeyboardInterrupt:
@@ -101,44 +102,22 @@ class CLI:
     def get_car_name_input(self) -> str:
         """Get the car name from user input."""
         try:
-            car_name = input().strip()
-            
-            if not car_name:
-                raise ValueError("Car name cannot be empty.")
-            
-            return car_name
+            return parse_car_name(input())
         except KeyboardInterrupt:
             raise
     
     def get_car_initial_position_and_orientation_input(self) -> Tuple[Tuple[int, int], str]:
         """Get the car's initial position and orientation."""
         try:
-            position = input().strip()
-
-            pattern = r'^\d+\s+\d+\s+[NESW]$'
-            if not re.match(pattern, position):
-                raise ValueError("Invalid input. Please enter in x y Direction format where Direction is one of N, E, S, W.")
-
-            try:
-                x, y, direction = position.split()
-                x, y = int(x), int(y)
-                
-                return (x, y), direction
-            except ValueError as e:
-                raise ValueError(e)
+            return parse_position_and_orientation(input())
         except KeyboardInterrupt:
             raise
         
     def get_car_instructions_input(self) -> str:
         """Get the car's instructions."""
         try:
-            instructions = input().strip()
-            
             # Validate that instructions only contain valid characters (e.g., L, R, F)
-            if not all(char in 'LRF' for char in instructions):
-                raise ValueError("Invalid command. Only 'L', 'R', and 'F' are allowed.")
-            
-            return instructions
+            return parse_instructions(input())
         except KeyboardInterrupt:
             raise
     
@@ -268,4 +247,35 @@ class CLI:
             
             self.goodbye()
         except KeyboardInterrupt:
-            print("\nSimulation interrupted. Goodbye!")
\ No newline at end of file
+            print("\nSimulation interrupted. Goodbye!")
+
+    def run_batch(self, path: str, workers: Optional[int] = None, chunksize: int = 1) -> None:
+        """Run every scenario of a batch file across worker processes and display the results in file order."""
+        for scenario_number, result in enumerate(run_scenarios(load_scenarios(path), workers=workers, chunksize=chunksize), start=1):
+            self.batch_results_message(scenario_number, result)
+
+    def run_scenario_file(self, path: str, output: Optional[str] = None, checkpoint: Optional[str] = None,
+                          checkpoint_steps: Optional[int] = None, checkpoint_seconds: Optional[float] = None,
+                          metrics: bool = False) -> None:
+        """Run the scenario described by a file and display the results, without any prompts.
+
+        The results are also written to output as a binary scenario file, if given. With checkpoint, the run writes
+        checkpoints there every checkpoint_steps steps and/or checkpoint_seconds seconds; running a checkpoint file
+        as the scenario resumes it. With metrics, the counters and timings of the run are displayed after the results.
+        """
+        self.simulation = load_scenario(path)
+        if checkpoint:
+            self.simulation.enable_checkpoints(checkpoint, checkpoint_steps, checkpoint_seconds)
+        if metrics:
+            self.simulation.enable_metrics()
+        self.simulation.run_simulation()
+        self.simulation_results_message()
+
+        if metrics:
+            self.simulation.disable_metrics()
+            print("\nMetrics:")
+            print(self.simulation.metrics.summary())
+
+        if output:
+            from src.binary_scenario import save_binary  # NumPy is only needed for binary scenarios
+            save_binary(self.simulation, output)
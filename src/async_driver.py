@@ -0,0 +1,59 @@
+import asyncio
+import time
+from typing import Optional
+
+from .simulation import Simulation
+
+
+class AsyncDriver:
+    """Runs a simulation inside an asyncio event loop, handing control back to the loop between slices of steps.
+
+    A slice ends after every_steps steps or every_seconds seconds, whichever comes first, so one huge scenario cannot
+    starve the other tasks of the loop. Cancelling the run stops it between two steps, and the simulation can be
+    driven again from there.
+    """
+
+    def __init__(self, simulation: Simulation, every_steps: Optional[int] = 1000, every_seconds: Optional[float] = None) -> None:
+        """Initialize a driver for a simulation that yields every so many steps, seconds, or both."""
+        if every_steps is None and every_seconds is None:
+            raise ValueError("The driver needs a number of steps or seconds to yield after.")
+
+        if every_steps is not None and (not isinstance(every_steps, int) or every_steps <= 0):
+            raise ValueError("Steps between yields must be a positive integer.")
+
+        if every_seconds is not None and every_seconds <= 0:
+            raise ValueError("Seconds between yields must be positive.")
+
+        self.simulation: Simulation = simulation
+        self.every_steps: Optional[int] = every_steps
+        self.every_seconds: Optional[float] = every_seconds
+        self.slices: int = 0  # Number of slices run so far
+
+    def run_slice(self) -> None:
+        """Run one slice of steps."""
+        if self.every_seconds is None:
+            self.simulation.run_steps(self.every_steps)
+        else:
+            deadline = time.monotonic() + self.every_seconds
+            self.simulation.run_until(lambda simulation: time.monotonic() >= deadline, self.every_steps)
+        self.slices += 1
+
+    async def run(self) -> Simulation:
+        """Run the simulation to the end, yielding to the event loop after every slice, and return it."""
+        while not self.simulation.is_finished():
+            self.run_slice()
+            await asyncio.sleep(0)
+        return self.simulation
+
+    def start(self) -> 'asyncio.Task[Simulation]':
+        """Schedule the run on the running event loop and return its task, which can be awaited or cancelled."""
+        return asyncio.get_running_loop().create_task(self.run())
+
+    def __repr__(self) -> str:
+        return f"AsyncDriver(every_steps={self.every_steps}, every_seconds={self.every_seconds}, slices={self.slices})"
+
+
+async def run_simulation_async(simulation: Simulation, every_steps: Optional[int] = 1000,
+                               every_seconds: Optional[float] = None) -> Simulation:
+    """Run a simulation to the end without blocking the event loop for more than a slice of steps at a time."""
+    return await AsyncDriver(simulation, every_steps, every_seconds).run()
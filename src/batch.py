@@ -0,0 +1,100 @@
+import json
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .car import Car
+from .simulation import Simulation
+
+
+class Scenario(NamedTuple):
+    """An independent simulation: a field size and the cars to add to it as (name, position, orientation, instructions)."""
+
+    field_size: Tuple[int, int]
+    cars: List[Tuple[str, Tuple[int, int], str, str]]
+
+
+class ScenarioResult(NamedTuple):
+    """The outcome of a scenario: the final step and one result line per car, as printed by the CLI."""
+
+    step: int
+    cars: List[str]
+
+
+def run_scenario(scenario: Scenario) -> ScenarioResult:
+    """Build and run the simulation for a scenario."""
+    simulation = Simulation(field_size=tuple(scenario.field_size))
+
+    for name, position, orientation, instructions in scenario.cars:
+        simulation.add_car(Car(name=name, position=tuple(position), orientation=orientation, instructions=instructions))
+
+    simulation.run_simulation()
+    return ScenarioResult(step=simulation.step, cars=[repr(car) for car in simulation.cars.values()])
+
+
+def run_chunk(scenarios: List[Scenario]) -> List[ScenarioResult]:
+    """Run a chunk of scenarios in one worker task."""
+    return [run_scenario(scenario) for scenario in scenarios]
+
+
+def chunked(scenarios: Iterable[Scenario], chunksize: int) -> Iterator[List[Scenario]]:
+    """Split scenarios into lists of at most chunksize scenarios."""
+    chunk: List[Scenario] = []
+    for scenario in scenarios:
+        chunk.append(scenario)
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_scenarios(scenarios: Iterable[Scenario], workers: Optional[int] = None, chunksize: int = 1) -> Iterator[ScenarioResult]:
+    """Run independent scenarios across a process pool and yield their results in input order.
+
+    Scenarios are sent to the workers in chunks of chunksize and read lazily, with at most two chunks per worker in
+    flight, so arbitrarily long scenario streams run in bounded memory. workers=1 runs everything in this process.
+    """
+    if chunksize < 1:
+        raise ValueError("Chunk size must be a positive integer.")
+
+    if workers is not None and workers < 1:
+        raise ValueError("Workers must be a positive integer.")
+
+    if workers == 1:
+        for scenario in scenarios:
+            yield run_scenario(scenario)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    max_pending = 2 * workers
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Deque[Future] = deque()
+
+        for chunk in chunked(scenarios, chunksize):
+            pending.append(executor.submit(run_chunk, chunk))
+
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
+
+
+def load_scenarios(path: str) -> Iterator[Scenario]:
+    """Read scenarios from a JSON lines file, one {"field": [w, h], "cars": [[name, x, y, direction, commands], ...]} per line."""
+    with open(path) as file:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+
+            try:
+                spec = json.loads(line)
+                width, height = spec["field"]
+                cars = [(name, (x, y), orientation, instructions) for name, x, y, orientation, instructions in spec["cars"]]
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError(f"Invalid scenario on line {line_number}: {e}")
+
+            yield Scenario(field_size=(width, height), cars=cars)
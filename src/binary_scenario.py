@@ -0,0 +1,184 @@
+import mmap
+import os
+from collections.abc import ItemsView, KeysView, ValuesView
+from typing import Any, Iterator, List, Optional, Tuple, Type
+
+import numpy as np
+
+from .car import Car
+from .occupancy import Cell, DictOccupancy, GridOccupancy
+from .shared_state import HEADER_DTYPE, MAGIC, CarStateBuffer
+from .simulation import Simulation
+
+
+class LazyCars(dict):
+    """Cars of a binary scenario keyed by car index, each built from its row of the car table on first lookup.
+
+    Once built, looking a car up is a plain dict lookup. Iteration, len and membership cover the whole table, so the
+    mapping stands in for the dict of cars of a simulation, and cars added later are stored as usual.
+    """
+
+    def __init__(self, state: CarStateBuffer) -> None:
+        """Initialize the mapping over a car state; no car is built yet."""
+        super().__init__()
+        self.state: CarStateBuffer = state
+        self.size: int = len(state)
+
+    def __missing__(self, car_index: int) -> Car:
+        if not isinstance(car_index, int) or not 0 <= car_index < len(self.state):
+            raise KeyError(car_index)
+
+        car = self.state.car(car_index)
+        super().__setitem__(car_index, car)
+
+        partner = int(self.state.cars['partner'][car_index])
+        if partner >= 0:
+            car.collision = self[partner]
+        return car
+
+    def __setitem__(self, car_index: int, car: Car) -> None:
+        super().__setitem__(car_index, car)
+        self.size = max(self.size, car_index + 1)
+
+    def __contains__(self, car_index: object) -> bool:
+        return super().__contains__(car_index) or (isinstance(car_index, int) and 0 <= car_index < len(self.state))
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(self.size))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def get(self, car_index: int, default: Optional[Car] = None) -> Optional[Car]:
+        return self[car_index] if car_index in self else default
+
+    def keys(self) -> KeysView:
+        return KeysView(self)
+
+    def values(self) -> ValuesView:
+        return ValuesView(self)
+
+    def items(self) -> ItemsView:
+        return ItemsView(self)
+
+    def __repr__(self) -> str:
+        return f"LazyCars(cars={len(self)}, built={super().__len__()})"
+
+
+class DeferredOccupancy:
+    """Stand-in for the DictOccupancy of a loaded simulation, built the first time it is used.
+
+    A DictOccupancy holds Car objects, so building it builds every car; reading a few cars of a result file never
+    does. Once built, the occupancy replaces the stand-in as the simulation's cars_in_field.
+    """
+
+    def __init__(self, simulation: Simulation, entering: List[int]) -> None:
+        """Initialize the stand-in with the cars that drove into a collision cell, in the order they did."""
+        self.simulation: Simulation = simulation
+        self.entering: List[int] = entering
+        self.occupancy: Optional[DictOccupancy] = None
+
+    def resolve(self) -> DictOccupancy:
+        """Build the occupancy from the car positions, once."""
+        if self.occupancy is None:
+            self.simulation.cars_in_field = DictOccupancy(self.simulation.cars)
+            self.simulation.rebuild_cars_in_field(self.entering)
+            self.occupancy = self.simulation.cars_in_field
+        return self.occupancy
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.resolve(), name)
+
+    def __getitem__(self, position: Tuple[int, int]) -> Cell:
+        return self.resolve()[position]
+
+    def __setitem__(self, position: Tuple[int, int], cell: Cell) -> None:
+        self.resolve()[position] = cell
+
+    def __delitem__(self, position: Tuple[int, int]) -> None:
+        del self.resolve()[position]
+
+    def __contains__(self, position: object) -> bool:
+        return position in self.resolve()
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return iter(self.resolve())
+
+    def __len__(self) -> int:
+        return len(self.resolve())
+
+    def __eq__(self, other: object) -> bool:
+        return self.resolve() == other
+
+    def __repr__(self) -> str:
+        return repr(self.resolve())
+
+
+def save_binary(simulation: Simulation, path: str) -> None:
+    """Write the field size, step and state of every car of a simulation to a binary scenario file.
+
+    Works before and after run_simulation: a file written after a run holds its results. The file is written next to
+    path and then moved over it, so a simulation loaded from path can be saved back to it.
+    """
+    size = CarStateBuffer.layout_size(simulation)
+    temporary_path = f"{path}.tmp"
+
+    try:
+        with open(temporary_path, 'w+b') as file:
+            file.truncate(size)
+            with mmap.mmap(file.fileno(), size) as mapped:
+                CarStateBuffer.write_layout(mapped, simulation).release()
+        os.replace(temporary_path, path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+def load_binary(path: str, simulation_class: Type[Simulation] = Simulation, occupancy: Optional[str] = None) -> Simulation:
+    """Build a simulation from a binary scenario file without parsing any text.
+
+    The file is memory mapped: cars are built from the car table the first time they are looked up and run their
+    programs straight from the file, and the occupancy map is built the first time it is used.
+    """
+    with open(path, 'rb') as file:
+        try:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise ValueError("Not a binary scenario file.")  # Empty files cannot be mapped
+
+    if len(mapped) < HEADER_DTYPE.itemsize or mapped[:len(MAGIC)] != MAGIC:
+        mapped.close()
+        raise ValueError("Not a binary scenario file.")
+
+    try:
+        state: Optional[CarStateBuffer] = CarStateBuffer(mapped)
+    except ValueError:
+        state = None  # The mapping can only be closed once the failed state has let go of it
+    if state is None:
+        mapped.close()
+        raise ValueError("Not a binary scenario file.")
+
+    simulation = simulation_class(field_size=(int(state.header['width']), int(state.header['height'])), occupancy=occupancy)
+    simulation.step = state.step
+    simulation.cars = LazyCars(state)
+    simulation.car_names = set(state.car_names())
+
+    entering = np.flatnonzero(state.cars['entered'])
+    entering = entering[np.lexsort((entering, state.cars['collision_step'][entering]))].tolist()
+
+    if occupancy == 'grid':
+        # The grid holds car indices, so it is built from the car table without building any car
+        positions = state.cars[['x', 'y']].tolist()
+        collision_steps = state.cars['collision_step'].tolist()
+        grid = GridOccupancy(simulation.field.width, simulation.field.height, simulation.cars)
+        entered = set(entering)
+        for car_index, (x, y) in enumerate(positions):
+            if car_index not in entered:
+                grid.place(x, y, car_index)
+        for car_index in entering:
+            grid.mark_collision(*positions[car_index], car_index, collision_steps[car_index])
+        simulation.cars_in_field = grid
+    else:
+        simulation.cars_in_field = DeferredOccupancy(simulation, entering)
+
+    return simulation
@@ -1,9 +1,32 @@
 
-from typing import Dict, Tuple, Optional
+from typing import Any, Dict, Iterable, List, Tuple, Optional, Union
+
+from .program import RUN_LENGTH_CHARS, CompiledProgram, ScannedProgram, expand_program, is_run_length_encoded
+
+
+# Programs are buffers of command letters; str input is encoded, and buffers such as a
+# memoryview over a memory mapped scenario file are used as-is without copying
+Program = Union[bytes, bytearray, memoryview]
+
+
+def as_column(values: Iterable[Any]) -> List[Any]:
+    """Return a column of values as a list, converting NumPy arrays to Python values."""
+    return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+
+def describe_invalid_rows(invalid: Dict[int, str]) -> str:
+    """Return an error message listing every invalid row with the reason it was rejected."""
+    lines = [f"{len(invalid)} invalid car(s):"]
+    lines += [f"- row {row}: {invalid[row]}" for row in sorted(invalid)]
+    return '\n'.join(lines)
 
 
 class Car:
 
+    # Cars are created by the million, so they carry no __dict__ and keep their
+    # state as plain ints: x/y coordinates and an orientation code into ORIENTATIONS
+    __slots__ = ('name', 'x', 'y', 'heading', 'program', 'program_counter', 'collision', 'collision_step', 'compiled')
+
     DIRECTIONS_DELTA: Dict[str, Tuple[int, int]] = {
         'N': (0, 1),
         'E': (1, 0),
@@ -11,7 +34,21 @@ class Car:
         'W': (-1, 0)
     }
 
-    def __init__(self, name: str, position: Tuple[int, int], orientation: str, instructions: str) -> None:
+    ORIENTATIONS: Tuple[str, ...] = ('N', 'E', 'S', 'W')
+    ORIENTATION_CODES: Dict[str, int] = {'N': 0, 'E': 1, 'S': 2, 'W': 3}
+
+    # Lookup tables indexed by orientation code
+    DELTA_X: Tuple[int, ...] = (0, 1, 0, -1)
+    DELTA_Y: Tuple[int, ...] = (1, 0, -1, 0)
+    TURN_LEFT: Tuple[int, ...] = (3, 0, 1, 2)
+    TURN_RIGHT: Tuple[int, ...] = (1, 2, 3, 0)
+
+    # Commands as the byte values found in a program
+    FORWARD: int = ord('F')
+    LEFT: int = ord('L')
+    RIGHT: int = ord('R')
+
+    def __init__(self, name: str, position: Tuple[int, int], orientation: str, instructions: Union[str, Program]) -> None:
         """Initialize the Car with an position and orientation."""
 
         if orientation not in ['N', 'E', 'S', 'W']:
@@ -23,17 +60,135 @@ class Car:
         if not name:
             raise ValueError("Name cannot be empty.")
         
-        if not isinstance(instructions, str):
+        if not isinstance(instructions, (str, bytes, bytearray, memoryview)):
             raise ValueError("Instructions must be a string.")
 
         self.name: str = name
-        self.position: Tuple[int, int] = position
-        self.orientation: str = orientation
-        self.instructions: str = instructions
+        self.x: int = position[0]
+        self.y: int = position[1]
+        self.heading: int = self.ORIENTATION_CODES[orientation]
+        self.program: Program = self.encode_program(instructions)
+        self.program_counter: int = 0  # Index of the next command to execute in program
         self.collision: Optional['Car'] = None
         self.collision_step: Optional[int] = None
+        self.compiled: Optional[Union[CompiledProgram, ScannedProgram]] = None  # Built on first use, reset when the program is replaced
+
+    @classmethod
+    def invalid_rows(cls, names: List[str], xs: List[int], ys: List[int], orientations: List[str],
+                     programs: List[Union[str, Program]]) -> Dict[int, str]:
+        """Return the rows of car columns that __init__ would reject, with the first reason for each.
+
+        Every check is one pass over a column, so all the bad rows of a large batch are found together.
+        """
+        invalid: Dict[int, str] = {}
+
+        for row in [row for row, orientation in enumerate(orientations) if orientation not in cls.ORIENTATION_CODES]:
+            invalid.setdefault(row, "Invalid orientation.")
+        for row in [row for row, (x, y) in enumerate(zip(xs, ys)) if not (isinstance(x, int) and isinstance(y, int) and x >= 0 and y >= 0)]:
+            invalid.setdefault(row, "Initial position must be a tuple of two positive integers.")
+        for row in [row for row, name in enumerate(names) if not name]:
+            invalid.setdefault(row, "Name cannot be empty.")
+        for row in [row for row, program in enumerate(programs) if not isinstance(program, (str, bytes, bytearray, memoryview))]:
+            invalid.setdefault(row, "Instructions must be a string.")
+
+        return invalid
+
+    @classmethod
+    def from_arrays(cls, names: Iterable[str], xs: Iterable[int], ys: Iterable[int], orientations: Iterable[str],
+                    programs: Iterable[Union[str, Program]], validate: bool = True) -> List['Car']:
+        """Build cars from columns of names, coordinates, orientations and programs.
+
+        Columns may be any iterables, including NumPy arrays, and orientations may be a string of letters. Every row
+        is checked before any car is built and all the invalid rows are reported in one ValueError; validate=False
+        skips the checks for columns that were already validated.
+        """
+        names, xs, ys, orientations, programs = (as_column(column) for column in (names, xs, ys, orientations, programs))
+        if not len(names) == len(xs) == len(ys) == len(orientations) == len(programs):
+            raise ValueError("Columns must have the same length.")
+
+        if validate:
+            invalid = cls.invalid_rows(names, xs, ys, orientations, programs)
+            if invalid:
+                raise ValueError(describe_invalid_rows(invalid))
+
+        # Plain command strings, the common case, are encoded in one go instead of checking each for repeat counts
+        if all(type(program) is str for program in programs) and RUN_LENGTH_CHARS.isdisjoint(''.join(programs)):
+            programs = [program.encode('ascii', 'replace') for program in programs]
+        else:
+            programs = [cls.encode_program(program) for program in programs]
+
+        # The rows are valid, so the cars are filled in directly instead of checking them again one by one
+        cars = []
+        new, codes = cls.__new__, cls.ORIENTATION_CODES
+        for name, x, y, orientation, program in zip(names, xs, ys, orientations, programs):
+            car = new(cls)
+            car.name, car.x, car.y, car.heading = name, x, y, codes[orientation]
+            car.program, car.program_counter = program, 0
+            car.collision, car.collision_step, car.compiled = None, None, None
+            cars.append(car)
+        return cars
+
+    @property
+    def position(self) -> Tuple[int, int]:
+        """Return the car's position as an (x, y) tuple."""
+        return (self.x, self.y)
+
+    @position.setter
+    def position(self, position: Tuple[int, int]) -> None:
+        """Set the car's position from an (x, y) tuple."""
+        self.x, self.y = position
+
+    @property
+    def orientation(self) -> str:
+        """Return the direction the car is facing, one of N, E, S, W."""
+        return self.ORIENTATIONS[self.heading]
+
+    @orientation.setter
+    def orientation(self, orientation: str) -> None:
+        """Set the direction the car is facing."""
+        if orientation not in self.ORIENTATION_CODES:
+            raise ValueError("Invalid orientation.")
+        self.heading = self.ORIENTATION_CODES[orientation]
+
+    @staticmethod
+    def encode_program(instructions: Union[str, Program]) -> Program:
+        """Return the program buffer for a command string or buffer.
+
+        Strings may be run length encoded, e.g. F1000R(FFL)50, and are expanded to plain commands.
+        """
+        if isinstance(instructions, str):
+            if is_run_length_encoded(instructions):
+                return expand_program(instructions)
+            # Unknown characters become '?', which like any other unknown command does nothing
+            return instructions.encode('ascii', 'replace')
+        if isinstance(instructions, memoryview) and instructions.format != 'B':
+            return instructions.cast('B')
+        return instructions
+
+    @property
+    def instructions(self) -> str:
+        """Return the commands that have not been executed yet."""
+        return str(self.program[self.program_counter:], 'ascii')
+
+    @instructions.setter
+    def instructions(self, instructions: Union[str, Program]) -> None:
+        """Replace the car's program and restart it from the first command."""
+        self.program = self.encode_program(instructions)
+        self.program_counter = 0
+        self.compiled = None
+
+    def compiled_program(self) -> Union[CompiledProgram, ScannedProgram]:
+        """Return the program compiled into runs, compiling it on first use. A memory mapped program is scanned for
+        its runs as they are needed instead, as compiling a long route would take several times its size in memory.
+        """
+        if self.compiled is None:
+            self.compiled = ScannedProgram(self.program) if isinstance(self.program, memoryview) else CompiledProgram(self.program)
+        return self.compiled
+
+    def has_instructions(self) -> bool:
+        """Check if the car still has commands left to execute."""
+        return self.program_counter < len(self.program)
 
-        
     def __repr__(self) -> str:
         """Return a string representation of the car."""
 
@@ -44,28 +199,22 @@ class Car:
     
     def rotate(self, direction: str) -> None:
         """Rotate the car left or right."""
-        if direction not in ['L', 'R']:
-            raise ValueError("Invalid rotation command.")
-        
-        orientations = ['N', 'E', 'S', 'W']
-        idx = orientations.index(self.orientation)
-        
         if direction == 'L':
-            idx = (idx - 1) % len(orientations)
+            self.heading = self.TURN_LEFT[self.heading]
         elif direction == 'R':
-            idx = (idx + 1) % len(orientations)
-        
-        self.orientation = orientations[idx]
+            self.heading = self.TURN_RIGHT[self.heading]
+        else:
+            raise ValueError("Invalid rotation command.")
         
     def next_position(self) -> Tuple[int, int]:
         """Calculate the next position based on current orientation."""
-        delta = self.DIRECTIONS_DELTA[self.orientation]
-        return (self.position[0] + delta[0], self.position[1] + delta[1])
+        return (self.x + self.DELTA_X[self.heading], self.y + self.DELTA_Y[self.heading])
     
 
     def move(self) -> None:
         """Move the car forward in the current orientation."""
-        self.position = self.next_position()
+        self.x += self.DELTA_X[self.heading]
+        self.y += self.DELTA_Y[self.heading]
 
     def collided(self, other_car: 'Car', step: int) -> None:
         """Handle collision with another car."""
@@ -0,0 +1,49 @@
+import time
+from typing import Optional
+
+from .simulation import Simulation
+
+
+class Checkpointer:
+    """Decides when a running simulation is due for a checkpoint and writes it.
+
+    A checkpoint is the binary scenario file of a simulation between two steps: the step, every car's position,
+    orientation, program counter and collision, and the order cars entered collision cells, from which the occupancy
+    map is rebuilt. Simulation.resume continues from it to the same final state as a run that was never interrupted.
+    Each checkpoint atomically replaces the previous one, so an evicted run always leaves a complete file behind.
+    """
+
+    def __init__(self, path: str, every_steps: Optional[int] = None, every_seconds: Optional[float] = None) -> None:
+        """Initialize a checkpointer that writes to path every so many steps, seconds, or both."""
+        if every_steps is None and every_seconds is None:
+            raise ValueError("Checkpoints need a number of steps or seconds.")
+
+        if every_steps is not None and (not isinstance(every_steps, int) or every_steps <= 0):
+            raise ValueError("Checkpoint steps must be a positive integer.")
+
+        if every_seconds is not None and every_seconds <= 0:
+            raise ValueError("Checkpoint seconds must be positive.")
+
+        self.path: str = path
+        self.every_steps: Optional[int] = every_steps
+        self.every_seconds: Optional[float] = every_seconds
+        self.deadline: float = time.monotonic() + every_seconds if every_seconds is not None else 0.0
+        self.saved: int = 0  # Number of checkpoints written
+
+    def due(self, step: int) -> bool:
+        """Check whether a checkpoint is due after the given step."""
+        if self.every_steps is not None and step % self.every_steps == 0:
+            return True
+        return self.every_seconds is not None and time.monotonic() >= self.deadline
+
+    def save(self, simulation: Simulation) -> None:
+        """Write a checkpoint of the simulation, whose Car objects and cars_in_field must be up to date."""
+        from .binary_scenario import save_binary  # NumPy is only needed for binary scenarios
+        save_binary(simulation, self.path)
+
+        self.saved += 1
+        if self.every_seconds is not None:
+            self.deadline = time.monotonic() + self.every_seconds
+
+    def __repr__(self) -> str:
+        return f"Checkpointer(path={self.path!r}, every_steps={self.every_steps}, every_seconds={self.every_seconds})"
@@ -0,0 +1,451 @@
+import heapq
+from bisect import bisect_right
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from .car import Car
+from .program import MOVE, command_counts, net_turn
+from .simulation import Simulation
+from .spatial_index import Box, SpatialIndex, merge_boxes
+
+
+# Step number standing in for "forever" at the end of a trajectory
+END_OF_TIME = 1 << 62
+
+
+class Segment(NamedTuple):
+    """A stretch of steps over which a car drives in a straight line or stands still.
+
+    After each step from start to end the car is at (x + (step - start) * dx, y + (step - start) * dy). heading and
+    program_counter are the car's state before the first command of the segment; segments without commands cover the
+    time before the first and after the last command.
+    """
+
+    start: int
+    end: int
+    x: int
+    y: int
+    dx: int
+    dy: int
+    heading: int
+    program_counter: int
+    commands: bool
+
+
+class Trajectory:
+    """The path a car follows as long as it does not collide, as segments in step order."""
+
+    def __init__(self, segments: List[Segment]) -> None:
+        """Initialize a trajectory from contiguous segments, the last of which lasts until END_OF_TIME."""
+        self.segments: List[Segment] = segments
+        self.starts: List[int] = [segment.start for segment in segments]
+        self.moves: List[Segment] = [segment for segment in segments if segment.dx or segment.dy]
+
+    def boxes(self) -> Iterator[Box]:
+        """Yield the cells covered by each segment as (min_x, min_y, max_x, max_y)."""
+        for segment in self.segments:
+            if segment.dx or segment.dy:
+                end_x = segment.x + (segment.end - segment.start) * segment.dx
+                end_y = segment.y + (segment.end - segment.start) * segment.dy
+                yield min(segment.x, end_x), min(segment.y, end_y), max(segment.x, end_x), max(segment.y, end_y)
+            else:
+                yield segment.x, segment.y, segment.x, segment.y
+
+    def footprint(self, size: int) -> List[Box]:
+        """Return boxes covering every cell of the trajectory, merging consecutive segments while they fit in
+        size x size cells, so routes that wind around a small area are a single box.
+        """
+        return merge_boxes(self.boxes(), size)
+
+    def segment_at(self, step: int) -> Segment:
+        """Return the segment covering a step."""
+        return self.segments[bisect_right(self.starts, step) - 1]
+
+    def state_at(self, step: int, program: bytes) -> Tuple[int, int, int, int]:
+        """Return the position, heading and program counter of the car after a step as (x, y, heading, program_counter)."""
+        segment = self.segment_at(step)
+        elapsed = step - segment.start
+        x, y = segment.x + elapsed * segment.dx, segment.y + elapsed * segment.dy
+
+        if not segment.commands:
+            return x, y, segment.heading, segment.program_counter
+
+        program_counter = segment.program_counter + elapsed + 1
+        heading = segment.heading
+        if not (segment.dx or segment.dy):
+            commands = bytes(program[segment.program_counter:program_counter])
+            heading = (heading + commands.count(b'R') - commands.count(b'L')) & 3
+        return x, y, heading, program_counter
+
+    def stopped_after(self, step: int, program: bytes) -> 'Trajectory':
+        """Return the trajectory of the car if it stops for good after a step."""
+        x, y, heading, program_counter = self.state_at(step, program)
+        segments = self.segments[:bisect_right(self.starts, step)]
+        segments[-1] = segments[-1]._replace(end=step)
+        segments.append(Segment(step + 1, END_OF_TIME, x, y, 0, 0, heading, program_counter, False))
+        return Trajectory(segments)
+
+
+def first_entry(moves: List[Segment], other: Trajectory, delay: int, first_step: int) -> Optional[int]:
+    """Return the first step from first_step on in which a car driving along moves enters the cell the other car was
+    in delay steps earlier, or None if it never does.
+    """
+    for move in moves:
+        if move.end < first_step:
+            continue
+
+        lo = max(move.start, first_step)
+        index = bisect_right(other.starts, lo - delay) - 1
+
+        while index < len(other.segments):
+            segment = other.segments[index]
+            start = segment.start + delay
+            if start > move.end:
+                break
+
+            step = meeting_step(move, segment, delay, max(lo, start), min(move.end, segment.end + delay))
+            if step is not None:
+                return step
+            index += 1
+
+    return None
+
+
+def meeting_step(move: Segment, segment: Segment, delay: int, lo: int, hi: int) -> Optional[int]:
+    """Return the first step in [lo, hi] at which move is in the cell segment was in delay steps earlier."""
+    if lo > hi:
+        return None
+
+    # Both positions are linear in the step, so they meet where offset + step * rate is zero on both axes
+    step = None
+    for offset, rate in (
+        ((move.x - move.start * move.dx) - (segment.x - (segment.start + delay) * segment.dx), move.dx - segment.dx),
+        ((move.y - move.start * move.dy) - (segment.y - (segment.start + delay) * segment.dy), move.dy - segment.dy),
+    ):
+        if rate == 0:
+            if offset != 0:
+                return None
+        elif offset % rate:
+            return None
+        elif step is None:
+            step = -offset // rate
+        elif step != -offset // rate:
+            return None
+
+    if step is None:
+        return lo
+    return step if lo <= step <= hi else None
+
+
+def build_trajectory(simulation: Simulation, car: Car, end: Optional[int] = None) -> Trajectory:
+    """Return the trajectory a car follows from the simulation's current step if nothing gets in its way, stopping
+    before the command at index end of its program if given.
+    """
+    x, y, heading, program_counter = car.x, car.y, car.heading, car.program_counter
+    step = simulation.step
+    end = len(car.program) if end is None else min(end, len(car.program))
+
+    if car.collision:
+        return Trajectory([Segment(step, END_OF_TIME, x, y, 0, 0, heading, program_counter, False)])
+
+    segments = [Segment(step, step, x, y, 0, 0, heading, program_counter, False)]
+
+    def stand(length: int) -> None:
+        """Add a stretch of commands that leave the car where it is."""
+        last = segments[-1]
+        if last.commands and not (last.dx or last.dy):
+            segments[-1] = last._replace(end=step + length)
+        else:
+            segments.append(Segment(step + 1, step + length, x, y, 0, 0, heading, program_counter, True))
+
+    compiled = car.compiled_program()
+    while program_counter < end:
+        opcode, length = compiled.run_at(car.program, program_counter)
+        if length > end - program_counter:
+            length = end - program_counter
+            if opcode != MOVE:
+                opcode = net_turn(bytes(car.program[program_counter:end]))
+
+        if opcode != MOVE:
+            stand(length)
+            heading = (heading + opcode) & 3
+        else:
+            moves = min(length, simulation.distance_to_boundary(x, y, heading))
+            if moves:
+                dx, dy = Car.DELTA_X[heading], Car.DELTA_Y[heading]
+                segments.append(Segment(step + 1, step + moves, x + dx, y + dy, dx, dy, heading, program_counter, True))
+                x, y = x + moves * dx, y + moves * dy
+            if moves < length:
+                # The rest of the run pushes against the boundary
+                step, program_counter = step + moves, program_counter + moves
+                stand(length - moves)
+                length -= moves
+
+        step += length
+        program_counter += length
+
+    segments.append(Segment(step + 1, END_OF_TIME, x, y, 0, 0, heading, program_counter, False))
+    return Trajectory(segments)
+
+
+def choose_tile_size(trajectories: List[Trajectory], minimum: int, maximum: int) -> int:
+    """Return a tile size of about a quarter of the average run of moves, so most segments span a few tiles."""
+    lengths = [move.end - move.start + 1 for trajectory in trajectories for move in trajectory.moves]
+    average = sum(lengths) // len(lengths) if lengths else 1
+    return min(max(average // 4, minimum), maximum)
+
+
+class EventDrivenSimulation(Simulation):
+    """Simulation backend that jumps from collision to collision instead of executing every step.
+
+    Each car's commands are turned into the trajectory it would follow on its own, and only pairs of cars whose
+    trajectories share a cell, found with a SpatialIndex, are checked for the first step in which one drives into the
+    other. Collisions are then handled in (step, car index) order, the order in which the stepwise simulation would
+    meet them, and the trajectories of the cars involved are cut short. Results, including collision steps and the rule that lower index
+    cars move first within a step, are identical to Simulation.
+    """
+
+    # Tile size of the spatial index, or None to pick one from the length of the runs of moves
+    TILE_SIZE: Optional[int] = None
+    MIN_TILE_SIZE: int = 8
+    MAX_TILE_SIZE: int = 4096
+
+    # Segments compared per pending command before stepping is cheaper, or None to never fall back
+    MAX_PAIR_WORK_PER_COMMAND: Optional[float] = 0.5
+
+    def build_trajectory(self, car: Car) -> Trajectory:
+        """Return the trajectory a car follows from the current step if nothing gets in its way."""
+        return build_trajectory(self, car)
+
+    def next_collision(self, first: int, second: int, after: Tuple[int, int]) -> Optional[Tuple[int, int, int]]:
+        """Return the first collision between two cars as (step, mover, other), looking only at turns after the
+        (step, car index) turn given.
+        """
+        if first > second:
+            first, second = second, first
+
+        step, turn = after
+        trajectories = self.trajectories
+        events = []
+
+        # The lower index car moves first, so it runs into the other car where that one was after the previous step
+        entry = first_entry(trajectories[first].moves, trajectories[second], 1, step if first > turn else step + 1)
+        if entry is not None:
+            events.append((entry, first, second))
+
+        entry = first_entry(trajectories[second].moves, trajectories[first], 0, step if second > turn else step + 1)
+        if entry is not None:
+            events.append((entry, second, first))
+
+        return min(events) if events else None
+
+    def schedule(self, first: int, second: int, after: Tuple[int, int]) -> None:
+        """Queue the next collision between two cars, if they have one."""
+        event = self.next_collision(first, second, after)
+        if event is not None:
+            step, mover, other = event
+            heapq.heappush(self.events, (step, mover, other, self.versions[mover], self.versions[other]))
+
+    def choose_tile_size(self) -> int:
+        """Return the tile size for the spatial index."""
+        if self.TILE_SIZE is not None:
+            return self.TILE_SIZE
+        return choose_tile_size(self.trajectories, self.MIN_TILE_SIZE, self.MAX_TILE_SIZE)
+
+    def index_trajectory(self, car_index: int) -> None:
+        """Put the segments of a car's trajectory in the spatial index, keeping the boxes they were put in as."""
+        self.footprints[car_index] = self.trajectories[car_index].footprint(self.index.tile_size)
+        for box in self.footprints[car_index]:
+            self.index.add(car_index, *box)
+
+    def overlapping(self, car_index: int) -> Set[int]:
+        """Return the indexed cars whose boxes share a cell with the indexed boxes of a car, other than the car."""
+        found: Set[int] = set()
+        for box in self.footprints[car_index]:
+            found |= self.index.query(*box)
+
+        found.discard(car_index)
+        return found
+
+    def candidates(self, car_index: int) -> Set[int]:
+        """Return the cars that can collide with a car: the ones whose trajectories share a cell with its trajectory."""
+        found = self.overlapping(car_index)
+        if not self.trajectories[car_index].moves:
+            found = {other for other in found if self.trajectories[other].moves}
+        return found
+
+    def pair_work_budget(self) -> Optional[float]:
+        """Return how many segments may be compared before stepping through the commands left is cheaper, or None."""
+        if self.MAX_PAIR_WORK_PER_COMMAND is None:
+            return None
+        pending = sum(len(car.program) - car.program_counter for car in self.cars.values() if not car.collision)
+        return self.MAX_PAIR_WORK_PER_COMMAND * pending
+
+    def reach_box(self, car: Car, moves: int, rotations: int) -> Box:
+        """Return a box holding every cell a car can get to with the moves it has left, clipped to the field: the
+        line ahead of it when it never turns again, the square around it otherwise.
+        """
+        if rotations:
+            min_x, min_y, max_x, max_y = car.x - moves, car.y - moves, car.x + moves, car.y + moves
+        else:
+            end_x, end_y = car.x + moves * Car.DELTA_X[car.heading], car.y + moves * Car.DELTA_Y[car.heading]
+            min_x, min_y, max_x, max_y = min(car.x, end_x), min(car.y, end_y), max(car.x, end_x), max(car.y, end_y)
+        return max(min_x, 0), max(min_y, 0), min(max_x, self.field.width - 1), min(max_y, self.field.height - 1)
+
+    def pair_work_may_fit(self, budget: float) -> bool:
+        """Return whether comparing the pairs of cars can fit in budget, judged before any trajectory is built.
+
+        Each car is bounded by its reach box and by two segments per run of moves, which there are no more of than
+        moves or other commands. Every car is paired with every other car in the tiles its box covers, which bounds
+        the work of schedule_all from command counts alone, at the cost of one count per tile covered.
+        """
+        bounds: List[Tuple[Box, int]] = []  # Reach box and most segments of every car
+        for car in self.cars.values():
+            if car.collision or not car.has_instructions():
+                bounds.append(((car.x, car.y, car.x, car.y), 1))
+                continue
+            moves, rotations = command_counts(car.program, car.program_counter)
+            others = len(car.program) - car.program_counter - moves
+            bounds.append((self.reach_box(car, moves, rotations), 2 * min(moves, others) + 2))
+        if not bounds:
+            return True
+
+        # Tiles about as large as the average box, and large enough that no box covers more than 64 x 64 of them
+        sides = [max(box[2] - box[0], box[3] - box[1]) + 1 for box, _ in bounds]
+        grid = SpatialIndex(max(sum(sides) // len(sides), max(sides) // 64, self.MIN_TILE_SIZE))
+        cars: Dict[Tuple[int, int], int] = {}
+        segments: Dict[Tuple[int, int], int] = {}
+        for box, most_segments in bounds:
+            for tile in grid.tile_range(*box):
+                cars[tile] = cars.get(tile, 0) + 1
+                segments[tile] = segments.get(tile, 0) + most_segments
+
+        return sum((cars[tile] - 1) * segments[tile] for tile in cars) <= budget
+
+    def schedule_all(self, budget: Optional[float] = None) -> bool:
+        """Index every trajectory and queue the next collision of every pair of cars whose trajectories share a cell.
+
+        Cars are indexed one at a time and paired with the cars indexed before them, so once comparing the pairs
+        found so far would cost more than budget, False is returned without indexing the rest of the cars or queueing
+        anything.
+        """
+        trajectories = self.trajectories
+        after = (self.step, -1)
+        pairs: List[Tuple[int, int]] = []
+        work = 0
+
+        for car_index, trajectory in enumerate(trajectories):
+            self.index_trajectory(car_index)
+            for other in self.overlapping(car_index):
+                # Two cars that both stay where they are cannot collide
+                if trajectory.moves or trajectories[other].moves:
+                    pairs.append((car_index, other))
+                    work += len(trajectory.segments) + len(trajectories[other].segments)
+
+            if budget is not None and work > budget:
+                return False
+
+        for car_index, other in pairs:
+            self.schedule(car_index, other, after)
+        return True
+
+    def reschedule(self, car_index: int, after: Tuple[int, int]) -> None:
+        """Queue the next collisions of a car whose trajectory changed."""
+        for other in self.candidates(car_index):
+            self.schedule(car_index, other, after)
+
+    def stop_car(self, car_index: int, step: int) -> None:
+        """Cut the trajectory of a car short after a step."""
+        self.trajectories[car_index] = self.trajectories[car_index].stopped_after(step, self.cars[car_index].program)
+        self.versions[car_index] += 1
+        self.index.discard(car_index)
+        self.index_trajectory(car_index)
+
+    def _cell_owner(self, car_index: int) -> int:
+        """Return the car that owns the cell of a car, following collisions back to the car that was hit."""
+        if car_index in self.entered:
+            return self.partners[car_index]
+        return car_index
+
+    def collide(self, step: int, mover: int, other: int) -> None:
+        """Handle a car driving into another car's cell in a step."""
+        owner = self._cell_owner(other)
+        stopped = [mover]
+
+        if owner not in self.partners:
+            # A car later in the order has not had its turn yet and stops where it was after the previous step
+            self.stop_car(owner, step if owner < mover else step - 1)
+            self.partners[owner] = mover
+            self.collision_steps[owner] = step
+            stopped.append(owner)
+
+        self.stop_car(mover, step)
+        self.partners[mover] = owner
+        self.collision_steps[mover] = step
+        self.entered[mover] = owner
+        self.entering.append(mover)
+
+        for car_index in stopped:
+            self.reschedule(car_index, (step, mover))
+
+    def load_cars(self) -> None:
+        """Build the trajectories and the collision bookkeeping for the current car state."""
+        index_of = {id(car): car_index for car_index, car in self.cars.items()}
+
+        self.trajectories: List[Trajectory] = [self.build_trajectory(self.cars[car_index]) for car_index in range(len(self.cars))]
+        self.versions: List[int] = [0] * len(self.cars)
+        self.index = SpatialIndex(self.choose_tile_size())  # Filled by schedule_all
+        self.footprints: List[List[Box]] = [[] for _ in self.trajectories]  # Boxes each car is indexed as
+        self.events: List[Tuple[int, int, int, int, int]] = []
+        self.partners: Dict[int, int] = {}
+        self.collision_steps: Dict[int, int] = {}
+        self.entered: Dict[int, int] = {}  # Cars that drove into a collision cell, mapped to the owner of the cell
+
+        for car_index, car in self.cars.items():
+            if car.collision:
+                self.partners[car_index] = index_of.get(id(car.collision), -1)
+
+        # Entries into collision cells in the order they happened, earlier runs first
+        self.entering: List[int] = self.entered_cars()
+        for car_index in self.entering:
+            self.entered[car_index] = self.partners[car_index]
+
+    def store_cars(self) -> None:
+        """Write the end of every trajectory back to the Car objects and rebuild cars_in_field."""
+        last_step = self.step
+
+        for car_index, trajectory in enumerate(self.trajectories):
+            car = self.cars[car_index]
+            final = trajectory.segments[-1]
+            car.x, car.y, car.heading, car.program_counter = final.x, final.y, final.heading, final.program_counter
+
+            if car_index in self.collision_steps:
+                car.collision = self.cars[self.partners[car_index]]
+                car.collision_step = self.collision_steps[car_index]
+                last_step = max(last_step, car.collision_step)
+            else:
+                last_step = max(last_step, final.start - 1)
+
+        self.step = last_step
+        self.rebuild_cars_in_field(self.entering)
+
+    def run_simulation(self) -> None:
+        """Run the simulation by jumping between collisions."""
+        if self.recorder is not None:
+            return super().run_simulation()  # Recording needs every command executed one at a time
+
+        self.select_occupancy()
+        budget = self.pair_work_budget()
+        if budget is not None and not self.pair_work_may_fit(budget):
+            return super().run_simulation()
+
+        self.load_cars()
+        if not self.schedule_all(budget):
+            return super().run_simulation()
+
+        while self.events:
+            step, mover, other, mover_version, other_version = heapq.heappop(self.events)
+            if self.versions[mover] == mover_version and self.versions[other] == other_version:
+                self.collide(step, mover, other)
+
+        self.store_cars()
+        self.active_cars = []
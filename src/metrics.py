@@ -0,0 +1,218 @@
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+from array import array
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .car import Car
+
+if TYPE_CHECKING:
+    from .simulation import Cycle, Simulation
+
+
+PROFILE_MODES = ('cprofile', 'tracemalloc')
+
+
+class SimulationMetrics:
+    """Counters and step timings collected from an instrumented simulation.
+
+    Commands are counted by kind. Moves that would leave the field are ignored, and the other moves each look up
+    their target cell in the occupancy map; both are counted, along with collisions. Every step is timed, and the
+    steps skipped over by fast forwarding the last car or by finishing rotation tails are timed as single spans. The
+    commands of cycles skipped by suspended cars count as executed, and so do the steps jumped over while only
+    suspended cars are left. Commands that are skipped are counted as if they had been stepped through, so every
+    counter matches a run of the same simulation one step at a time.
+    """
+
+    def __init__(self) -> None:
+        """Initialize every counter to zero."""
+        self.forward: int = 0
+        self.left: int = 0
+        self.right: int = 0
+        self.other: int = 0  # Unknown commands, which do nothing
+        self.out_of_bounds: int = 0
+        self.occupancy_lookups: int = 0
+        self.collisions: int = 0
+        self.steps: int = 0
+        self.step_seconds: array = array('d')
+        self.fast_forward_seconds: float = 0.0
+        self.run_seconds: float = 0.0
+
+    @property
+    def commands(self) -> int:
+        """Return the number of commands executed."""
+        return self.forward + self.left + self.right + self.other
+
+    def count_commands(self, commands: bytes, ignored: int = 0) -> None:
+        """Count a run of commands executed without being looked at one by one, ignored of whose moves pushed against
+        the boundary while the others each moved the car to a free cell.
+        """
+        forward, left, right = commands.count(b'F'), commands.count(b'L'), commands.count(b'R')
+        self.forward += forward
+        self.left += left
+        self.right += right
+        self.other += len(commands) - forward - left - right
+        self.out_of_bounds += ignored
+        self.occupancy_lookups += forward - ignored
+
+    def as_dict(self) -> Dict[str, float]:
+        """Return the counters and timing totals."""
+        return {
+            'forward': self.forward, 'left': self.left, 'right': self.right, 'other': self.other,
+            'out_of_bounds': self.out_of_bounds, 'occupancy_lookups': self.occupancy_lookups,
+            'collisions': self.collisions, 'steps': self.steps,
+            'step_seconds': sum(self.step_seconds), 'slowest_step_seconds': max(self.step_seconds, default=0.0),
+            'fast_forward_seconds': self.fast_forward_seconds, 'run_seconds': self.run_seconds,
+        }
+
+    def summary(self) -> str:
+        """Return the metrics as lines of name: value."""
+        return '\n'.join(
+            f"{name}: {value:.6f}" if isinstance(value, float) else f"{name}: {value}" for name, value in self.as_dict().items()
+        )
+
+    def __repr__(self) -> str:
+        return f"SimulationMetrics(commands={self.commands}, collisions={self.collisions}, steps={self.steps})"
+
+
+# Simulation methods replaced on the instance while metrics are enabled
+INSTRUMENTED_METHODS = (
+    'execute_instructions', 'move_car', 'run_step', 'fast_forward', 'finish_rotations', 'suspend', 'resume_cars', 'run_simulation',
+)
+
+
+def instrument(simulation: 'Simulation', metrics: SimulationMetrics) -> None:
+    """Wrap the hot methods of one simulation so they update metrics.
+
+    The wrappers are instance attributes that shadow the class methods, so other simulations, and this one once
+    uninstrument removes them, run the plain methods with no added cost.
+    """
+    execute_instructions, move_car = simulation.execute_instructions, simulation.move_car
+    run_step, fast_forward, run_simulation = simulation.run_step, simulation.fast_forward, simulation.run_simulation
+    finish_rotations, suspend, resume_cars = simulation.finish_rotations, simulation.suspend, simulation.resume_cars
+    perf_counter = time.perf_counter
+
+    def counted_execute_instructions(car_index: int) -> None:
+        car = simulation.cars[car_index]
+        if not car.collision and car.program_counter < len(car.program):
+            command = car.program[car.program_counter]
+            if command == Car.FORWARD:
+                metrics.forward += 1
+            elif command == Car.LEFT:
+                metrics.left += 1
+            elif command == Car.RIGHT:
+                metrics.right += 1
+            else:
+                metrics.other += 1
+        execute_instructions(car_index)
+
+    def counted_move_car(car_index: int) -> bool:
+        car = simulation.cars[car_index]
+        if car.collision:
+            return move_car(car_index)
+
+        moved = move_car(car_index)
+        if not moved:
+            metrics.out_of_bounds += 1
+        else:
+            metrics.occupancy_lookups += 1
+            if car.collision:
+                metrics.collisions += 1
+        return moved
+
+    def timed_run_step() -> None:
+        start = perf_counter()
+        run_step()
+        metrics.step_seconds.append(perf_counter() - start)
+        metrics.steps += 1
+
+    def timed_fast_forward(car_index: int) -> int:
+        car = simulation.cars[car_index]
+        start_step, start_counter, executed = simulation.step, car.program_counter, metrics.commands
+        start = perf_counter()
+        ignored = fast_forward(car_index)
+        metrics.fast_forward_seconds += perf_counter() - start
+        metrics.steps += simulation.step - start_step
+
+        # A move into another car is executed, and counted, as the last command
+        executed = metrics.commands - executed
+        metrics.count_commands(bytes(car.program[start_counter:car.program_counter - executed]), ignored)
+        return ignored
+
+    def timed_finish_rotations() -> None:
+        start_step = simulation.step
+        car_indices = simulation.active_cars + [car_index for _, car_index, _ in simulation.suspended_cars]
+        for car_index in car_indices:
+            car = simulation.cars[car_index]
+            metrics.count_commands(bytes(car.program[car.program_counter:]))
+        start = perf_counter()
+        finish_rotations()
+        metrics.fast_forward_seconds += perf_counter() - start
+        metrics.steps += simulation.step - start_step
+
+    def counted_suspend(car_index: int, cycle: 'Cycle') -> None:
+        car = simulation.cars[car_index]
+        metrics.count_commands(bytes(car.program[car.program_counter:car.program_counter + cycle.steps]), cycle.ignored)
+        suspend(car_index, cycle)
+
+    def counted_resume_cars(checks: List[Tuple[int, int, int]]) -> None:
+        start_step = simulation.step
+        resume_cars(checks)
+        metrics.steps += simulation.step - start_step
+
+    def timed_run_simulation() -> None:
+        start = perf_counter()
+        run_simulation()
+        metrics.run_seconds += perf_counter() - start
+
+    simulation.execute_instructions = counted_execute_instructions
+    simulation.move_car = counted_move_car
+    simulation.run_step = timed_run_step
+    simulation.fast_forward = timed_fast_forward
+    simulation.finish_rotations = timed_finish_rotations
+    simulation.suspend = counted_suspend
+    simulation.resume_cars = counted_resume_cars
+    simulation.run_simulation = timed_run_simulation
+
+
+def uninstrument(simulation: 'Simulation') -> None:
+    """Remove the wrappers installed by instrument."""
+    for name in INSTRUMENTED_METHODS:
+        simulation.__dict__.pop(name, None)
+
+
+@contextmanager
+def profiled(mode: Optional[str], output: Callable[[str], None] = print, limit: int = 20) -> Iterator[None]:
+    """Profile the body with cProfile or tracemalloc and pass the report to output; a mode of None does nothing."""
+    if mode is None:
+        yield
+        return
+
+    if mode not in PROFILE_MODES:
+        raise ValueError("Profile mode must be 'cprofile' or 'tracemalloc'.")
+
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(limit)
+            output(report.getvalue())
+        return
+
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        lines = [f"Peak traced memory: {peak / 1024:.1f} KiB", f"Top {limit} allocation sites:"]
+        lines += [str(statistic) for statistic in snapshot.statistics('lineno')[:limit]]
+        output('\n'.join(lines))
@@ -0,0 +1,263 @@
+from array import array
+from collections.abc import MutableMapping, Sequence
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .car import Car
+
+
+class CollisionCell(Sequence):
+    """A cell where cars collided, frozen since collided cars never move again.
+
+    car_indices holds the car that was hit followed by the cars that drove in, in the order they did, so a car piling
+    into the cell is recorded with one append. step is the step of the first collision. As a sequence the cell lists
+    its cars newest first and ends with the car that was hit.
+    """
+
+    __slots__ = ('cars', 'car_indices', 'step')
+
+    def __init__(self, cars: Dict[int, Car], car_indices: List[int], step: Optional[int]) -> None:
+        """Initialize a collision cell from its cars in the order they arrived."""
+        self.cars: Dict[int, Car] = cars
+        self.car_indices: List[int] = car_indices
+        self.step: Optional[int] = step
+
+    @property
+    def owner(self) -> int:
+        """Return the car that was hit, which every car driving in collides with."""
+        return self.car_indices[0]
+
+    @property
+    def entered(self) -> List[int]:
+        """Return the cars that drove into the cell, in the order they did."""
+        return self.car_indices[1:]
+
+    def enter(self, car_index: int) -> None:
+        """Record another car driving into the cell."""
+        self.car_indices.append(car_index)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Car, List[Car]]:
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += len(self.car_indices)
+        if not 0 <= index < len(self.car_indices):
+            raise IndexError(index)
+        return self.cars[self.car_indices[-1 - index]]
+
+    def __iter__(self) -> Iterator[Car]:
+        for car_index in reversed(self.car_indices):
+            yield self.cars[car_index]
+
+    def __len__(self) -> int:
+        return len(self.car_indices)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, CollisionCell):
+            return self.car_indices == other.car_indices and self.step == other.step
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    __hash__ = None  # Mutable, like the lists it compares equal to
+
+    def __repr__(self) -> str:
+        return f"CollisionCell(car_indices={self.car_indices}, step={self.step})"
+
+
+Cell = Union[Car, CollisionCell]
+
+
+class CarIndexLookup:
+    """Finds the index of a Car in a cars dict, that of an occupancy map or of a simulation, through a cache of
+    id(car) -> car index.
+    """
+
+    cars: Dict[int, Car]
+    _car_indices: Dict[int, int]
+
+    def car_index_of(self, car: Car) -> int:
+        """Return the index of a car in the simulation."""
+        car_index = self._car_indices.get(id(car))
+
+        if car_index is None or self.cars.get(car_index) is not car:
+            self._car_indices = {id(candidate): candidate_index for candidate_index, candidate in self.cars.items()}
+            car_index = self._car_indices.get(id(car))
+            if car_index is None:
+                raise ValueError("Car not in simulation.")
+
+        return car_index
+
+    def collision_cell(self, cars: List[Car]) -> CollisionCell:
+        """Return a collision cell holding cars listed newest first, ending with the car that was hit."""
+        car_indices = [self.car_index_of(car) for car in reversed(cars)]
+        return CollisionCell(self.cars, car_indices, cars[-2].collision_step if len(cars) > 1 else None)
+
+
+class DictOccupancy(CarIndexLookup, dict):
+    """Occupancy map keyed by position tuples, holding a Car or the CollisionCell of collided cars in a cell.
+
+    Suited to sparse fields: memory grows with the number of cars, not with the field area.
+    """
+
+    def __init__(self, cars: Dict[int, Car]) -> None:
+        """Initialize an empty occupancy map for the given cars."""
+        super().__init__()
+        self.cars: Dict[int, Car] = cars
+        self._car_indices: Dict[int, int] = {}  # id(car) -> car index, for the car that was hit in a collision
+
+    def occupant(self, x: int, y: int) -> Optional[Cell]:
+        """Return what occupies a cell, or None if it is empty."""
+        return self.get((x, y))
+
+    def place(self, x: int, y: int, car_index: int) -> None:
+        """Put a car in an empty cell."""
+        self[(x, y)] = self.cars[car_index]
+
+    def place_many(self, positions: List[Tuple[int, int]], car_indices: Iterable[int]) -> None:
+        """Put cars in empty cells, one per position."""
+        self.update(zip(positions, map(self.cars.__getitem__, car_indices)))
+
+    def vacate(self, x: int, y: int) -> None:
+        """Empty a cell."""
+        self.pop((x, y), None)
+
+    def mark_collision(self, x: int, y: int, car_index: int, step: Optional[int] = None) -> None:
+        """Record a car driving into an occupied cell, turning it into a collision cell if it is not one yet.
+
+        step defaults to the collision step of the car.
+        """
+        previous = self[(x, y)]
+        if isinstance(previous, CollisionCell):
+            previous.enter(car_index)
+        else:
+            step = self.cars[car_index].collision_step if step is None else step
+            self[(x, y)] = CollisionCell(self.cars, [self.car_index_of(previous), car_index], step)
+
+    def collision_cells(self) -> Iterator[CollisionCell]:
+        """Return every collision cell."""
+        return (cell for cell in self.values() if isinstance(cell, CollisionCell))
+
+
+class GridOccupancy(CarIndexLookup, MutableMapping):
+    """Occupancy map backed by a flat array of car indices indexed by y * width + x.
+
+    Suited to dense fields: every lookup is an array index with no tuple allocation or hashing. Collision cells hold
+    the COLLISION sentinel and their CollisionCell records are kept in a side dict. The mapping interface mirrors
+    DictOccupancy so callers that index by position tuples keep working.
+    """
+
+    EMPTY: int = -1
+    COLLISION: int = -2
+
+    def __init__(self, width: int, height: int, cars: Dict[int, Car]) -> None:
+        """Initialize an empty grid for a field of the given size."""
+        self.width: int = width
+        self.height: int = height
+        self.cars: Dict[int, Car] = cars
+        self.cells: array = array('i', [self.EMPTY]) * (width * height)
+        self.collisions: Dict[int, CollisionCell] = {}
+        self._car_indices: Dict[int, int] = {}  # id(car) -> car index, for the mapping interface
+
+    @classmethod
+    def from_cells(cls, width: int, height: int, cars: Dict[int, Car], cells: Dict[Tuple[int, int], Cell]) -> 'GridOccupancy':
+        """Build a grid holding the same cells as a position keyed occupancy map."""
+        grid = cls(width, height, cars)
+        for position, cell in cells.items():
+            grid[position] = cell
+        return grid
+
+    def occupant(self, x: int, y: int) -> Optional[Cell]:
+        """Return what occupies a cell, or None if it is empty."""
+        index = y * self.width + x
+        car_index = self.cells[index]
+
+        if car_index >= 0:
+            return self.cars[car_index]
+        if car_index == self.COLLISION:
+            return self.collisions[index]
+        return None
+
+    def place(self, x: int, y: int, car_index: int) -> None:
+        """Put a car in an empty cell."""
+        self.cells[y * self.width + x] = car_index
+
+    def place_many(self, positions: List[Tuple[int, int]], car_indices: Iterable[int]) -> None:
+        """Put cars in empty cells, one per position."""
+        cells, width = self.cells, self.width
+        for (x, y), car_index in zip(positions, car_indices):
+            cells[y * width + x] = car_index
+
+    def vacate(self, x: int, y: int) -> None:
+        """Empty a cell."""
+        index = y * self.width + x
+        if self.cells[index] == self.COLLISION:
+            del self.collisions[index]
+        self.cells[index] = self.EMPTY
+
+    def mark_collision(self, x: int, y: int, car_index: int, step: Optional[int] = None) -> None:
+        """Record a car driving into an occupied cell, turning it into a collision cell if it is not one yet.
+
+        step defaults to the collision step of the car.
+        """
+        index = y * self.width + x
+        previous = self.cells[index]
+        if previous == self.COLLISION:
+            self.collisions[index].enter(car_index)
+        else:
+            step = self.cars[car_index].collision_step if step is None else step
+            self.collisions[index] = CollisionCell(self.cars, [previous, car_index], step)
+            self.cells[index] = self.COLLISION
+
+    def collision_cells(self) -> Iterator[CollisionCell]:
+        """Return every collision cell."""
+        return iter(self.collisions.values())
+
+    ### Mapping interface keyed by position tuples ###
+
+    def _index(self, position: Tuple[int, int]) -> int:
+        """Return the flat index of a position, raising KeyError outside the field."""
+        x, y = position
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise KeyError(position)
+        return y * self.width + x
+
+    def __getitem__(self, position: Tuple[int, int]) -> Cell:
+        self._index(position)
+        cell = self.occupant(*position)
+        if cell is None:
+            raise KeyError(position)
+        return cell
+
+    def __setitem__(self, position: Tuple[int, int], cell: Cell) -> None:
+        index = self._index(position)
+        self.collisions.pop(index, None)
+
+        if isinstance(cell, CollisionCell):
+            self.collisions[index] = CollisionCell(self.cars, list(cell.car_indices), cell.step)
+            self.cells[index] = self.COLLISION
+        elif isinstance(cell, list):
+            self.collisions[index] = self.collision_cell(cell)
+            self.cells[index] = self.COLLISION
+        else:
+            self.cells[index] = self.car_index_of(cell)
+
+    def __delitem__(self, position: Tuple[int, int]) -> None:
+        if self[position] is not None:
+            self.vacate(*position)
+
+    def __contains__(self, position: object) -> bool:
+        try:
+            return self.cells[self._index(position)] != self.EMPTY
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        for index, car_index in enumerate(self.cells):
+            if car_index != self.EMPTY:
+                yield (index % self.width, index // self.width)
+
+    def __len__(self) -> int:
+        return sum(1 for car_index in self.cells if car_index != self.EMPTY)
+
+    def __repr__(self) -> str:
+        return f"GridOccupancy(width={self.width}, height={self.height}, occupied={len(self)})"
@@ -0,0 +1,274 @@
+import re
+from array import array
+from bisect import bisect_right
+from typing import List, Tuple, Union
+
+
+# Characters that only appear in run length encoded programs
+RUN_LENGTH_CHARS = frozenset('0123456789()')
+
+PROGRAM_TOKEN = re.compile(r'[LRF]|\(|\)|\d+')
+
+# Longest program an encoded program may expand to, 16 MiB of commands; longer routes belong in a scenario file,
+# which is memory mapped instead of expanded
+MAX_PROGRAM_LENGTH = 1 << 24
+
+# A run of moves or a run of other commands, which can only rotate the car
+COMMAND_RUN_PATTERN = re.compile(rb'F+|[^F]+')
+
+# Opcode of a run of moves in a compiled program; any other run is folded into its net number of clockwise
+# quarter turns, 0 to 3, the same codes the vectorized engine uses for single commands
+MOVE = 4
+FORWARD = ord('F')
+
+# Longest block of commands looked for by repeating_block, and how many commands a block must match at its next
+# repeat before it is compared in full
+MAX_BLOCK_LENGTH = 4096
+BLOCK_PROBE_LENGTH = 16
+
+
+def is_run_length_encoded(text: str) -> bool:
+    """Check if a program uses repeat counts or groups."""
+    return not RUN_LENGTH_CHARS.isdisjoint(text)
+
+
+def expand_program(text: str) -> bytes:
+    """Expand a run length encoded program such as F1000R(FFL)50 into plain commands.
+
+    A count repeats the command or parenthesised group right before it, and groups can be nested.
+    """
+    groups: List[List[bytes]] = [[]]
+    lengths: List[int] = [0]  # Commands in each open group so far, which never exceed MAX_PROGRAM_LENGTH
+    position = 0
+    counted = False  # A count cannot follow another count
+
+    while position < len(text):
+        token = PROGRAM_TOKEN.match(text, position)
+        if not token:
+            raise ValueError(f"Invalid program at position {position}.")
+        position = token.end()
+        value = token.group()
+
+        if value == '(':
+            groups.append([])
+            lengths.append(0)
+            counted = False
+        elif value == ')':
+            if len(groups) == 1:
+                raise ValueError(f"Invalid program at position {token.start()}: unmatched ')'.")
+            group = b''.join(groups.pop())
+            lengths.pop()
+            groups[-1].append(group)
+            lengths[-1] += len(group)
+            counted = False
+        elif value.isdigit():
+            if not groups[-1] or counted:
+                raise ValueError(f"Invalid program at position {token.start()}: count without a command.")
+            count = int(value)
+            last = len(groups[-1][-1])
+            lengths[-1] += last * (count - 1)
+            if lengths[-1] > MAX_PROGRAM_LENGTH:
+                raise ValueError("Program is too long.")
+            groups[-1][-1] *= count
+            counted = True
+        else:
+            groups[-1].append(value.encode('ascii'))
+            lengths[-1] += 1
+            counted = False
+
+        if lengths[-1] > MAX_PROGRAM_LENGTH:
+            raise ValueError("Program is too long.")
+
+    if len(groups) != 1:
+        raise ValueError("Invalid program: unmatched '('.")
+
+    return b''.join(groups[0])
+
+
+def last_move_end(program: Union[bytes, bytearray, memoryview], chunk_size: int = 1 << 20) -> int:
+    """Return the index just past the last F of a program, 0 if it has none; the commands after it only rotate."""
+    if not isinstance(program, memoryview):
+        return program.rfind(b'F') + 1
+
+    # Memory mapped programs are searched from the end, copying at most chunk_size bytes at a time
+    for end in range(len(program), 0, -chunk_size):
+        start = max(end - chunk_size, 0)
+        found = bytes(program[start:end]).rfind(b'F')
+        if found >= 0:
+            return start + found + 1
+    return 0
+
+
+def turn_from(program: Union[bytes, bytearray, memoryview], start: int, chunk_size: int = 1 << 20) -> int:
+    """Return the net number of clockwise quarter turns made by the commands of a program from start on."""
+    if not isinstance(program, memoryview):
+        return (program.count(b'R', start) - program.count(b'L', start)) & 3
+
+    # Memory mapped programs are counted copying at most chunk_size bytes at a time
+    turn = 0
+    for chunk_start in range(start, len(program), chunk_size):
+        turn += net_turn(bytes(program[chunk_start:chunk_start + chunk_size]))
+    return turn & 3
+
+
+def command_counts(program: Union[bytes, bytearray, memoryview], start: int, chunk_size: int = 1 << 20) -> Tuple[int, int]:
+    """Return how many moves and how many rotations the commands of a program from start on hold."""
+    if not isinstance(program, memoryview):
+        return program.count(b'F', start), program.count(b'L', start) + program.count(b'R', start)
+
+    # Memory mapped programs are counted copying at most chunk_size bytes at a time
+    moves = rotations = 0
+    for chunk_start in range(start, len(program), chunk_size):
+        chunk = bytes(program[chunk_start:chunk_start + chunk_size])
+        moves += chunk.count(b'F')
+        rotations += chunk.count(b'L') + chunk.count(b'R')
+    return moves, rotations
+
+
+def repeating_block(program: Union[bytes, bytearray, memoryview], start: int,
+                    max_length: int = MAX_BLOCK_LENGTH) -> Tuple[int, int]:
+    """Return the length of the shortest block of commands from start that the program repeats right after itself,
+    and how many times it runs back to back from start; (0, 0) if there is none.
+    """
+    head = bytes(program[start:start + 2 * max_length + BLOCK_PROBE_LENGTH])
+    probe = head[:min(BLOCK_PROBE_LENGTH, len(head) // 2)]
+    if not probe:
+        return 0, 0
+
+    # Only the places where the probe turns up again can start the next repeat of a block
+    length = head.find(probe, 1)
+    while 0 < length <= max_length:
+        if head[length:2 * length] == head[:length]:
+            return length, block_repeats(program, start, length)
+        length = head.find(probe, length + 1)
+    return 0, 0
+
+
+def block_repeats(program: Union[bytes, bytearray, memoryview], start: int, length: int) -> int:
+    """Return how many times the block of length commands from start runs back to back from start."""
+    end = len(program)
+    covered = length
+
+    # Double the stretch known to repeat the block while it is followed by a copy of itself, then add the halves
+    while start + 2 * covered <= end and program[start + covered:start + 2 * covered] == program[start:start + covered]:
+        covered *= 2
+    size = covered // 2
+    while size >= length:
+        if start + covered + size <= end and program[start + covered:start + covered + size] == program[start:start + size]:
+            covered += size
+        size //= 2
+    return covered // length
+
+
+def net_turn(commands: bytes) -> int:
+    """Return the net number of clockwise quarter turns, 0 to 3, made by a run of commands."""
+    return (commands.count(b'R') - commands.count(b'L')) & 3
+
+
+class CompiledProgram:
+    """A program compiled into runs of moves and runs of rotations folded into a single turn.
+
+    Run i covers the commands from ends[i - 1] (0 for the first run) up to ends[i] and has opcodes[i], MOVE or a
+    number of quarter turns. turns_after[i] holds the net turn of runs i onwards, so the orientation a car ends up
+    in once its moves are done is known without looking at the rest of its program. The program buffer itself is not
+    kept, so a compiled program never holds a memory mapped file open; the lookups that land part way into a run of
+    rotations take the program to read that part from.
+    """
+
+    __slots__ = ('opcodes', 'ends', 'turns_after', 'last_move_end')
+
+    def __init__(self, program: Union[bytes, bytearray, memoryview]) -> None:
+        """Compile a program buffer in one pass over its runs of commands."""
+        opcodes = bytearray()
+        ends = array('q')
+        last_move_end = 0
+
+        for run in COMMAND_RUN_PATTERN.finditer(program):
+            commands = run.group()
+            if commands[0] == FORWARD:
+                opcodes.append(MOVE)
+                last_move_end = run.end()
+            else:
+                opcodes.append(net_turn(commands))
+            ends.append(run.end())
+
+        turns_after = bytearray(len(opcodes) + 1)
+        for run_index in range(len(opcodes) - 1, -1, -1):
+            opcode = opcodes[run_index]
+            turns_after[run_index] = (turns_after[run_index + 1] + (opcode if opcode != MOVE else 0)) & 3
+
+        self.opcodes: bytes = bytes(opcodes)
+        self.ends: array = ends
+        self.turns_after: bytes = bytes(turns_after)
+        self.last_move_end: int = last_move_end  # Commands from here on can only rotate the car
+
+    def run_at(self, program: Union[bytes, bytearray, memoryview], program_counter: int) -> Tuple[int, int]:
+        """Return the opcode and the number of commands left of the run of program holding program_counter."""
+        run_index = bisect_right(self.ends, program_counter)
+        end = self.ends[run_index]
+        opcode = self.opcodes[run_index]
+
+        if opcode != MOVE and program_counter != (self.ends[run_index - 1] if run_index else 0):
+            # Part of the run was already executed, so its fold no longer applies
+            opcode = net_turn(bytes(program[program_counter:end]))
+        return opcode, end - program_counter
+
+    def turn_after(self, program: Union[bytes, bytearray, memoryview], program_counter: int) -> int:
+        """Return the net number of clockwise quarter turns made by the commands of program from program_counter on."""
+        if not self.ends or program_counter >= self.ends[-1]:
+            return 0
+
+        run_index = bisect_right(self.ends, program_counter)
+        if self.opcodes[run_index] == MOVE:
+            return self.turns_after[run_index + 1]
+        return (net_turn(bytes(program[program_counter:self.ends[run_index]])) + self.turns_after[run_index + 1]) & 3
+
+    def __len__(self) -> int:
+        return len(self.opcodes)
+
+    def __repr__(self) -> str:
+        return f"CompiledProgram(commands={self.ends[-1] if self.ends else 0}, runs={len(self)})"
+
+
+class ScannedProgram:
+    """Stands in for a CompiledProgram of a memory mapped program, finding the run at a program counter by scanning
+    the program from there instead of compiling all of it up front.
+
+    A route streamed from a scenario file can run to many millions of runs, which compiled would take several times
+    the memory of the file. Scanning reads chunks that start small and double up to chunk_size, so looking up a run
+    costs about its length, which is what the callers go on to skip.
+    """
+
+    __slots__ = ('chunk_size', 'last_move_end')
+
+    def __init__(self, program: memoryview, chunk_size: int = 1 << 20) -> None:
+        """Find the end of the last move of a program, the only thing known about it up front."""
+        self.chunk_size: int = chunk_size
+        self.last_move_end: int = last_move_end(program, chunk_size)  # Commands from here on can only rotate the car
+
+    def run_at(self, program: Union[bytes, bytearray, memoryview], program_counter: int) -> Tuple[int, int]:
+        """Return the opcode and the number of commands left of the run of program holding program_counter."""
+        moving = program[program_counter] == FORWARD
+        end, size, turn = program_counter, 64, 0
+
+        while end < len(program):
+            chunk = bytes(program[end:end + size])
+            if moving:
+                length = len(chunk) - len(chunk.lstrip(b'F'))
+            else:
+                length = chunk.find(b'F')
+                length = len(chunk) if length < 0 else length
+                turn += net_turn(chunk[:length])
+            end += length
+            if length < len(chunk):
+                break
+            size = min(2 * size, self.chunk_size)
+
+        return MOVE if moving else turn & 3, end - program_counter
+
+    def turn_after(self, program: Union[bytes, bytearray, memoryview], program_counter: int) -> int:
+        """Return the net number of clockwise quarter turns made by the commands of program from program_counter on."""
+        return turn_from(program, program_counter, self.chunk_size)
+
+    def __repr__(self) -> str:
+        return f"ScannedProgram(last_move_end={self.last_move_end})"
@@ -0,0 +1,296 @@
+import struct
+from array import array
+from bisect import bisect_right
+from typing import TYPE_CHECKING, BinaryIO, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .car import Car
+
+if TYPE_CHECKING:
+    from .simulation import Simulation
+
+
+# A recording file is a sequence of records, each a kind and a count followed by the record's columns in native
+# byte order: EVTS records hold the number of steps and then count events, KEYF records the step, the event index and
+# the state of count cars
+RECORD_HEADER = struct.Struct('<4sq')
+EVENTS_HEADER = struct.Struct('<q')
+KEYFRAME_HEADER = struct.Struct('<qq')
+EVENTS = b'EVTS'
+KEYFRAME = b'KEYF'
+
+# Columns as (name, array typecode). Events are stored step by step: each step with events once, with the end of its
+# events in the chunk, and each event as the car and one byte packing the command, whether the car moved and its
+# heading after the command, so an event takes 5 bytes
+STEP_COLUMNS: Tuple[Tuple[str, str], ...] = (('steps', 'q'), ('step_ends', 'q'))
+EVENT_COLUMNS: Tuple[Tuple[str, str], ...] = (('cars', 'I'), ('codes', 'B'))
+KEYFRAME_COLUMNS: Tuple[Tuple[str, str], ...] = (('xs', 'q'), ('ys', 'q'), ('headings', 'B'))
+
+# Bits of an event code: the heading in the lowest two, then whether the car moved, then the command. Any command
+# other than F, L and R does nothing, and is recorded as '?', the command unknown characters are encoded as
+MOVED = 4
+COMMAND_SHIFT = 3
+COMMANDS = b'FLR?'
+OTHER_COMMAND = len(COMMANDS) - 1
+COMMAND_INDEX: Dict[int, int] = {command: command_index for command_index, command in enumerate(COMMANDS)}
+
+
+def pack_event(command: int, moved: bool, heading: int) -> int:
+    """Return the code of an event: the command byte executed, whether it moved the car and the heading after it."""
+    return COMMAND_INDEX.get(command, OTHER_COMMAND) << COMMAND_SHIFT | (MOVED if moved else 0) | heading
+
+
+def unpack_event(code: int) -> Tuple[int, bool, int]:
+    """Return the command byte, whether the car moved and the heading after it of an event code."""
+    return COMMANDS[code >> COMMAND_SHIFT], bool(code & MOVED), code & 3
+
+
+class Keyframe(NamedTuple):
+    """The state of every car at the end of a step, and the number of events recorded up to then."""
+
+    step: int
+    event_index: int
+    xs: array
+    ys: array
+    headings: array
+
+
+class CarState(NamedTuple):
+    """Where a car was and which way it faced."""
+
+    x: int
+    y: int
+    orientation: str
+
+
+class TrajectoryRecorder:
+    """Records every command the cars of a simulation execute, for replay and audit.
+
+    Each executed command is an event of the car index and a code packing the command, whether the car moved and
+    its heading after it; positions follow from the moves. The steps are stored once each, with the end of their
+    events, rather than with every event. Every keyframe_interval steps the state of every car is stored as a
+    keyframe, so a reader only replays the events since the nearest keyframe. With a path, events are spilled to the
+    file every chunk_events events, along with the keyframes, and the file can be read back with
+    TrajectoryReader.open once the recorder is closed.
+    """
+
+    def __init__(self, keyframe_interval: int = 1024, path: Optional[str] = None, chunk_events: int = 1 << 20) -> None:
+        """Initialize an empty recorder; start attaches it to a simulation."""
+        if not isinstance(keyframe_interval, int) or keyframe_interval <= 0:
+            raise ValueError("Keyframe interval must be a positive integer.")
+
+        if not isinstance(chunk_events, int) or chunk_events <= 0:
+            raise ValueError("Chunk size must be a positive integer.")
+
+        self.keyframe_interval: int = keyframe_interval
+        self.chunk_events: int = chunk_events
+        self.path: Optional[str] = path
+        self.file: Optional[BinaryIO] = open(path, 'wb') if path else None
+
+        self.columns: Dict[str, array] = {name: array(typecode) for name, typecode in STEP_COLUMNS + EVENT_COLUMNS}
+        self.steps, self.step_ends, self.cars, self.codes = self.columns.values()
+        self.keyframes: List[Keyframe] = []
+        self.spilled: int = 0  # Events already written to the file
+
+        # Where every car was after its last event, to tell whether the next one moved it
+        self.xs: array = array('q')
+        self.ys: array = array('q')
+
+    @property
+    def event_count(self) -> int:
+        """Return the number of events recorded so far."""
+        return self.spilled + len(self.cars)
+
+    def start(self, simulation: 'Simulation') -> None:
+        """Store the first keyframe; cars must all be added by now."""
+        self.take_keyframe(simulation)
+        self.xs, self.ys = array('q', self.keyframes[-1].xs), array('q', self.keyframes[-1].ys)
+
+    def record(self, step: int, car_index: int, opcode: int, x: int, y: int, heading: int) -> None:
+        """Append the event of a car executing a command."""
+        code = COMMAND_INDEX.get(opcode, OTHER_COMMAND) << COMMAND_SHIFT | heading
+        if x != self.xs[car_index] or y != self.ys[car_index]:
+            self.xs[car_index], self.ys[car_index] = x, y
+            code |= MOVED
+
+        self.cars.append(car_index)
+        self.codes.append(code)
+        if self.steps and self.steps[-1] == step:
+            self.step_ends[-1] += 1
+        else:
+            self.steps.append(step)
+            self.step_ends.append(len(self.cars))
+
+    def end_step(self, simulation: 'Simulation') -> None:
+        """Store a keyframe when one is due, and spill the events once there are enough of them."""
+        if simulation.step % self.keyframe_interval == 0:
+            self.take_keyframe(simulation)
+
+        if self.file is not None and len(self.cars) >= self.chunk_events:
+            self.spill()
+
+    def take_keyframe(self, simulation: 'Simulation') -> None:
+        """Store the state of every car at the current step."""
+        cars = [simulation.cars[car_index] for car_index in range(len(simulation.cars))]
+        keyframe = Keyframe(
+            simulation.step, self.event_count,
+            array('q', [car.x for car in cars]), array('q', [car.y for car in cars]), array('B', [car.heading for car in cars]),
+        )
+        self.keyframes.append(keyframe)
+
+        if self.file is not None:
+            self.file.write(RECORD_HEADER.pack(KEYFRAME, len(cars)))
+            self.file.write(KEYFRAME_HEADER.pack(keyframe.step, keyframe.event_index))
+            for name, _ in KEYFRAME_COLUMNS:
+                getattr(keyframe, name).tofile(self.file)
+
+    def spill(self) -> None:
+        """Write the events held in memory to the file and drop them from memory."""
+        if not self.cars:
+            return
+
+        self.file.write(RECORD_HEADER.pack(EVENTS, len(self.cars)))
+        self.file.write(EVENTS_HEADER.pack(len(self.steps)))
+        for column in self.columns.values():
+            column.tofile(self.file)
+
+        self.spilled += len(self.cars)
+        for column in self.columns.values():
+            del column[:]
+
+    def close(self) -> None:
+        """Write the remaining events and close the file, if any."""
+        if self.file is not None:
+            self.spill()
+            self.file.close()
+            self.file = None
+
+    def reader(self) -> 'TrajectoryReader':
+        """Return a reader over everything recorded so far; a recorder with a file is closed first."""
+        if self.path:
+            self.close()
+            return TrajectoryReader.open(self.path)
+
+        chunk = {name: np.array(column, dtype=typecode) for (name, typecode), column in zip(STEP_COLUMNS + EVENT_COLUMNS, self.columns.values())}
+        return TrajectoryReader(self.keyframes, [chunk] if self.cars else [])
+
+    def __repr__(self) -> str:
+        return f"TrajectoryRecorder(events={self.event_count}, keyframes={len(self.keyframes)}, path={self.path!r})"
+
+
+class TrajectoryReader:
+    """Reconstructs the state of any car at any recorded step.
+
+    The nearest keyframe at or before the step and the last event up to the step are both found by binary search, and
+    the moves of the car among the events between them are added to its keyframe position, so a lookup costs
+    O(log steps) plus at most one keyframe interval of events.
+    """
+
+    def __init__(self, keyframes: List[Keyframe], chunks: List[Dict[str, np.ndarray]]) -> None:
+        """Initialize a reader over keyframes in step order and chunks of events in event order."""
+        self.keyframes: List[Keyframe] = keyframes
+        self.keyframe_steps: List[int] = [keyframe.step for keyframe in keyframes]
+        self.chunks: List[Dict[str, np.ndarray]] = chunks
+        self.chunk_first_steps: List[int] = [int(chunk['steps'][0]) for chunk in chunks]
+        self.chunk_starts: List[int] = []
+
+        start = 0
+        for chunk in chunks:
+            self.chunk_starts.append(start)
+            start += len(chunk['cars'])
+        self.event_count: int = start
+
+    @classmethod
+    def open(cls, path: str) -> 'TrajectoryReader':
+        """Open a recording file written by a TrajectoryRecorder; event columns are memory mapped, not read."""
+        with open(path, 'rb') as file:
+            size = file.seek(0, 2)
+        data = np.memmap(path, dtype=np.uint8, mode='r') if size else np.zeros(0, dtype=np.uint8)
+
+        keyframes: List[Keyframe] = []
+        chunks: List[Dict[str, np.ndarray]] = []
+        offset = 0
+
+        while offset < size:
+            kind, count = RECORD_HEADER.unpack_from(data, offset)
+            offset += RECORD_HEADER.size
+
+            if kind == EVENTS:
+                header: Tuple[int, ...] = EVENTS_HEADER.unpack_from(data, offset)
+                offset += EVENTS_HEADER.size
+                columns = [(name, typecode, header[0]) for name, typecode in STEP_COLUMNS]
+                columns += [(name, typecode, count) for name, typecode in EVENT_COLUMNS]
+            elif kind == KEYFRAME:
+                header = KEYFRAME_HEADER.unpack_from(data, offset)
+                offset += KEYFRAME_HEADER.size
+                columns = [(name, typecode, count) for name, typecode in KEYFRAME_COLUMNS]
+            else:
+                raise ValueError("Not a trajectory recording.")
+
+            values = {}
+            for name, typecode, length in columns:
+                values[name] = np.frombuffer(data, dtype=typecode, count=length, offset=offset)
+                offset += length * values[name].itemsize
+
+            if kind == EVENTS:
+                chunks.append(values)
+            else:
+                keyframes.append(Keyframe(*header, values['xs'], values['ys'], values['headings']))
+
+        return cls(keyframes, chunks)
+
+    def event_end(self, step: int) -> int:
+        """Return the index of the first event after the given step."""
+        chunk_index = bisect_right(self.chunk_first_steps, step) - 1
+        if chunk_index < 0:
+            return 0
+
+        chunk = self.chunks[chunk_index]
+        steps = int(np.searchsorted(chunk['steps'], step, side='right'))
+        return self.chunk_starts[chunk_index] + int(chunk['step_ends'][steps - 1])
+
+    def car_codes(self, car_index: int, start: int, end: int) -> np.ndarray:
+        """Return the codes of the events of a car among events start to end, in event order."""
+        codes = []
+        for chunk_index in range(max(bisect_right(self.chunk_starts, start) - 1, 0), len(self.chunks)):
+            chunk, chunk_start = self.chunks[chunk_index], self.chunk_starts[chunk_index]
+            if chunk_start >= end:
+                break
+
+            low, high = max(start - chunk_start, 0), min(end - chunk_start, len(chunk['cars']))
+            codes.append(chunk['codes'][low:high][chunk['cars'][low:high] == car_index])
+
+        return np.concatenate(codes) if codes else np.zeros(0, dtype=np.uint8)
+
+    def state_at(self, car_index: int, step: int) -> CarState:
+        """Return the state of a car at the end of a step."""
+        keyframe_index = bisect_right(self.keyframe_steps, step) - 1
+        if keyframe_index < 0:
+            raise ValueError("Step is before the recording started.")
+
+        keyframe = self.keyframes[keyframe_index]
+        if not 0 <= car_index < len(keyframe.xs):
+            raise ValueError("Car was not recorded.")
+
+        x, y, heading = int(keyframe.xs[car_index]), int(keyframe.ys[car_index]), int(keyframe.headings[car_index])
+
+        codes = self.car_codes(car_index, keyframe.event_index, self.event_end(step))
+        if codes.size:
+            headings = codes[(codes & MOVED) != 0] & 3
+            x += int(np.take(Car.DELTA_X, headings).sum())
+            y += int(np.take(Car.DELTA_Y, headings).sum())
+            heading = int(codes[-1]) & 3
+
+        return CarState(x, y, Car.ORIENTATIONS[heading])
+
+    def position_at(self, car_index: int, step: int) -> Tuple[int, int]:
+        """Return the position of a car at the end of a step."""
+        state = self.state_at(car_index, step)
+        return state.x, state.y
+
+    def __len__(self) -> int:
+        return self.event_count
+
+    def __repr__(self) -> str:
+        return f"TrajectoryReader(events={self.event_count}, keyframes={len(self.keyframes)})"
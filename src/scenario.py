@@ -0,0 +1,193 @@
+import mmap
+import re
+from typing import Iterable, Optional, Tuple, Union
+
+from .car import Car
+from .simulation import Simulation
+
+
+FIELD_PATTERN = re.compile(r'^\d+\s+\d+$')
+POSITION_PATTERN = re.compile(r'^\d+\s+\d+\s+[NESW]$')
+INSTRUCTIONS_PATTERN = re.compile(r'^[LRF]*$')
+
+# One car per line: name, x y Direction, then the optional commands
+CAR_LINE_PATTERN = re.compile(r'^(?P<name>.+?)\s+(?P<position>\d+\s+\d+\s+[A-Za-z]\S*)(?:\s+(?P<instructions>\S+))?$')
+CAR_HEAD_PATTERN = re.compile(r'^(?P<name>.+?)\s+(?P<position>\d+\s+\d+\s+[A-Za-z]\S*)$')
+
+# Commands of streamed scenarios are validated this many bytes at a time
+VALIDATION_CHUNK_SIZE = 1 << 20
+WHITESPACE = frozenset(b' \t\r\n\x0b\x0c')
+
+# First bytes of a binary scenario file, the MAGIC of shared_state
+BINARY_MAGIC = b'CARSTATE'
+
+
+def parse_field_size(text: str) -> Tuple[int, int]:
+    """Parse a field size in x y format."""
+    if not FIELD_PATTERN.match(text):
+        raise ValueError("Invalid input. Please enter two positive integers separated by a space.")
+
+    width, height = map(int, text.split())
+    if width <= 0 or height <= 0:
+        raise ValueError("Width and height must be positive integers.")
+    return width, height
+
+
+def parse_car_name(text: str) -> str:
+    """Parse a car name."""
+    name = text.strip()
+    if not name:
+        raise ValueError("Car name cannot be empty.")
+    return name
+
+
+def parse_position_and_orientation(text: str) -> Tuple[Tuple[int, int], str]:
+    """Parse a car's initial position and orientation in x y Direction format."""
+    text = text.strip()
+    if not POSITION_PATTERN.match(text):
+        raise ValueError("Invalid input. Please enter in x y Direction format where Direction is one of N, E, S, W.")
+
+    x, y, direction = text.split()
+    return (int(x), int(y)), direction
+
+
+def parse_instructions(text: str) -> str:
+    """Parse a car's commands, which may only contain L, R and F."""
+    instructions = text.strip()
+    if not INSTRUCTIONS_PATTERN.match(instructions):
+        raise ValueError("Invalid command. Only 'L', 'R', and 'F' are allowed.")
+    return instructions
+
+
+def decode_text(buffer: memoryview) -> str:
+    """Decode a field size or car name and position of a streamed scenario, which may be any UTF-8 text."""
+    try:
+        return str(buffer, 'utf-8')
+    except UnicodeDecodeError:
+        raise ValueError("Invalid text. Scenario files must be UTF-8 encoded.")
+
+
+def validate_instructions_buffer(buffer: memoryview, chunk_size: int = VALIDATION_CHUNK_SIZE) -> None:
+    """Check that a command buffer only contains L, R and F, copying at most chunk_size bytes at a time."""
+    for start in range(0, len(buffer), chunk_size):
+        if bytes(buffer[start:start + chunk_size]).translate(None, b'LRF'):
+            raise ValueError("Invalid command. Only 'L', 'R', and 'F' are allowed.")
+
+
+def add_car_from_parts(simulation: Simulation, name: str, position: str, instructions: Union[str, memoryview]) -> None:
+    """Validate the parts of a scenario car line and add the car to the simulation."""
+    name = parse_car_name(name)
+    position, orientation = parse_position_and_orientation(position)
+    simulation.add_car(Car(name=name, position=position, orientation=orientation, instructions=instructions))
+
+
+def parse_scenario(lines: Iterable[str]) -> Simulation:
+    """Build a simulation from scenario lines in one pass.
+
+    The first line holds the field size in x y format and every following line one car as
+    "name x y Direction commands". Blank lines and lines starting with # are ignored.
+    """
+    simulation = None
+
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+
+        try:
+            if simulation is None:
+                simulation = Simulation(field_size=parse_field_size(line))
+                continue
+
+            match = CAR_LINE_PATTERN.match(line)
+            if not match:
+                raise ValueError("Invalid car. Please enter name x y Direction commands.")
+
+            instructions = parse_instructions(match.group('instructions') or "")
+            add_car_from_parts(simulation, match.group('name'), match.group('position'), instructions)
+        except ValueError as e:
+            raise ValueError(f"Line {line_number}: {e}")
+
+    if simulation is None:
+        raise ValueError("Scenario is missing the field size.")
+
+    return simulation
+
+
+def stream_scenario(path: str) -> Simulation:
+    """Build a simulation from a scenario file without reading the commands into memory.
+
+    The file is memory mapped and each car's program is a memoryview into the mapping, so multi-megabyte routes are
+    validated chunk by chunk and executed straight from the page cache. Accepts the same format as parse_scenario.
+    """
+    with open(path, 'rb') as file:
+        try:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise ValueError("Scenario is missing the field size.")  # Empty files cannot be mapped
+
+    buffer = memoryview(mapped)
+    simulation: Optional[Simulation] = None
+    line_number = 0
+    start = 0
+
+    while start < len(buffer):
+        end = mapped.find(b'\n', start)
+        if end == -1:
+            end = len(buffer)
+        next_start = end + 1
+        line_number += 1
+
+        while start < end and buffer[start] in WHITESPACE:
+            start += 1
+        while end > start and buffer[end - 1] in WHITESPACE:
+            end -= 1
+
+        if start < end and buffer[start] != ord('#'):
+            try:
+                if simulation is None:
+                    simulation = Simulation(field_size=parse_field_size(decode_text(buffer[start:end])))
+                else:
+                    add_streamed_car(simulation, mapped, buffer, start, end)
+            except ValueError as e:
+                raise ValueError(f"Line {line_number}: {e}")
+
+        start = next_start
+
+    if simulation is None:
+        raise ValueError("Scenario is missing the field size.")
+
+    return simulation
+
+
+def add_streamed_car(simulation: Simulation, mapped: mmap.mmap, buffer: memoryview, start: int, end: int) -> None:
+    """Add the car on buffer[start:end], keeping its commands as a view into the buffer.
+
+    Only the name and position are decoded, as UTF-8; the commands stay bytes and are checked byte by byte.
+    """
+    split = max(mapped.rfind(b' ', start, end), mapped.rfind(b'\t', start, end))
+    head = CAR_HEAD_PATTERN.match(decode_text(buffer[start:split]).strip()) if split > start else None
+
+    if head:
+        instructions = buffer[split + 1:end]
+        validate_instructions_buffer(instructions)
+        add_car_from_parts(simulation, head.group('name'), head.group('position'), instructions)
+        return
+
+    # Without commands the last token is the direction, so the whole line is short
+    match = CAR_LINE_PATTERN.match(decode_text(buffer[start:end])) if end - split <= 2 else None
+    if not match or match.group('instructions'):
+        raise ValueError("Invalid car. Please enter name x y Direction commands.")
+
+    add_car_from_parts(simulation, match.group('name'), match.group('position'), "")
+
+
+def load_scenario(path: str) -> Simulation:
+    """Build a simulation from a scenario file, in the text format or the binary format of binary_scenario."""
+    with open(path, 'rb') as file:
+        binary = file.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+    if binary:
+        from .binary_scenario import load_binary  # NumPy is only needed for binary scenarios
+        return load_binary(path)
+    return stream_scenario(path)
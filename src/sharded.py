@@ -0,0 +1,199 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, List, NamedTuple, Optional, Tuple, Type
+
+import numpy as np
+
+from .car import Car
+from .event_driven import build_trajectory
+from .simulation import Simulation
+from .shared_state import SharedCarState
+from .spatial_index import Box, SpatialIndex, merge_boxes
+from .vectorized import COMMAND_CODES, DELTA_X, DELTA_Y, FORWARD
+
+
+class Shard(NamedTuple):
+    """The cars of one stripe of the field, as rows of a shared car state, to be run on their own by engine for a
+    number of steps, or until they finish if None.
+    """
+
+    state_name: str
+    car_indices: List[int]
+    engine: Type[Simulation]
+    steps: Optional[int] = None
+
+
+def run_shard(shard: Shard) -> int:
+    """Run the cars of a shard, write their state back to the shared car state and return the last step run."""
+    state = SharedCarState.attach(shard.state_name)
+    try:
+        simulation = shard.engine.import_state(state, shard.car_indices)
+        starts = [car.program_counter for car in simulation.cars.values()]
+        if shard.steps is not None:
+            # A car runs one command per step, so a run of the commands that fit in the slice stops where it ends
+            for car, start in zip(simulation.cars.values(), starts):
+                car.program, car.program_counter = car.program[start:start + shard.steps], 0
+
+        simulation.run_simulation()
+
+        if shard.steps is not None:
+            for car, start in zip(simulation.cars.values(), starts):
+                car.program_counter += start
+        state.write_cars(simulation, shard.car_indices)
+        state.detach(simulation)
+    finally:
+        state.close()
+    return simulation.step
+
+
+class ShardedSimulation(Simulation):
+    """Simulation backend that splits the field into vertical stripes and runs every stripe in its own process.
+
+    Cars can only ever meet where the paths they would drive on their own cross, and a collision only cuts a path
+    short, so cars are grouped by crossing paths and groups never affect each other. Whole routes soon cross on a
+    busy field, so the run goes a slice of SLICE_STEPS steps at a time and only the paths within the slice are
+    grouped, regrouping the cars where they are at the start of every slice. Each stripe runs the groups that stay
+    inside it in a worker process, and the coordinating process runs the few groups that cross a stripe border while
+    the workers are busy. Workers attach to a SharedCarState instead of receiving pickled cars, and write their
+    results to disjoint rows of it. Every shard is an ordinary engine run, so collision steps and final states are
+    identical to Simulation.
+    """
+
+    # Tile size of the spatial index used to group cars
+    TILE_SIZE: int = 64
+    # Steps run between regrouping the cars
+    SLICE_STEPS: int = 512
+
+    def __init__(self, field_size: Tuple[int, int], occupancy: Optional[str] = None, workers: Optional[int] = None,
+                 engine: Type[Simulation] = Simulation) -> None:
+        """Initialize the simulation; workers is the number of stripes and processes, by default one per CPU."""
+        super().__init__(field_size, occupancy)
+
+        if workers is not None and workers < 1:
+            raise ValueError("Workers must be a positive integer.")
+
+        self.workers: Optional[int] = workers
+        self.engine: Type[Simulation] = engine
+
+    def footprint(self, car: Car, size: int, steps: Optional[int] = None) -> List[Box]:
+        """Return boxes covering every cell a car drives over if nothing gets in its way, within the given number of
+        steps if any, each of at most size x size cells where the route allows.
+
+        The route is a cumulative sum of the moves, computed in bulk; routes that reach the boundary, where moves stop
+        counting, are traced run by run instead.
+        """
+        if car.collision or not car.has_instructions():
+            return [(car.x, car.y, car.x, car.y)]
+
+        end = len(car.program) if steps is None else car.program_counter + steps
+        codes = np.frombuffer(bytes(car.program[car.program_counter:end]).translate(COMMAND_CODES), dtype=np.uint8)
+        forward = codes == FORWARD
+        headings = (car.heading + np.cumsum(np.where(forward, 0, codes))) & 3
+        xs = car.x + np.cumsum(np.where(forward, DELTA_X[headings], 0))
+        ys = car.y + np.cumsum(np.where(forward, DELTA_Y[headings], 0))
+
+        min_x, max_x, min_y, max_y = int(xs.min()), int(xs.max()), int(ys.min()), int(ys.max())
+        if min_x < 0 or min_y < 0 or max_x >= self.field.width or max_y >= self.field.height:
+            return build_trajectory(self, car, end).footprint(size)
+
+        if max_x - min_x < size and max_y - min_y < size:
+            return [(min(min_x, car.x), min(min_y, car.y), max(max_x, car.x), max(max_y, car.y))]
+
+        # Blocks of size commands cover at most size cells in each direction
+        starts = np.arange(0, len(codes), size)
+        boxes = zip(
+            np.minimum.reduceat(xs, starts).tolist(), np.minimum.reduceat(ys, starts).tolist(),
+            np.maximum.reduceat(xs, starts).tolist(), np.maximum.reduceat(ys, starts).tolist(),
+        )
+        return merge_boxes([(car.x, car.y, car.x, car.y), *boxes], size)
+
+    def find_groups(self, steps: Optional[int] = None) -> List[Tuple[List[int], int, int]]:
+        """Group cars whose paths cross within the given number of steps, or ever if None, directly or through other
+        cars, as (car indices, min x, max x) per group.
+        """
+        index = SpatialIndex(self.TILE_SIZE)
+        parents = list(range(len(self.cars)))
+
+        def find(car_index: int) -> int:
+            """Return the representative of a car's group."""
+            while parents[car_index] != car_index:
+                parents[car_index] = parents[parents[car_index]]
+                car_index = parents[car_index]
+            return car_index
+
+        spans: List[Tuple[int, int]] = []
+        for car_index in range(len(self.cars)):
+            boxes = self.footprint(self.cars[car_index], index.tile_size, steps)
+            for box in boxes:
+                for other in index.query(*box):
+                    parents[find(other)] = find(car_index)
+            for box in boxes:
+                index.add(car_index, *box)
+            spans.append((min(box[0] for box in boxes), max(box[2] for box in boxes)))
+
+        groups: Dict[int, Tuple[List[int], int, int]] = {}
+        for car_index, (min_x, max_x) in enumerate(spans):
+            cars, group_min_x, group_max_x = groups.get(find(car_index), ([], min_x, max_x))
+            cars.append(car_index)
+            groups[find(car_index)] = (cars, min(group_min_x, min_x), max(group_max_x, max_x))
+
+        return list(groups.values())
+
+    def partition(self, stripes: int, steps: Optional[int] = None) -> Tuple[List[List[int]], List[int]]:
+        """Split the cars into one list per stripe and a list of cars in groups that cross stripe borders, grouping
+        them by their paths within the given number of steps if any. Groups without an active car are left out.
+        """
+        stripe_width = -(-self.field.width // stripes)
+        shards: List[List[int]] = [[] for _ in range(stripes)]
+        crossing: List[int] = []
+
+        for cars, min_x, max_x in self.find_groups(steps):
+            if not any(self.is_active(car_index) for car_index in cars):
+                continue
+            if min_x // stripe_width == max_x // stripe_width:
+                shards[min_x // stripe_width].extend(cars)
+            else:
+                crossing.extend(cars)
+
+        return [sorted(cars) for cars in shards], sorted(crossing)
+
+    def run_simulation(self) -> None:
+        """Run the simulation with one process per stripe of the field, a slice of steps at a time."""
+        if self.recorder is not None:
+            return super().run_simulation()  # Recording needs every command executed one at a time
+
+        self.select_occupancy()
+        self.refresh_active_cars()
+
+        workers = self.workers or os.cpu_count() or 1
+        state = self.export_state()
+
+        try:
+            with ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext() as executor:
+                while self.active_cars:
+                    self.run_slice(state, executor, workers)
+                    state.read_cars(self)
+                    self.refresh_active_cars()
+        finally:
+            state.close()
+            state.unlink()
+
+        self.active_cars = []
+
+    def run_slice(self, state: SharedCarState, executor: Optional[ProcessPoolExecutor], workers: int) -> None:
+        """Run the next SLICE_STEPS steps of every group with an active car, writing the cars to the shared car state."""
+        shards, crossing = self.partition(workers, self.SLICE_STEPS)
+        state.header['step'] = self.step
+
+        jobs = [Shard(state.name, cars, self.engine, self.SLICE_STEPS) for cars in shards if cars]
+        coordinator_job = Shard(state.name, crossing, self.engine, self.SLICE_STEPS) if crossing else None
+
+        if executor is None or len(jobs) <= 1:
+            steps = [run_shard(job) for job in jobs + ([coordinator_job] if coordinator_job else [])]
+        else:
+            futures = [executor.submit(run_shard, job) for job in jobs]
+            steps = [run_shard(coordinator_job)] if coordinator_job else []
+            steps += [future.result() for future in futures]
+
+        self.step = max([self.step] + steps)
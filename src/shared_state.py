@@ -0,0 +1,269 @@
+import mmap
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Type, Union
+
+import numpy as np
+
+from .car import Car
+from .simulation import Simulation
+
+
+# Anything exposing writable bytes: a shared memory block, a memory mapped file or a bytearray
+Buffer = Union[memoryview, bytearray, mmap.mmap]
+
+MAGIC = b'CARSTATE'
+LAYOUT_VERSION = 1
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'), ('version', '<i8'), ('width', '<i8'), ('height', '<i8'), ('step', '<i8'),
+    ('count', '<i8'), ('programs_size', '<i8'), ('names_size', '<i8'),
+])
+
+# One row per car. partner is the index of the collision partner or -1, and entered tells whether the car drove into
+# its collision cell; program and name rows point into the blobs that follow the table
+CAR_DTYPE = np.dtype([
+    ('x', '<i8'), ('y', '<i8'), ('program_counter', '<i8'), ('partner', '<i8'), ('collision_step', '<i8'),
+    ('program_offset', '<i8'), ('program_length', '<i8'), ('name_offset', '<i8'), ('name_length', '<i8'),
+    ('heading', 'u1'), ('entered', 'u1'),
+], align=True)
+
+
+class CarStateBuffer:
+    """Car state laid out as NumPy structured arrays over one buffer.
+
+    The buffer holds a header, a table with one CAR_DTYPE row per car, every UTF-8 name concatenated into a string
+    table and every program concatenated into an instruction blob. The table rows point into the string table and
+    the instruction blob with offsets and lengths. The same layout is used in shared memory and in files.
+    """
+
+    def __init__(self, buffer: Buffer) -> None:
+        """Initialize the arrays over a buffer that holds a car state."""
+        buffer = memoryview(buffer)
+        if buffer.nbytes < HEADER_DTYPE.itemsize:
+            raise ValueError("Buffer does not hold a car state.")
+
+        self.buffer: memoryview = buffer
+        self.header: np.ndarray = np.ndarray((), dtype=HEADER_DTYPE, buffer=buffer)
+
+        if self.header['magic'].item() != MAGIC or int(self.header['version']) != LAYOUT_VERSION:
+            raise ValueError("Buffer does not hold a car state.")
+
+        count, names_size, programs_size = (int(self.header[name]) for name in ('count', 'names_size', 'programs_size'))
+        names_start = HEADER_DTYPE.itemsize + count * CAR_DTYPE.itemsize
+        programs_start = names_start + names_size
+
+        # A truncated buffer would otherwise only fail once the arrays over it are built, with a TypeError
+        if min(count, names_size, programs_size) < 0 or buffer.nbytes < programs_start + programs_size:
+            raise ValueError("Buffer does not hold a car state.")
+
+        self.cars: np.ndarray = np.ndarray((count,), dtype=CAR_DTYPE, buffer=buffer, offset=HEADER_DTYPE.itemsize)
+        self.names: memoryview = buffer[names_start:programs_start]
+        self.programs: memoryview = buffer[programs_start:programs_start + programs_size]
+
+    @property
+    def step(self) -> int:
+        """Return the simulation step the state was taken at."""
+        return int(self.header['step'])
+
+    @staticmethod
+    def layout_size(simulation: Simulation) -> int:
+        """Return the number of bytes needed to hold the state of a simulation."""
+        cars = simulation.cars.values()
+        return (HEADER_DTYPE.itemsize + len(cars) * CAR_DTYPE.itemsize
+                + sum(len(car.name.encode('utf-8')) for car in cars) + sum(len(car.program) for car in cars))
+
+    @classmethod
+    def write_layout(cls, buffer: Buffer, simulation: Simulation) -> 'CarStateBuffer':
+        """Write the state of every car in a simulation to a buffer of at least layout_size bytes."""
+        cars = [simulation.cars[car_index] for car_index in range(len(simulation.cars))]
+        names = [car.name.encode('utf-8') for car in cars]
+        program_lengths = [len(car.program) for car in cars]
+
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=buffer)
+        header['magic'], header['version'] = MAGIC, LAYOUT_VERSION
+        header['width'], header['height'], header['step'] = simulation.field.width, simulation.field.height, simulation.step
+        header['count'] = len(cars)
+        header['programs_size'], header['names_size'] = sum(program_lengths), sum(len(car_name) for car_name in names)
+        del header
+
+        state = cls(buffer)
+        table = state.cars
+        table['program_length'] = program_lengths
+        table['name_length'] = [len(car_name) for car_name in names]
+        if cars:
+            table['program_offset'][1:] = np.cumsum(table['program_length'])[:-1]
+            table['name_offset'][1:] = np.cumsum(table['name_length'])[:-1]
+
+        for (offset, length), car in zip(table[['program_offset', 'program_length']].tolist(), cars):
+            state.programs[offset:offset + length] = car.program
+        state.names[:] = b''.join(names)
+
+        state.write_cars(simulation, range(len(cars)))
+        return state
+
+    def program(self, car_index: int) -> memoryview:
+        """Return the program of a car as a view into the buffer."""
+        offset, length = int(self.cars['program_offset'][car_index]), int(self.cars['program_length'][car_index])
+        return self.programs[offset:offset + length]
+
+    def car_name(self, car_index: int) -> str:
+        """Return the name of a car."""
+        offset, length = int(self.cars['name_offset'][car_index]), int(self.cars['name_length'][car_index])
+        return str(self.names[offset:offset + length], 'utf-8')
+
+    def car_names(self) -> List[str]:
+        """Return the names of every car, in car index order."""
+        names = bytes(self.names)
+        return [str(names[offset:offset + length], 'utf-8') for offset, length in self.cars[['name_offset', 'name_length']].tolist()]
+
+    def car(self, car_index: int) -> Car:
+        """Build the Car of one row, without its collision partner, running its program from the buffer."""
+        x, y, heading, program_counter, partner, collision_step = self.cars[car_index][
+            ['x', 'y', 'heading', 'program_counter', 'partner', 'collision_step']
+        ].tolist()
+        car = Car(name=self.car_name(car_index), position=(x, y), orientation='N', instructions=self.program(car_index))
+        car.heading = heading
+        car.program_counter = program_counter
+        if partner >= 0:
+            car.collision_step = collision_step
+        return car
+
+    def to_simulation(self, simulation_class: Type[Simulation] = Simulation,
+                      car_indices: Optional[Sequence[int]] = None) -> Simulation:
+        """Build a simulation from the state of all cars, or of the selected cars in the order given.
+
+        The programs of the new cars are views into the buffer, so it must stay open while they are in use.
+        Collision partners of the selected cars must be selected as well.
+        """
+        car_indices = range(len(self.cars)) if car_indices is None else car_indices
+        simulation = simulation_class(field_size=(int(self.header['width']), int(self.header['height'])))
+        simulation.step = self.step
+
+        rows = self.cars[np.asarray(car_indices, dtype=np.int64)]
+        local_index_of: Dict[int, int] = {car_index: local_index for local_index, car_index in enumerate(car_indices)}
+
+        for local_index, (car_index, x, y, heading, program_counter) in enumerate(zip(
+            car_indices, rows['x'].tolist(), rows['y'].tolist(), rows['heading'].tolist(), rows['program_counter'].tolist()
+        )):
+            car = Car(name=self.car_name(car_index), position=(x, y), orientation='N', instructions=self.program(car_index))
+            car.heading = heading
+            car.program_counter = program_counter
+            simulation.cars[local_index] = car
+            simulation.car_names.add(car.name)
+
+        entering = []
+        for local_index in np.flatnonzero(rows['partner'] >= 0).tolist():
+            partner = int(rows['partner'][local_index])
+            if partner not in local_index_of:
+                raise ValueError("Collision partner not in the selected cars.")
+            simulation.cars[local_index].collision = simulation.cars[local_index_of[partner]]
+            simulation.cars[local_index].collision_step = int(rows['collision_step'][local_index])
+            if rows['entered'][local_index]:
+                entering.append(local_index)
+
+        simulation.rebuild_cars_in_field(
+            sorted(entering, key=lambda local_index: (simulation.cars[local_index].collision_step, local_index))
+        )
+        return simulation
+
+    def write_cars(self, simulation: Simulation, car_indices: Sequence[int]) -> None:
+        """Store the state of a simulation's cars, in car index order, in the rows given."""
+        cars = [simulation.cars[local_index] for local_index in range(len(simulation.cars))]
+        global_index_of = {id(car): car_index for car, car_index in zip(cars, car_indices)}
+        entered = set(simulation.entered_cars())
+        rows = np.asarray(car_indices, dtype=np.int64)
+
+        self.cars['x'][rows] = [car.x for car in cars]
+        self.cars['y'][rows] = [car.y for car in cars]
+        self.cars['heading'][rows] = [car.heading for car in cars]
+        self.cars['program_counter'][rows] = [car.program_counter for car in cars]
+        self.cars['partner'][rows] = [global_index_of[id(car.collision)] if car.collision else -1 for car in cars]
+        self.cars['collision_step'][rows] = [car.collision_step or 0 for car in cars]
+        self.cars['entered'][rows] = [local_index in entered for local_index in range(len(cars))]
+
+    def read_cars(self, simulation: Simulation) -> None:
+        """Update the cars of the simulation the state was created from and rebuild its cars_in_field."""
+        entering = []
+
+        for car_index, row in enumerate(self.cars[['x', 'y', 'heading', 'program_counter', 'partner', 'collision_step', 'entered']].tolist()):
+            x, y, heading, program_counter, partner, collision_step, entered = row
+            car = simulation.cars[car_index]
+            car.x, car.y, car.heading, car.program_counter = x, y, heading, program_counter
+            if partner >= 0:
+                car.collision = simulation.cars[partner]
+                car.collision_step = collision_step
+            if entered:
+                entering.append(car_index)
+
+        simulation.rebuild_cars_in_field(
+            sorted(entering, key=lambda car_index: (simulation.cars[car_index].collision_step, car_index))
+        )
+
+    def detach(self, simulation: Simulation) -> None:
+        """Give the cars of a simulation built by to_simulation their own copy of their programs, so the buffer can be
+        closed while the simulation lives on.
+        """
+        for car in simulation.cars.values():
+            if isinstance(car.program, memoryview):
+                car.program = bytes(car.program)
+
+    def release(self) -> None:
+        """Release the views into the buffer; views returned by program, including the programs of simulations built
+        by to_simulation, must have been released or detached first.
+        """
+        self.header = self.cars = None
+        self.programs.release()
+        self.names.release()
+        self.buffer.release()
+
+    def __len__(self) -> int:
+        return len(self.cars)
+
+
+class SharedCarState(CarStateBuffer):
+    """Car state in one shared memory block.
+
+    Any process can attach to the block by name and read or write car state without pickling Car objects, and
+    simulations built from it run their programs straight from the block. Processes can write disjoint rows at the
+    same time.
+    """
+
+    def __init__(self, memory: shared_memory.SharedMemory) -> None:
+        """Initialize the arrays over a shared memory block that holds a car state."""
+        self.memory: shared_memory.SharedMemory = memory
+        super().__init__(memory.buf)
+
+    @property
+    def name(self) -> str:
+        """Return the name other processes attach to."""
+        return self.memory.name
+
+    @classmethod
+    def from_simulation(cls, simulation: Simulation, name: Optional[str] = None) -> 'SharedCarState':
+        """Create a shared memory block holding the state of every car in a simulation."""
+        memory = shared_memory.SharedMemory(name=name, create=True, size=max(cls.layout_size(simulation), 1))
+        CarStateBuffer.write_layout(memory.buf, simulation).release()
+        return cls(memory)
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedCarState':
+        """Attach to a car state created by another process."""
+        return cls(shared_memory.SharedMemory(name=name))
+
+    def close(self) -> None:
+        """Detach from the block; the programs of simulations built from it must have been detached first."""
+        self.release()
+        self.memory.close()
+
+    def unlink(self) -> None:
+        """Free the block once every process has closed it."""
+        self.memory.unlink()
+
+    def __enter__(self) -> 'SharedCarState':
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"SharedCarState(name={self.name!r}, cars={len(self)}, step={self.step})"
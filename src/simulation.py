@@ -1,22 +1,88 @@
-from typing import Dict, Set, List, Union, Tuple
+import gc
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, NamedTuple, Set, List, Optional, Sequence, Union, Tuple
 
-from .car import Car
+from .car import Car, Program, as_column, describe_invalid_rows
 from .field import Field
+from .occupancy import CarIndexLookup, CollisionCell, DictOccupancy, GridOccupancy
+from .program import MOVE, last_move_end, repeating_block, turn_from
+from .spatial_index import Box, SpatialIndex, box_distance
 
+if TYPE_CHECKING:
+    from .checkpoint import Checkpointer
+    from .metrics import SimulationMetrics
+    from .recorder import TrajectoryRecorder
+    from .shared_state import SharedCarState
 
-class Simulation:
+
+class Cycle(NamedTuple):
+    """Commands a car can skip while it goes around a cycle, or along a straight segment."""
+
+    steps: int
+    state: Tuple[int, int, int]  # The (x, y, heading) the car ends up in
+    box: Box  # The cells the car goes through
+    ignored: int  # Moves among the skipped commands that push against the boundary
+
+
+class StepDelta(NamedTuple):
+    """What changed during one simulation step, as sorted car indices."""
+
+    step: int
+    moved: List[int]
+    rotated: List[int]
+    collided: List[int]  # Cars that collided, including cars that were hit while standing still
+
+
+class Simulation(CarIndexLookup):
     """Simulation class to manage the simulation environment."""
 
-    def __init__(self, field_size: Tuple[int, int]) -> None:
-        """Initialize the simulation with a given field size."""
+    OCCUPANCY_MODES = ('dict', 'grid')
+
+    # Automatic occupancy selection: use the grid once there are enough cars for the
+    # field area, as long as the grid itself stays a reasonable size (4-byte cells, so 256 MiB at most)
+    GRID_MIN_CARS: int = 1000
+    GRID_CELLS_PER_CAR: int = 64
+    GRID_MAX_CELLS: int = 1 << 26
+
+    # Cycle skipping: the fewest steps worth skipping, how many steps pass before a car that cannot skip is checked
+    # again (doubled after every check) and how many commands are run ahead looking for a repeated state
+    CYCLE_MIN_SKIP: int = 256
+    CYCLE_CHECK_INTERVAL: int = 64
+    CYCLE_MAX_WALK: int = 1 << 14
+    # Tile size of the index of the boxes cycling cars stay in, and how many tiles of new boxes a round of checks may
+    # index before the remaining cars wait for the next step
+    CYCLE_TILE_SIZE: int = 256
+    CYCLE_ROUND_TILES: int = 1 << 12
+
+    def __init__(self, field_size: Tuple[int, int], occupancy: Optional[str] = None) -> None:
+        """Initialize the simulation with a given field size.
+
+        occupancy selects how cars_in_field is stored: 'dict', 'grid', or None to pick one when the simulation runs.
+        """
         if not isinstance(field_size, tuple) or len(field_size) != 2 or not all(isinstance(dim, int) and dim > 0 for dim in field_size):
             raise ValueError("Field size must be a tuple of two positive integers.")
+
+        if occupancy is not None and occupancy not in self.OCCUPANCY_MODES:
+            raise ValueError("Occupancy must be 'dict' or 'grid'.")
         
         self.field: Field = Field(width=field_size[0], height=field_size[1])
         self.cars: Dict[int, Car] = {}
         self.car_names: Set[str] = set()
-        self.cars_in_field: Dict[Tuple[int, int], Union[Car, List[Car]]] = {}
+        self.occupancy: Optional[str] = occupancy
+        self.cars_in_field: Union[DictOccupancy, GridOccupancy] = (
+            GridOccupancy(self.field.width, self.field.height, self.cars) if occupancy == 'grid' else DictOccupancy(self.cars)
+        )
         self.step: int = 0  # Track the simulation step
+        self.active_cars: List[int] = []  # Indices of cars that still have commands and have not collided
+        self.active_cars_stale: bool = True  # Set when active_cars must be rebuilt before stepping
+        self.suspended_cars: List[Tuple[int, int, Box]] = []  # Heap of (resume step, car index, box) of cars skipping cycles
+        self.confined: SpatialIndex = SpatialIndex(self.CYCLE_TILE_SIZE)  # Boxes of cycling cars, kept across steps
+        self.confined_boxes: Dict[int, Tuple[Box, int]] = {}  # Car index -> (box, step it is free to leave the box from)
+        self._car_indices: Dict[int, int] = {}  # id(car) -> car index, for reporting collision partners
+        self.checkpoints: Optional['Checkpointer'] = None  # Writes checkpoints between steps when set
+        self.recorder: Optional['TrajectoryRecorder'] = None  # Records every executed command when set
+        self.metrics: Optional['SimulationMetrics'] = None  # Collected while metrics are enabled
 
     def add_car(self, car: Car) -> None:
         """Add a car to the simulation."""
@@ -26,18 +92,94 @@ class Simulation:
         if car.name in self.car_names:
             raise ValueError("Car with this name already exists.")
         
-        if car.position in self.cars_in_field:
-            raise ValueError("Position already occupied by another car.")
-        
         #check if the car's position is within the field bounds
-        if not (0 <= car.position[0] < self.field.width and 0 <= car.position[1] < self.field.height):
+        if not (0 <= car.x < self.field.width and 0 <= car.y < self.field.height):
             raise ValueError("Position out of bounds.")
+
+        if self.cars_in_field.occupant(car.x, car.y) is not None:
+            raise ValueError("Position already occupied by another car.")
         
         # Get index for car based on add logic (e.g., next available index)
         car_index = len(self.cars)
         self.cars[car_index] = car
-        self.cars_in_field[car.position] = car
+        self.cars_in_field.place(car.x, car.y, car_index)
         self.car_names.add(car.name)
+        self.active_cars_stale = True
+
+    def add_cars(self, names: Iterable[str], xs: Iterable[int], ys: Iterable[int], orientations: Iterable[str],
+                 programs: Iterable[Union[str, Program]]) -> range:
+        """Add cars given as columns, as by Car.from_arrays, and return their car indices.
+
+        Names, bounds and cells are checked for the whole batch at once, against the cars already in the simulation
+        and each other. All the invalid rows are reported in one ValueError and no car is added.
+        """
+        names, xs, ys, orientations, programs = (as_column(column) for column in (names, xs, ys, orientations, programs))
+        if not len(names) == len(xs) == len(ys) == len(orientations) == len(programs):
+            raise ValueError("Columns must have the same length.")
+
+        invalid = Car.invalid_rows(names, xs, ys, orientations, programs)
+
+        if len(set(names)) != len(names) or not self.car_names.isdisjoint(names):
+            seen = set(self.car_names)
+            for row, name in enumerate(names):
+                if name in seen:
+                    invalid.setdefault(row, "Car with this name already exists.")
+                seen.add(name)
+
+        # Rows without a valid position in the field take no part in the cell checks
+        width, height = self.field.width, self.field.height
+        misplaced = {
+            row for row, (x, y) in enumerate(zip(xs, ys))
+            if not (isinstance(x, int) and isinstance(y, int) and 0 <= x < width and 0 <= y < height)
+        }
+        for row in misplaced:
+            invalid.setdefault(row, "Position out of bounds.")
+
+        positions = list(zip(xs, ys))
+        if misplaced or self.cars or len(set(positions)) != len(positions):
+            occupied = set()
+            for row, position in enumerate(positions):
+                if row in misplaced:
+                    continue
+                if position in occupied or self.cars_in_field.occupant(*position) is not None:
+                    invalid.setdefault(row, "Position already occupied by another car.")
+                occupied.add(position)
+
+        if invalid:
+            raise ValueError(describe_invalid_rows(invalid))
+
+        # Building a million cars would otherwise run full garbage collections that find nothing to free
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            cars = Car.from_arrays(names, xs, ys, orientations, programs, validate=False)
+            first_index = len(self.cars)
+            car_indices = range(first_index, first_index + len(cars))
+            for car_index, car in zip(car_indices, cars):
+                self.cars[car_index] = car
+            self.cars_in_field.place_many(positions, car_indices)
+        finally:
+            if collecting:
+                gc.enable()
+
+        self.car_names.update(names)
+        self.active_cars_stale = True
+        return car_indices
+
+    def select_occupancy(self) -> None:
+        """Pick the occupancy backend for the current field size and number of cars, if not chosen explicitly."""
+        if self.occupancy is not None:
+            return
+
+        area = self.field.width * self.field.height
+        use_grid = (
+            len(self.cars) >= self.GRID_MIN_CARS
+            and area <= self.GRID_CELLS_PER_CAR * len(self.cars)
+            and area <= self.GRID_MAX_CELLS
+        )
+
+        if use_grid and not isinstance(self.cars_in_field, GridOccupancy):
+            self.cars_in_field = GridOccupancy.from_cells(self.field.width, self.field.height, self.cars, self.cars_in_field)
 
         
     def move_car(self, car_index: int) -> bool:
@@ -49,27 +191,33 @@ class Simulation:
         if car.collision:
             return False
 
-        #remove car from current position in the field
-        if car.position in self.cars_in_field:
-            del self.cars_in_field[car.position]
-
-        next_position = car.next_position()
+        next_x = car.x + Car.DELTA_X[car.heading]
+        next_y = car.y + Car.DELTA_Y[car.heading]
         
-        #check if next position is within bounds
-        if not (0 <= next_position[0] < self.field.width and 0 <= next_position[1] < self.field.height):
+        #check if next position is within bounds, the car keeps its cell if not
+        if not (0 <= next_x < self.field.width and 0 <= next_y < self.field.height):
             return False  # Cannot move out of bounds
+
+        #remove car from current position in the field
+        self.cars_in_field.vacate(car.x, car.y)
         
-        car.move()
+        car.x = next_x
+        car.y = next_y
 
         # Check for collisions with other cars
-        if next_position in self.cars_in_field:
-            other_car = self.cars_in_field[next_position]
-            car.collided(other_car, self.step)
-            self.cars_in_field[next_position] = [car, other_car]
-            
+        occupant = self.cars_in_field.occupant(next_x, next_y)
+        if occupant is not None:
+            if isinstance(occupant, CollisionCell):
+                # A pile-up: the car collides with the car that was hit first, which keeps its own partner
+                car.collision = self.cars[occupant.owner]
+                car.collision_step = self.step
+            else:
+                car.collided(occupant, self.step)
+            self.cars_in_field.mark_collision(next_x, next_y, car_index)
+
         else:
             # Update car's position in the field
-            self.cars_in_field[next_position] = car
+            self.cars_in_field.place(next_x, next_y, car_index)
 
 
         return True
@@ -81,33 +229,621 @@ class Simulation:
         if car.collision:
             return  # Do not execute instructions if the car has collided
 
-        curr_command = car.instructions[0] if car.instructions else None
+        if car.program_counter >= len(car.program):
+            return  # No commands left to execute
 
-        if curr_command == 'F':
+        curr_command = car.program[car.program_counter]
+
+        if curr_command == Car.FORWARD:
             self.move_car(car_index)
-        elif curr_command == 'L':
-            car.rotate('L')
-        elif curr_command == 'R':
-            car.rotate('R')
+        elif curr_command == Car.LEFT:
+            car.heading = Car.TURN_LEFT[car.heading]
+        elif curr_command == Car.RIGHT:
+            car.heading = Car.TURN_RIGHT[car.heading]
+
+        car.program_counter += 1  # Advance past the executed command
 
-        car.instructions = car.instructions[1:]  # Remove the executed command
+        if self.recorder is not None:
+            self.recorder.record(self.step, car_index, curr_command, car.x, car.y, car.heading)
     
+    def is_active(self, car_index: int) -> bool:
+        """Check if a car can still execute commands."""
+        car = self.cars[car_index]
+        return not car.collision and car.has_instructions()
+
+    def refresh_active_cars(self) -> None:
+        """Rebuild the list of active cars from scratch, in car index order."""
+        self.active_cars = [car_index for car_index in self.cars if self.is_active(car_index)]
+        self.active_cars_stale = False
+
     def run_simulation(self) -> None:
         """Run the simulation by executing all car instructions."""
-        
-        while True:
-            # Check if all cars have either no instructions left or have collided
-            if all(car.instructions == "" or car.collision for car in self.cars.values()):
-                break
-            
-            self.step += 1  # Increment the simulation step after each round of instructions
-            
-            # Execute instructions for each car
-            for car_index in range(len(self.cars)):
+
+        self.select_occupancy()
+        self.refresh_active_cars()
+        last_moves = self.last_move_steps() if self.recorder is None else []
+
+        # Checkpoints are taken between steps, so they would see cars that skip cycles ahead of time
+        skip_cycles = self.recorder is None and self.checkpoints is None
+        checks = [(self.step, car_index, self.CYCLE_CHECK_INTERVAL) for car_index in self.active_cars] if skip_cycles else []
+        last_move_at = {car_index: -last_step for last_step, car_index in last_moves} if skip_cycles else {}
+
+        # Stop once every car has either no instructions left or has collided
+        while self.active_cars or self.suspended_cars:
+            if self.suspended_cars:
+                self.resume_cars(checks)
+
+            if self.recorder is None:
+                if len(self.active_cars) == 1 and not self.suspended_cars:
+                    # Nothing else moves, so the last car can skip over whole runs of commands
+                    self.fast_forward(self.active_cars[0])
+                    self.active_cars = []
+                    break
+
+                if self.only_rotations_left(last_moves):
+                    # Rotations cannot move a car or cause a collision, so the rest of every program is a net turn
+                    self.finish_rotations()
+                    break
+
+            if checks:
+                self.check_cycles(checks, last_move_at)
+            if self.active_cars:
+                self.run_step()
+
+    def last_move_steps(self) -> List[Tuple[int, int]]:
+        """Return a heap of (-step, car index) giving the step of the last move of every active car that has one left.
+
+        An active car runs one command per step, so its last move happens a fixed number of steps from now unless it
+        collides first.
+        """
+        last_moves = []
+        for car_index in self.active_cars:
+            moves_left = self.moves_left(car_index)
+            if moves_left:
+                last_moves.append((-moves_left - self.step, car_index))
+
+        heapq.heapify(last_moves)
+        return last_moves
+
+    def moves_left(self, car_index: int) -> int:
+        """Return how many commands a car runs up to and including its last move, 0 if it has no move left."""
+        car = self.cars[car_index]
+        moves_end = car.compiled.last_move_end if car.compiled is not None else last_move_end(car.program)
+        return max(moves_end - car.program_counter, 0)
+
+    def only_rotations_left(self, last_moves: List[Tuple[int, int]]) -> bool:
+        """Check whether no active car has a move left, given the heap built by last_move_steps."""
+        while last_moves and (-last_moves[0][0] <= self.step or not self.is_active(last_moves[0][1])):
+            heapq.heappop(last_moves)
+        return not last_moves
+
+    def finish_rotations(self) -> None:
+        """Run every active or suspended car to the end of a program that has only rotations left, at once."""
+        last_step = self.step
+        starts = [(self.step, car_index) for car_index in self.active_cars]
+        starts += [(resume_step, car_index) for resume_step, car_index, _ in self.suspended_cars]
+        for start_step, car_index in starts:
+            car = self.cars[car_index]
+            if car.compiled is not None:
+                turn = car.compiled.turn_after(car.program, car.program_counter)
+            else:
+                turn = turn_from(car.program, car.program_counter)
+            car.heading = (car.heading + turn) & 3
+            last_step = max(last_step, start_step + len(car.program) - car.program_counter)
+            car.program_counter = len(car.program)
+
+        self.step = last_step
+        self.active_cars = []
+        self.suspended_cars = []
+        self.confined = SpatialIndex(self.CYCLE_TILE_SIZE)
+        self.confined_boxes = {}
+
+    def run_step(self) -> None:
+        """Execute one command for every active car and drop the cars that stop being active."""
+        self.step += 1  # Increment the simulation step after each round of instructions
+
+        # Execute instructions for each active car, in car index order
+        for car_index in self.active_cars:
+            self.execute_instructions(car_index)
+
+        # Drop cars that ran out of commands or collided during this step,
+        # including cars that were hit after they had already moved
+        self.active_cars = [car_index for car_index in self.active_cars if self.is_active(car_index)]
+
+        if self.recorder is not None:
+            self.recorder.end_step(self)
+
+        if self.checkpoints is not None and self.checkpoints.due(self.step):
+            self.checkpoints.save(self)
+
+    ### Cycle skipping ###
+
+    # A car whose program repeats a block of commands, and that comes back to the same position and orientation at
+    # the start of a block, goes around the same cells until the repeats run out. While no other car can get into
+    # those cells, the car is taken out of the stepping and put back in the state and at the step the repeats end.
+    # A long run of moves is skipped the same way: the car goes along a straight segment up to the boundary, where
+    # the rest of the run pushes against it, or up to a parked car, which it is left to drive into.
+
+    def check_cycles(self, checks: List[Tuple[int, int, int]], last_move_at: Dict[int, int]) -> None:
+        """Suspend the active cars due a check that go around a cycle no other car can get into.
+
+        checks is a heap of (step, car index, interval). A car that cannot skip is checked again after its interval,
+        which doubles every time, so cars that never cycle only cost a check now and then. Once the cycles found in a
+        round cover CYCLE_ROUND_TILES tiles, the cars still due are checked the next step. last_move_at maps every
+        car with a move left to the step of its last move.
+        """
+        due = []
+        cycles: Dict[int, Cycle] = {}
+        tiles = 0
+        lines = None  # Rows and columns of the cars, built once for the round when a car is in a long run of moves
+
+        while checks and checks[0][0] <= self.step and tiles < self.CYCLE_ROUND_TILES:
+            _, car_index, interval = heapq.heappop(checks)
+            if self.is_active(car_index):
+                due.append((car_index, interval))
+                if lines is None and self.in_long_run(car_index):
+                    lines = self.build_obstacle_lines()
+                # Walking no further than the steps since the last check keeps checks cheaper than the steps they skip
+                cycle = self.find_segment(car_index, lines) or self.find_cycle(car_index, min(2 * interval, self.CYCLE_MAX_WALK))
+                if cycle is not None:
+                    cycles[car_index] = cycle
+                    tiles += self.confined.tile_count(*cycle.box)
+
+        while checks and checks[0][0] <= self.step:
+            _, car_index, interval = heapq.heappop(checks)
+            heapq.heappush(checks, (self.step + 1, car_index, interval))
+
+        # A car found cycling stays in its box until its cycle is over whether it is suspended or not
+        for car_index, cycle in cycles.items():
+            self.confine(car_index, cycle.box, self.step + cycle.steps)
+
+        isolated = self.isolated_cycles(cycles, last_move_at) if cycles else set()
+
+        for car_index, interval in due:
+            if car_index in isolated:
+                self.suspend(car_index, cycles[car_index])
+            else:
+                self.release(car_index)
+                heapq.heappush(checks, (self.step + interval, car_index, interval * 2))
+
+    def confine(self, car_index: int, box: Box, free_step: int) -> None:
+        """Note that a car stays in a box up to the step it is free to leave it from."""
+        self.confined.add(car_index, *box)
+        self.confined_boxes[car_index] = (box, free_step)
+
+    def release(self, car_index: int) -> None:
+        """Forget the box of a car, if it has one."""
+        if self.confined_boxes.pop(car_index, None) is not None:
+            self.confined.discard(car_index)
+
+    def suspend(self, car_index: int, cycle: Cycle) -> None:
+        """Take a car out of the stepping for the steps of a cycle, leaving it in the state it ends up in."""
+        car = self.cars[car_index]
+
+        # No other car can get into the box before the car is resumed, so it can wait in its final cell
+        self.cars_in_field.vacate(car.x, car.y)
+        car.x, car.y, car.heading = cycle.state
+        self.cars_in_field.place(car.x, car.y, car_index)
+        car.program_counter += cycle.steps
+
+        self.active_cars.remove(car_index)
+        heapq.heappush(self.suspended_cars, (self.step + cycle.steps, car_index, cycle.box))
+
+    def resume_cars(self, checks: List[Tuple[int, int, int]]) -> None:
+        """Put the suspended cars back once their skipped steps have run, jumping to the first one if nothing else runs."""
+        if not self.active_cars:
+            self.step = max(self.step, self.suspended_cars[0][0])
+
+        while self.suspended_cars and self.suspended_cars[0][0] <= self.step:
+            _, car_index, _ = heapq.heappop(self.suspended_cars)
+            self.release(car_index)
+            if self.is_active(car_index):
+                insort(self.active_cars, car_index)
+                heapq.heappush(checks, (self.step, car_index, self.CYCLE_CHECK_INTERVAL))
+
+    def in_long_run(self, car_index: int) -> bool:
+        """Return whether the next CYCLE_MIN_SKIP commands of a car are all moves."""
+        car = self.cars[car_index]
+        return bytes(car.program[car.program_counter:car.program_counter + self.CYCLE_MIN_SKIP]).count(b'F') >= self.CYCLE_MIN_SKIP
+
+    def find_segment(self, car_index: int, lines: Optional[Tuple[Dict[int, List[int]], Dict[int, List[int]]]] = None) -> Optional[Cycle]:
+        """Return the straight segment of a car in a long run of moves as a cycle, or None if it is not in one.
+
+        lines are the rows and columns of the cars from build_obstacle_lines, which finds the car ahead with a bisection
+        instead of a look at every cell of the segment. They are built when not given.
+        """
+        if not self.in_long_run(car_index):
+            return None
+
+        car = self.cars[car_index]
+        _, length = car.compiled_program().run_at(car.program, car.program_counter)
+        moves = min(length, self.distance_to_boundary(car.x, car.y, car.heading))
+
+        # A parked car ahead stops the segment in front of it, while a car that may still move must be stepped past
+        distance = self.distance_to_obstacle(car, *(self.build_obstacle_lines() if lines is None else lines))
+        if distance is not None and distance <= moves:
+            occupant = self.cars_in_field.occupant(car.x + distance * Car.DELTA_X[car.heading],
+                                                   car.y + distance * Car.DELTA_Y[car.heading])
+            if isinstance(occupant, Car) and self.is_active(self.car_index_of(occupant)):
+                return None
+            length = moves = distance - 1
+
+        if length < self.CYCLE_MIN_SKIP:
+            return None
+
+        x, y = car.x + moves * Car.DELTA_X[car.heading], car.y + moves * Car.DELTA_Y[car.heading]
+        return Cycle(length, (x, y, car.heading), (min(car.x, x), min(car.y, y), max(car.x, x), max(car.y, y)), length - moves)
+
+    def find_cycle(self, car_index: int, max_walk: Optional[int] = None) -> Optional[Cycle]:
+        """Return the cycle of a car repeating a block of commands, or None if it does not come back to the same state
+        within max_walk commands, by default CYCLE_MAX_WALK.
+        """
+        max_walk = self.CYCLE_MAX_WALK if max_walk is None else max_walk
+        car = self.cars[car_index]
+        length, repeats = repeating_block(car.program, car.program_counter)
+        if length * repeats < self.CYCLE_MIN_SKIP:
+            return None
+
+        block = bytes(car.program[car.program_counter:car.program_counter + length])
+        states = [(car.x, car.y, car.heading)]
+        ignored = []  # Moves against the boundary of every block walked so far
+        seen = {states[0]: 0}
+        box = [car.x, car.y, car.x, car.y]
+
+        for blocks in range(1, min(repeats, max_walk // length) + 1):
+            state, block_ignored = self.walk(states[-1], block, box)
+            if state[2] == states[-1][2] and state != states[-1] and not block_ignored:
+                return None  # The block shifts the car, which only comes back once the boundary holds it up
+            ignored.append(block_ignored)
+            first = seen.get(state)
+            if first is not None:
+                periods, rest = divmod(repeats - first, blocks - first)
+                total_ignored = sum(ignored[:first]) + periods * sum(ignored[first:]) + sum(ignored[first:first + rest])
+                return Cycle(length * repeats, states[first + rest], (box[0], box[1], box[2], box[3]), total_ignored)
+            seen[state] = blocks
+            states.append(state)
+
+        return None
+
+    def walk(self, state: Tuple[int, int, int], commands: bytes, box: List[int]) -> Tuple[Tuple[int, int, int], int]:
+        """Run commands from an (x, y, heading) state as if the car were alone on the field, widening box to the cells
+        it goes through, and return the state it ends up in and how many of its moves pushed against the boundary.
+        """
+        x, y, heading = state
+        width, height = self.field.width, self.field.height
+        ignored = 0
+
+        for command in commands:
+            if command == Car.FORWARD:
+                next_x, next_y = x + Car.DELTA_X[heading], y + Car.DELTA_Y[heading]
+                if 0 <= next_x < width and 0 <= next_y < height:
+                    x, y = next_x, next_y
+                    box[0], box[1], box[2], box[3] = min(box[0], x), min(box[1], y), max(box[2], x), max(box[3], y)
+                else:
+                    ignored += 1
+            elif command == Car.LEFT:
+                heading = Car.TURN_LEFT[heading]
+            elif command == Car.RIGHT:
+                heading = Car.TURN_RIGHT[heading]
+
+        return (x, y, heading), ignored
+
+    def isolated_cycles(self, cycles: Dict[int, Cycle], last_move_at: Dict[int, int]) -> Set[int]:
+        """Return the cars of cycles whose box no other car is in or can get into before their cycle is over.
+
+        Other cars can only stop a car, so a car found cycling stays in its box until its cycle is over whether it is
+        suspended or not, as a suspended car does until it is resumed. From then on it can move one cell a step up to
+        its last move, like every other active car from now on. The boxes of those cars are kept in the confined
+        index across steps, the other cars are indexed once a round, and each cycle only looks at the cars that could
+        get to it within its steps.
+        """
+        now = self.step
+
+        movers = SpatialIndex()
+        mover_reach = 0
+        for car_index in self.active_cars:
+            if car_index not in self.confined_boxes and last_move_at.get(car_index, 0) > now:
+                car = self.cars[car_index]
+                movers.add_point(car_index, car.x, car.y)
+                mover_reach = max(mover_reach, last_move_at[car_index] - now)
+
+        confined_reach = 0
+        for car_index, (_, free_step) in self.confined_boxes.items():
+            confined_reach = max(confined_reach, last_move_at.get(car_index, 0) - free_step)
+
+        def nearby(index: SpatialIndex, box: Box, reach: int) -> Iterator[int]:
+            """Yield the cars of an index within reach of a box, the ones close by first, since they are nearly
+            always the ones in the way.
+            """
+            yield from index.iter_reachable(*box, min(reach, self.CYCLE_CHECK_INTERVAL))
+            if reach > self.CYCLE_CHECK_INTERVAL:
+                yield from index.iter_reachable(*box, reach)
+
+        parked: Optional[SpatialIndex] = None
+        isolated: Set[int] = set()
+
+        for car_index, (steps, _, box, _) in cycles.items():
+            end_step = now + steps
+            min_x, min_y, max_x, max_y = box
+
+            # Parked cars never move, so only the cars already in the box can get in the way
+            if (max_x - min_x + 1) * (max_y - min_y + 1) <= self.CYCLE_CHECK_INTERVAL:
+                car = self.cars[car_index]
+                occupants = (self.cars_in_field.occupant(x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1))
+                if any(occupant is not None and occupant is not car for occupant in occupants):
+                    continue
+            else:
+                if parked is None:
+                    parked = SpatialIndex.from_cars(self.cars)
+                if parked.query(*box) - {car_index}:
+                    continue
+
+            # A confined car gets no farther from its box than it can move between leaving it and the cycle's end
+            if any(
+                other_index != car_index
+                and box_distance(self.confined_boxes[other_index][0], box)
+                <= max(min(end_step, last_move_at.get(other_index, 0)) - self.confined_boxes[other_index][1], 0)
+                for other_index in nearby(self.confined, box, min(steps, confined_reach))
+            ):
+                continue
+
+            if any(
+                box_distance((self.cars[other_index].x, self.cars[other_index].y) * 2, box)
+                <= min(end_step, last_move_at[other_index]) - now
+                for other_index in nearby(movers, box, min(steps, mover_reach))
+            ):
+                continue
+
+            isolated.add(car_index)
+
+        return isolated
+
+    ### Incremental stepping ###
+
+    # These run the stepwise engine on the Car objects whatever the class of the simulation, one step at a time, so
+    # they can be mixed freely with each other and with run_simulation.
+
+    def is_finished(self) -> bool:
+        """Check whether every car has either run out of commands or collided."""
+        if self.active_cars_stale:
+            self.select_occupancy()
+            self.refresh_active_cars()
+        return not self.active_cars
+
+    def step_once(self) -> Optional[StepDelta]:
+        """Run a single step and return what changed, or None if the simulation has already finished."""
+        if self.is_finished():
+            return None
+
+        before = [(car_index, self.cars[car_index]) for car_index in self.active_cars]
+        states = [(car.x, car.y, car.heading) for _, car in before]
+        self.run_step()
+
+        moved, rotated, collided = [], [], set()
+        for (car_index, car), (x, y, heading) in zip(before, states):
+            if car.x != x or car.y != y:
+                moved.append(car_index)
+            if car.heading != heading:
+                rotated.append(car_index)
+            if car.collision and car.collision_step == self.step:
+                collided.add(car_index)
+                collided.add(self.car_index_of(car.collision))
+
+        return StepDelta(self.step, moved, rotated, sorted(collided))
+
+    def run_steps(self, steps: int) -> int:
+        """Run at most the given number of steps and return how many were run."""
+        if not isinstance(steps, int) or steps < 0:
+            raise ValueError("Steps must be a non-negative integer.")
+
+        for steps_run in range(steps):
+            if self.is_finished():
+                return steps_run
+            self.run_step()
+        return steps
+
+    def run_until(self, predicate: Optional[Callable[['Simulation'], bool]] = None, max_steps: Optional[int] = None) -> bool:
+        """Run steps until predicate(simulation) holds, max_steps steps have run or the simulation finishes.
+
+        The predicate is checked before every step. Return whether it held; without a predicate, whether the
+        simulation finished.
+        """
+        if predicate is None and max_steps is None:
+            raise ValueError("Run until needs a predicate or a maximum number of steps.")
+
+        if max_steps is not None and (not isinstance(max_steps, int) or max_steps < 0):
+            raise ValueError("Steps must be a non-negative integer.")
+
+        steps_run = 0
+        while predicate is None or not predicate(self):
+            if self.is_finished():
+                return predicate is None
+            if max_steps is not None and steps_run == max_steps:
+                return False
+            self.run_step()
+            steps_run += 1
+        return True
+
+    def iter_steps(self) -> Iterator[StepDelta]:
+        """Run the simulation one step at a time, yielding what changed after every step."""
+        delta = self.step_once()
+        while delta is not None:
+            yield delta
+            delta = self.step_once()
+
+    def enable_checkpoints(self, path: str, every_steps: Optional[int] = None, every_seconds: Optional[float] = None) -> None:
+        """Write the state of the simulation to path every so many steps, seconds, or both, while it runs.
+
+        A checkpoint is a binary scenario file, and resume continues from it to the same final state.
+        """
+        from .checkpoint import Checkpointer
+        self.checkpoints = Checkpointer(path, every_steps, every_seconds)
+
+    def enable_metrics(self) -> 'SimulationMetrics':
+        """Count commands, ignored moves, occupancy lookups and collisions and time every step, and return the metrics.
+
+        The counters cover the stepwise engine, which the incremental step API uses whatever the class of the
+        simulation; other engines only report their run time. Disabled metrics cost nothing.
+        """
+        from .metrics import SimulationMetrics, instrument
+        self.disable_metrics()
+        self.metrics = SimulationMetrics()
+        instrument(self, self.metrics)
+        return self.metrics
+
+    def disable_metrics(self) -> None:
+        """Stop collecting metrics; the metrics collected so far stay in self.metrics."""
+        from .metrics import uninstrument
+        uninstrument(self)
+
+    def enable_recording(self, keyframe_interval: int = 1024, path: Optional[str] = None,
+                         chunk_events: int = 1 << 20) -> 'TrajectoryRecorder':
+        """Record every command the cars execute from now on, and return the recorder.
+
+        Recording runs every command through the stepwise engine, without fast forwarding, whatever the class of the
+        simulation; add every car first.
+        """
+        from .recorder import TrajectoryRecorder  # NumPy is only needed for recordings
+        self.recorder = TrajectoryRecorder(keyframe_interval, path, chunk_events)
+        self.recorder.start(self)
+        return self.recorder
+
+    @classmethod
+    def resume(cls, path: str) -> 'Simulation':
+        """Build a simulation from a checkpoint, ready for run_simulation to continue where it stopped."""
+        from .binary_scenario import load_binary  # NumPy is only needed for binary scenarios
+        return load_binary(path, cls)
+
+    def rebuild_cars_in_field(self, entering: List[int]) -> None:
+        """Rebuild cars_in_field from the car positions, with the same backend as before.
+
+        entering lists the cars that moved into a collision cell, in the order they did; every other car is the
+        first occupant of its cell.
+        """
+        if isinstance(self.cars_in_field, GridOccupancy):
+            self.cars_in_field = GridOccupancy(self.field.width, self.field.height, self.cars)
+        else:
+            self.cars_in_field = DictOccupancy(self.cars)
+
+        entered = set(entering)
+        for car_index, car in self.cars.items():
+            if car_index not in entered:
+                self.cars_in_field.place(car.x, car.y, car_index)
+
+        for car_index in entering:
+            self.cars_in_field.mark_collision(self.cars[car_index].x, self.cars[car_index].y, car_index)
+
+    def entered_cars(self) -> List[int]:
+        """Return the cars that drove into a collision cell, in the order they did.
+
+        Every car in a collision cell except the car that was hit entered it. Cars enter in (collision step, car
+        index) order, the order rebuild_cars_in_field expects.
+        """
+        entering = [car_index for cell in self.cars_in_field.collision_cells() for car_index in cell.entered]
+
+        return sorted(entering, key=lambda car_index: (self.cars[car_index].collision_step or 0, car_index))
+
+    def export_state(self, name: Optional[str] = None) -> 'SharedCarState':
+        """Copy the state of every car into a new shared memory block that other processes can attach to."""
+        from .shared_state import SharedCarState  # NumPy is only needed for shared state
+        return SharedCarState.from_simulation(self, name)
+
+    @classmethod
+    def import_state(cls, state: 'SharedCarState', car_indices: Optional[Sequence[int]] = None) -> 'Simulation':
+        """Build a simulation from a shared car state, optionally from a selection of its cars, without copying programs."""
+        return state.to_simulation(cls, car_indices)
+
+    def build_obstacle_lines(self, car_index: Optional[int] = None) -> Tuple[Dict[int, List[int]], Dict[int, List[int]]]:
+        """Return the sorted x coordinates of the cars other than car_index per row and their sorted y coordinates per
+        column.
+        """
+        rows: Dict[int, List[int]] = {}
+        columns: Dict[int, List[int]] = {}
+
+        for other_index, other_car in self.cars.items():
+            if other_index != car_index:
+                rows.setdefault(other_car.y, []).append(other_car.x)
+                columns.setdefault(other_car.x, []).append(other_car.y)
+
+        for line in rows.values():
+            line.sort()
+        for line in columns.values():
+            line.sort()
+
+        return rows, columns
+
+    def distance_to_boundary(self, x: int, y: int, heading: int) -> int:
+        """Return how many cells a car at (x, y) facing heading can move forward before reaching the field boundary."""
+        if heading == 0:
+            return self.field.height - 1 - y
+        if heading == 1:
+            return self.field.width - 1 - x
+        if heading == 2:
+            return y
+        return x
+
+    def distance_to_obstacle(self, car: Car, rows: Dict[int, List[int]], columns: Dict[int, List[int]]) -> Optional[int]:
+        """Return how many cells ahead of a car the nearest other car is, or None if there is none."""
+        if car.heading in (0, 2):
+            line, coordinate = columns.get(car.x, []), car.y
+        else:
+            line, coordinate = rows.get(car.y, []), car.x
+
+        if car.heading in (0, 1):
+            index = bisect_right(line, coordinate)
+            return line[index] - coordinate if index < len(line) else None
+
+        index = bisect_left(line, coordinate)
+        return coordinate - line[index - 1] if index > 0 else None
+
+    def fast_forward(self, car_index: int) -> int:
+        """Run the only active car to the end of its program, one run of commands at a time, and return how many of
+        the moves it skipped pushed against the boundary.
+
+        With every other car parked, a run of F only has to be stepped through when it ends in a collision, and a run
+        of rotations only changes the orientation by its net number of quarter turns.
+        """
+        car = self.cars[car_index]
+        compiled = car.compiled_program()
+        rows, columns = self.build_obstacle_lines(car_index)
+        ignored = 0
+
+        while not car.collision and car.has_instructions():
+            opcode, length = compiled.run_at(car.program, car.program_counter)
+
+            if opcode != MOVE:
+                car.heading = (car.heading + opcode) & 3
+                car.program_counter += length
+                self.step += length
+                continue
+
+            boundary = self.distance_to_boundary(car.x, car.y, car.heading)
+            obstacle = self.distance_to_obstacle(car, rows, columns)
+            moves = min(length, boundary) if obstacle is None else min(length, boundary, obstacle - 1)
+
+            if moves:
+                self.cars_in_field.vacate(car.x, car.y)
+                car.x += moves * Car.DELTA_X[car.heading]
+                car.y += moves * Car.DELTA_Y[car.heading]
+                self.cars_in_field.place(car.x, car.y, car_index)
+                car.program_counter += moves
+                self.step += moves
+
+            if moves == length:
+                continue
+
+            if moves == boundary:
+                # The rest of the run pushes against the boundary and is ignored
+                self.step += length - moves
+                car.program_counter += length - moves
+                ignored += length - moves
+            else:
+                # The next move runs into another car
+                self.step += 1
                 self.execute_instructions(car_index)
-            
 
-            
+        return ignored
+
 
 if __name__ == "__main__":
     simulation = Simulation(field_size=(10, 10))
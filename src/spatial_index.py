@@ -0,0 +1,143 @@
+from typing import Dict, Hashable, Iterable, Iterator, List, Set, Tuple
+
+from .car import Car
+
+
+Box = Tuple[int, int, int, int]  # (min_x, min_y, max_x, max_y), inclusive
+
+
+def box_distance(box: Box, other: Box) -> int:
+    """Return the fewest steps a car needs to get from a cell of one box into the other, 0 if they share a cell."""
+    return max(box[0] - other[2], other[0] - box[2], 0) + max(box[1] - other[3], other[1] - box[3], 0)
+
+
+def merge_boxes(boxes: Iterable[Box], size: int) -> List[Box]:
+    """Merge consecutive boxes while the merged box fits in size x size cells."""
+    merged_boxes: List[Box] = []
+
+    for box in boxes:
+        if merged_boxes:
+            last = merged_boxes[-1]
+            merged = (min(last[0], box[0]), min(last[1], box[1]), max(last[2], box[2]), max(last[3], box[3]))
+            if merged[2] - merged[0] < size and merged[3] - merged[1] < size:
+                merged_boxes[-1] = merged
+                continue
+        merged_boxes.append(box)
+
+    return merged_boxes
+
+
+class SpatialIndex:
+    """Uniform grid of square tiles that buckets cars, or the parts of their paths, by the cells they cover.
+
+    Only tiles that hold something are stored, so memory grows with the number of boxes and not with the field area,
+    and fields of 10^6 x 10^6 cells are fine. A key can be added with any number of boxes, which suits a car's path
+    as a list of straight segments; boxes should be points or lines a few tiles long, since a box is listed in every
+    tile it covers.
+    """
+
+    def __init__(self, tile_size: int = 64) -> None:
+        """Initialize an empty index with tiles of tile_size x tile_size cells."""
+        if not isinstance(tile_size, int) or tile_size <= 0:
+            raise ValueError("Tile size must be a positive integer.")
+
+        self.tile_size: int = tile_size
+        self.tiles: Dict[Tuple[int, int], Dict[Hashable, List[Box]]] = {}
+        self.key_tiles: Dict[Hashable, Set[Tuple[int, int]]] = {}
+
+    @classmethod
+    def from_cars(cls, cars: Dict[int, Car], tile_size: int = 64) -> 'SpatialIndex':
+        """Build an index of car positions keyed by car index."""
+        index = cls(tile_size)
+        for car_index, car in cars.items():
+            index.add_point(car_index, car.x, car.y)
+        return index
+
+    def tile_range(self, min_x: int, min_y: int, max_x: int, max_y: int) -> Iterator[Tuple[int, int]]:
+        """Yield the tiles a box covers."""
+        size = self.tile_size
+        for tile_x in range(min_x // size, max_x // size + 1):
+            for tile_y in range(min_y // size, max_y // size + 1):
+                yield tile_x, tile_y
+
+    def tile_count(self, min_x: int, min_y: int, max_x: int, max_y: int) -> int:
+        """Return the number of tiles a box covers."""
+        size = self.tile_size
+        return (max_x // size - min_x // size + 1) * (max_y // size - min_y // size + 1)
+
+    def buckets(self, min_x: int, min_y: int, max_x: int, max_y: int) -> Iterator[Dict[Hashable, List[Box]]]:
+        """Yield the stored tiles a box covers, going through the stored tiles instead when the box covers more."""
+        size = self.tile_size
+        min_tile_x, min_tile_y, max_tile_x, max_tile_y = min_x // size, min_y // size, max_x // size, max_y // size
+
+        if self.tile_count(min_x, min_y, max_x, max_y) > len(self.tiles):
+            for (tile_x, tile_y), bucket in self.tiles.items():
+                if min_tile_x <= tile_x <= max_tile_x and min_tile_y <= tile_y <= max_tile_y:
+                    yield bucket
+            return
+
+        for tile in self.tile_range(min_x, min_y, max_x, max_y):
+            bucket = self.tiles.get(tile)
+            if bucket is not None:
+                yield bucket
+
+    def add(self, key: Hashable, min_x: int, min_y: int, max_x: int, max_y: int) -> None:
+        """Add a box for a key, on top of the boxes it already has."""
+        box = (min_x, min_y, max_x, max_y)
+        key_tiles = self.key_tiles.setdefault(key, set())
+
+        for tile in self.tile_range(min_x, min_y, max_x, max_y):
+            self.tiles.setdefault(tile, {}).setdefault(key, []).append(box)
+            key_tiles.add(tile)
+
+    def add_point(self, key: Hashable, x: int, y: int) -> None:
+        """Add a single cell for a key."""
+        self.add(key, x, y, x, y)
+
+    def discard(self, key: Hashable) -> None:
+        """Remove every box of a key, if it has any."""
+        for tile in self.key_tiles.pop(key, ()):
+            bucket = self.tiles[tile]
+            del bucket[key]
+            if not bucket:
+                del self.tiles[tile]
+
+    def query(self, min_x: int, min_y: int, max_x: int, max_y: int) -> Set[Hashable]:
+        """Return the keys with a box that shares a cell with the given box."""
+        found: Set[Hashable] = set()
+
+        for bucket in self.buckets(min_x, min_y, max_x, max_y):
+            for key, boxes in bucket.items():
+                if key not in found and any(
+                    box[0] <= max_x and min_x <= box[2] and box[1] <= max_y and min_y <= box[3] for box in boxes
+                ):
+                    found.add(key)
+
+        return found
+
+    def reachable(self, min_x: int, min_y: int, max_x: int, max_y: int, steps: int) -> Set[Hashable]:
+        """Return the keys with a box from which a car could get into the given box within the given number of steps.
+
+        A car moves one cell per step, so this is every box within a Manhattan distance of steps from the box.
+        """
+        return set(self.iter_reachable(min_x, min_y, max_x, max_y, steps))
+
+    def iter_reachable(self, min_x: int, min_y: int, max_x: int, max_y: int, steps: int) -> Iterator[Hashable]:
+        """Yield the keys reachable returns, each once, looking at the tiles only as far as the keys are taken."""
+        query_box = (min_x, min_y, max_x, max_y)
+        found: Set[Hashable] = set()
+
+        for bucket in self.buckets(min_x - steps, min_y - steps, max_x + steps, max_y + steps):
+            for key, boxes in bucket.items():
+                if key not in found and any(box_distance(box, query_box) <= steps for box in boxes):
+                    found.add(key)
+                    yield key
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.key_tiles
+
+    def __len__(self) -> int:
+        return len(self.key_tiles)
+
+    def __repr__(self) -> str:
+        return f"SpatialIndex(tile_size={self.tile_size}, keys={len(self)}, tiles={len(self.tiles)})"
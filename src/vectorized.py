@@ -0,0 +1,202 @@
+from typing import Dict
+
+import numpy as np
+
+from .car import Car
+from .simulation import Simulation
+
+
+# Orientation codes are Car.heading values and index these deltas
+DELTA_X = np.array(Car.DELTA_X, dtype=np.int64)
+DELTA_Y = np.array(Car.DELTA_Y, dtype=np.int64)
+
+# Command codes: rotations are stored as the number of clockwise quarter turns,
+# so unknown characters become a no-op turn of 0 like in Simulation.execute_instructions
+FORWARD = 4
+COMMAND_CODES = bytearray(256)
+COMMAND_CODES[ord('F')] = FORWARD
+COMMAND_CODES[ord('R')] = 1
+COMMAND_CODES[ord('L')] = 3
+
+
+class VectorizedSimulation(Simulation):
+    """Simulation backend that stores car state in NumPy arrays and executes each step as batched array operations.
+
+    Cars are added and reported through the regular Simulation API; the arrays only live for the duration of
+    run_simulation and the final state is written back to the Car objects and cars_in_field.
+    """
+
+    def load_arrays(self) -> None:
+        """Copy the state of every car into NumPy arrays."""
+        count = len(self.cars)
+        cars = [self.cars[car_index] for car_index in range(count)]
+        index_of: Dict[int, int] = {id(car): car_index for car_index, car in enumerate(cars)}
+
+        self.xs = np.array([car.x for car in cars], dtype=np.int64)
+        self.ys = np.array([car.y for car in cars], dtype=np.int64)
+        self.orientations = np.array([car.heading for car in cars], dtype=np.int64)
+        self.program_counters = np.array([car.program_counter for car in cars], dtype=np.int64)
+        self.lengths = np.array([len(car.program) for car in cars], dtype=np.int64)
+        self.offsets = np.zeros(count, dtype=np.int64)
+        if count:
+            self.offsets[1:] = np.cumsum(self.lengths)[:-1]
+
+        program_bytes = b''.join(car.program for car in cars)
+        self.codes = np.frombuffer(program_bytes.translate(COMMAND_CODES), dtype=np.uint8)
+
+        self.collided = np.array([bool(car.collision) for car in cars], dtype=bool)
+        self.partners = np.full(count, -1, dtype=np.int64)
+        self.collision_steps = np.zeros(count, dtype=np.int64)
+        # A car "entered" a collision cell when it was the one moving; the other car owns the cell
+        self.entered = np.zeros(count, dtype=bool)
+        self.last_acted = np.full(count, -1, dtype=np.int64)
+
+        for car_index, car in enumerate(cars):
+            if car.collision:
+                self.partners[car_index] = index_of.get(id(car.collision), -1)
+                self.collision_steps[car_index] = car.collision_step or 0
+        self.entered[self.entered_cars()] = True
+
+    def store_arrays(self) -> None:
+        """Write the array state back to the Car objects and rebuild cars_in_field."""
+        for car_index in range(len(self.cars)):
+            car = self.cars[car_index]
+            car.x = int(self.xs[car_index])
+            car.y = int(self.ys[car_index])
+            car.heading = int(self.orientations[car_index])
+            car.program_counter = int(self.program_counters[car_index])
+
+            if self.collided[car_index]:
+                car.collision = self.cars[int(self.partners[car_index])]
+                car.collision_step = int(self.collision_steps[car_index])
+
+        # Replay entries into collision cells in the order they happened, like move_car does
+        entering = sorted(np.flatnonzero(self.entered).tolist(), key=lambda car_index: (self.collision_steps[car_index], car_index))
+        self.rebuild_cars_in_field(entering)
+
+    def run_simulation(self) -> None:
+        """Run the simulation by executing all car instructions as array operations."""
+        if self.recorder is not None:
+            return super().run_simulation()  # Recording needs every command executed one at a time
+
+        self.load_arrays()
+
+        active = np.flatnonzero(~self.collided & (self.program_counters < self.lengths))
+
+        while active.size:
+            self.step += 1
+            self.execute_step(active)
+            active = active[~self.collided[active] & (self.program_counters[active] < self.lengths[active])]
+
+            if self.checkpoints is not None and self.checkpoints.due(self.step):
+                self.store_arrays()
+                self.checkpoints.save(self)
+
+        self.store_arrays()
+
+    def execute_step(self, active: np.ndarray) -> None:
+        """Execute one command for every active car."""
+        width, height = self.field.width, self.field.height
+
+        commands = self.codes[self.offsets[active] + self.program_counters[active]].astype(np.int64)
+        self.program_counters[active] += 1
+        self.last_acted[active] = self.step
+
+        forward = commands == FORWARD
+        turning = active[~forward]
+        self.orientations[turning] = (self.orientations[turning] + commands[~forward]) & 3
+
+        movers = active[forward]
+        orientations = self.orientations[movers]
+        next_xs = self.xs[movers] + DELTA_X[orientations]
+        next_ys = self.ys[movers] + DELTA_Y[orientations]
+
+        # Moves out of bounds are ignored and the car keeps its cell
+        inside = (next_xs >= 0) & (next_xs < width) & (next_ys >= 0) & (next_ys < height)
+        movers, next_xs, next_ys = movers[inside], next_xs[inside], next_ys[inside]
+        if not movers.size:
+            return
+
+        targets = next_ys * width + next_xs
+        sources = self.ys[movers] * width + self.xs[movers]
+
+        # Linear cell index of every car, sorted so targets can be looked up with searchsorted
+        cells = self.ys * width + self.xs
+        order = np.argsort(cells, kind='stable')
+        sorted_cells = cells[order]
+        slots = np.minimum(np.searchsorted(sorted_cells, targets), sorted_cells.size - 1)
+        occupied = sorted_cells[slots] == targets
+
+        _, inverse, counts = np.unique(targets, return_inverse=True, return_counts=True)
+        shared_target = counts[inverse] > 1
+        source_targeted = np.isin(sources, targets)
+
+        # A move is free when nobody is in or heading to its target and nobody is heading to its source;
+        # those moves do not depend on car order and are applied all at once
+        conflicted = occupied | shared_target | source_targeted
+        free = ~conflicted
+        self.xs[movers[free]] = next_xs[free]
+        self.ys[movers[free]] = next_ys[free]
+
+        if conflicted.any():
+            self.resolve_conflicts(
+                movers[conflicted], next_xs[conflicted], next_ys[conflicted],
+                targets[conflicted], sources[conflicted],
+                np.where(occupied[conflicted], order[slots[conflicted]], -1),
+            )
+
+    def resolve_conflicts(self, movers: np.ndarray, next_xs: np.ndarray, next_ys: np.ndarray,
+                          targets: np.ndarray, sources: np.ndarray, occupants: np.ndarray) -> None:
+        """Apply moves that interact with other cars one by one, in car index order."""
+        cells: Dict[int, int] = {}
+        for mover, source in zip(movers.tolist(), sources.tolist()):
+            cells[source] = mover
+        for target, occupant in zip(targets.tolist(), occupants.tolist()):
+            if occupant >= 0 and target not in cells:
+                cells[target] = self._cell_owner(occupant)
+
+        for mover, next_x, next_y, target, source in zip(
+            movers.tolist(), next_xs.tolist(), next_ys.tolist(), targets.tolist(), sources.tolist()
+        ):
+            if self.collided[mover]:
+                continue  # Hit earlier in this step, its command was rolled back
+
+            if cells.get(source) == mover:
+                del cells[source]
+
+            self.xs[mover] = next_x
+            self.ys[mover] = next_y
+
+            other = cells.get(target)
+            if other is None:
+                cells[target] = mover
+            else:
+                cells[target] = self.collide(mover, other)
+
+    def _cell_owner(self, car_index: int) -> int:
+        """Return the car that owns the cell of a car, following collisions back to the car that was hit."""
+        if self.collided[car_index] and self.entered[car_index]:
+            return int(self.partners[car_index])
+        return car_index
+
+    def collide(self, mover: int, other: int) -> int:
+        """Record a collision of a moving car with the owner of its target cell and return the owner."""
+        owner = self._cell_owner(other)
+
+        if not self.collided[owner]:
+            self.collided[owner] = True
+            self.partners[owner] = mover
+            self.collision_steps[owner] = self.step
+
+            if owner > mover and self.last_acted[owner] == self.step:
+                # The hit car has not had its turn yet in this step, so its command never runs
+                self.program_counters[owner] -= 1
+                command = int(self.codes[self.offsets[owner] + self.program_counters[owner]])
+                if command != FORWARD:
+                    self.orientations[owner] = (self.orientations[owner] - command) & 3
+
+        self.collided[mover] = True
+        self.partners[mover] = owner
+        self.collision_steps[mover] = self.step
+        self.entered[mover] = True
+        return owner
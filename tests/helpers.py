@@ -0,0 +1,74 @@
+"""Scenario builders and snapshots shared by the engine test modules."""
+
+import random
+
+from src.car import Car
+
+
+EXAMPLE_CARS = [
+    ("A", (1, 2), 'N', "FFRFFFFRRL"),
+    ("B", (7, 8), 'W', "FFLFFFFFFF"),
+    ("C", (0, 9), 'E', "FRFLLFFFFFF"),
+]
+
+
+def build_scenario(seed):
+    """Build a random dense scenario as (field_size, list of car arguments)."""
+    rng = random.Random(seed)
+    width, height = rng.randint(1, 8), rng.randint(1, 8)
+    cells = [(x, y) for x in range(width) for y in range(height)]
+    rng.shuffle(cells)
+
+    cars = []
+    for car_index, position in enumerate(cells[:rng.randint(1, min(len(cells), 12))]):
+        instructions = ''.join(rng.choice('FFFLR') for _ in range(rng.randint(0, 20)))
+        cars.append((f"Car{car_index}", position, rng.choice('NESW'), instructions))
+
+    return (width, height), cars
+
+
+def build_sparse_scenario(seed):
+    """Build a random scenario with long routes on a larger field, as (field_size, list of car arguments)."""
+    rng = random.Random(seed)
+    width, height = rng.randint(5, 30), rng.randint(5, 30)
+    cells = [(x, y) for x in range(width) for y in range(height)]
+    rng.shuffle(cells)
+
+    cars = []
+    for car_index, position in enumerate(cells[:rng.randint(1, 20)]):
+        instructions = ''.join(rng.choice('FFFFFFLR') for _ in range(rng.randint(0, 120)))
+        cars.append((f"Car{car_index}", position, rng.choice('NESW'), instructions))
+
+    return (width, height), cars
+
+
+def build(simulation_class, field_size, cars):
+    """Return a simulation with the given cars, not run yet."""
+    simulation = simulation_class(field_size=field_size)
+    for name, position, orientation, instructions in cars:
+        simulation.add_car(Car(name=name, position=position, orientation=orientation, instructions=instructions))
+    return simulation
+
+
+def run(simulation_class, field_size, cars):
+    """Run a scenario with the given simulation class and return the simulation."""
+    simulation = build(simulation_class, field_size, cars)
+    simulation.run_simulation()
+    return simulation
+
+
+def snapshot(simulation):
+    """Return the observable final state of every car."""
+    return [
+        (car.name, car.position, car.orientation, car.instructions,
+         car.collision.name if car.collision else None, car.collision_step)
+        for car in simulation.cars.values()
+    ]
+
+
+def occupancy_snapshot(simulation):
+    """Return the names of the cars in every occupied cell."""
+    return {
+        position: cell.name if isinstance(cell, Car) else [car.name for car in cell]
+        for position, cell in simulation.cars_in_field.items()
+    }
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+from src.async_driver import AsyncDriver, run_simulation_async
+from src.car import Car
+from src.simulation import Simulation
+from tests.helpers import build_scenario, occupancy_snapshot, run, snapshot
+
+
+def build_long_simulation(length=1000):
+    """Return a simulation with two cars driving back and forth for a long time."""
+    simulation = Simulation(field_size=(10, 10))
+    simulation.add_car(Car(name="A", position=(0, 0), orientation='N', instructions="FFFFRRFFFFRR" * length))
+    simulation.add_car(Car(name="B", position=(5, 0), orientation='N', instructions="FFFFRRFFFFRR" * length))
+    return simulation
+
+
+class TestAsyncDriver:
+    """Test Module for AsyncDriver Class."""
+
+    @pytest.mark.parametrize("every_steps, every_seconds, message", [
+        (None, None, "The driver needs a number of steps or seconds to yield after."),
+        (0, None, "Steps between yields must be a positive integer."),
+        (None, 0, "Seconds between yields must be positive."),
+    ])
+    def test_invalid_intervals(self, every_steps, every_seconds, message):
+        """Test that yield intervals must be positive."""
+        with pytest.raises(ValueError, match=message):
+            AsyncDriver(Simulation(field_size=(3, 3)), every_steps, every_seconds)
+
+    def test_run_returns_simulation(self):
+        """Test that awaiting the run gives the finished simulation."""
+        expected = run(Simulation, (10, 10), [("A", (1, 2), 'N', "FFRFFFFRRL"), ("B", (7, 8), 'W', "FFLFFFFFFF")])
+        simulation = Simulation(field_size=(10, 10))
+        simulation.add_car(Car(name="A", position=(1, 2), orientation='N', instructions="FFRFFFFRRL"))
+        simulation.add_car(Car(name="B", position=(7, 8), orientation='W', instructions="FFLFFFFFFF"))
+
+        assert asyncio.run(run_simulation_async(simulation, every_steps=2)) is simulation
+        assert snapshot(simulation) == snapshot(expected)
+        assert simulation.step == 7
+
+    def test_yields_between_slices(self):
+        """Test that other tasks run while a long simulation is driven."""
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(len(ticks))
+                await asyncio.sleep(0)
+
+        async def main():
+            ticking = asyncio.create_task(ticker())
+            driver = AsyncDriver(build_long_simulation(), every_steps=100)
+            await driver.start()
+            ticking.cancel()
+            return driver
+
+        driver = asyncio.run(main())
+
+        assert driver.slices == 120
+        assert len(ticks) >= driver.slices - 1
+
+    def test_yields_on_time(self, mocker):
+        """Test that a slice ends once its time is up."""
+        clock = mocker.patch("src.async_driver.time.monotonic", side_effect=[float(tick) for tick in range(100)])
+        driver = AsyncDriver(build_long_simulation(), every_steps=None, every_seconds=5)
+
+        driver.run_slice()
+
+        assert driver.simulation.step == 4
+        assert clock.call_count == 6
+
+    def test_cancel(self):
+        """Test that cancelling stops the run between steps, and that the simulation can be driven on from there."""
+        simulation = build_long_simulation()
+
+        async def main():
+            task = AsyncDriver(simulation, every_steps=10).start()
+            for _ in range(3):
+                await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(main())
+        assert 0 < simulation.step < 12000
+
+        asyncio.run(run_simulation_async(simulation))
+        expected = build_long_simulation()
+        expected.run_simulation()
+
+        assert snapshot(simulation) == snapshot(expected)
+        assert simulation.step == expected.step == 12000
+
+    @pytest.mark.parametrize("seed", range(30))
+    def test_matches_run_simulation(self, seed):
+        """Test that driven runs of random scenarios end like run_simulation."""
+        field_size, cars = build_scenario(seed)
+        expected = run(Simulation, field_size, cars)
+        simulation = Simulation(field_size=field_size)
+        for name, position, orientation, instructions in cars:
+            simulation.add_car(Car(name=name, position=position, orientation=orientation, instructions=instructions))
+        asyncio.run(run_simulation_async(simulation, every_steps=1 + seed % 3))
+
+        assert snapshot(simulation) == snapshot(expected)
+        assert occupancy_snapshot(simulation) == occupancy_snapshot(expected)
+        assert simulation.step == expected.step
@@ -0,0 +1,119 @@
+import json
+import random
+
+import pytest
+from src.batch import Scenario, ScenarioResult, chunked, load_scenarios, run_scenario, run_scenarios
+from src.CLI import CLI
+
+
+def random_scenarios(count, seed=0):
+    """Build random sparse scenarios."""
+    rng = random.Random(seed)
+    scenarios = []
+    for _ in range(count):
+        width, height = rng.randint(5, 30), rng.randint(5, 30)
+        cells = rng.sample([(x, y) for x in range(width) for y in range(height)], 3)
+        cars = [
+            (f"Car{car_index}", cell, rng.choice('NESW'), ''.join(rng.choice('FFLR') for _ in range(rng.randint(0, 15))))
+            for car_index, cell in enumerate(cells)
+        ]
+        scenarios.append(Scenario(field_size=(width, height), cars=cars))
+    return scenarios
+
+
+class TestRunScenario:
+    """Test Module for running a single scenario."""
+
+    def test_run_scenario(self):
+        """Test running the example scenario with two cars."""
+        scenario = Scenario(field_size=(10, 10), cars=[
+            ("A", (1, 2), 'N', "FFRFFFFRRL"),
+            ("B", (7, 8), 'W', "FFLFFFFFFF"),
+        ])
+
+        result = run_scenario(scenario)
+
+        assert result == ScenarioResult(step=7, cars=[
+            "A, collides with B at (5,4) at step 7)",
+            "B, collides with A at (5,4) at step 7)",
+        ])
+
+    def test_run_scenario_invalid_car(self):
+        """Test that invalid cars are reported like in the simulation."""
+        scenario = Scenario(field_size=(10, 10), cars=[("A", (10, 2), 'N', "")])
+
+        with pytest.raises(ValueError, match="Position out of bounds."):
+            run_scenario(scenario)
+
+
+class TestRunScenarios:
+    """Test Module for running scenarios across processes."""
+
+    def test_chunked(self):
+        """Test splitting scenarios into chunks."""
+        assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+    def test_invalid_arguments(self):
+        """Test that invalid chunk sizes and worker counts are rejected."""
+        with pytest.raises(ValueError, match="Chunk size must be a positive integer."):
+            list(run_scenarios([], chunksize=0))
+
+        with pytest.raises(ValueError, match="Workers must be a positive integer."):
+            list(run_scenarios([], workers=0))
+
+    @pytest.mark.parametrize("workers, chunksize", [(1, 1), (2, 1), (2, 3), (3, 50)])
+    def test_results_match_serial_run(self, workers, chunksize):
+        """Test that pooled results come back in input order and match a serial run."""
+        scenarios = random_scenarios(40)
+
+        expected = [run_scenario(scenario) for scenario in scenarios]
+        actual = list(run_scenarios(iter(scenarios), workers=workers, chunksize=chunksize))
+
+        assert actual == expected
+
+
+class TestLoadScenarios:
+    """Test Module for loading batch files."""
+
+    def test_load_scenarios(self, tmp_path):
+        """Test reading scenarios from a JSON lines file."""
+        path = tmp_path / "batch.jsonl"
+        path.write_text(
+            json.dumps({"field": [10, 10], "cars": [["A", 1, 2, "N", "FFRFFFFRRL"]]}) + "\n"
+            + "\n"
+            + json.dumps({"field": [5, 6], "cars": []}) + "\n"
+        )
+
+        scenarios = list(load_scenarios(str(path)))
+
+        assert scenarios == [
+            Scenario(field_size=(10, 10), cars=[("A", (1, 2), "N", "FFRFFFFRRL")]),
+            Scenario(field_size=(5, 6), cars=[]),
+        ]
+
+    def test_load_scenarios_invalid_line(self, tmp_path):
+        """Test that malformed lines report their line number."""
+        path = tmp_path / "batch.jsonl"
+        path.write_text(json.dumps({"field": [10, 10], "cars": []}) + "\n{\"field\": [10]}\n")
+
+        with pytest.raises(ValueError, match="Invalid scenario on line 2"):
+            list(load_scenarios(str(path)))
+
+    def test_cli_run_batch(self, tmp_path, capsys):
+        """Test the CLI batch mode output."""
+        path = tmp_path / "batch.jsonl"
+        path.write_text(
+            json.dumps({"field": [10, 10], "cars": [["A", 1, 2, "N", "FFRFFFFRRL"]]}) + "\n"
+            + json.dumps({"field": [10, 10], "cars": [["A", 1, 2, "N", "FFRFFFFRRL"], ["B", 7, 8, "W", "FFLFFFFFFF"]]}) + "\n"
+        )
+
+        CLI().run_batch(str(path), workers=2)
+
+        captured = capsys.readouterr()
+        assert captured.out == (
+            "\nScenario 1, after simulation, the result is:\n"
+            "- A, (5, 4) S\n"
+            "\nScenario 2, after simulation, the result is:\n"
+            "- A, collides with B at (5,4) at step 7)\n"
+            "- B, collides with A at (5,4) at step 7)\n"
+        )
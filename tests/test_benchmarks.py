@@ -0,0 +1,76 @@
+import json
+
+import pytest
+from benchmarks.run_benchmarks import compare, main, run_suite
+from benchmarks.scenarios import ScenarioSpec, build_simulation, generate_cars, scenario_text
+from src.scenario import parse_scenario
+
+
+TINY = ScenarioSpec("tiny", (20, 20), 10, 30, 0.1)
+
+
+class TestScenarios:
+    """Test Module for the synthetic benchmark scenarios."""
+
+    def test_generate_cars(self):
+        """Test that scenarios are reproducible and start inside a square of the requested density."""
+        cars = generate_cars(TINY, seed=1)
+
+        assert cars == generate_cars(TINY, seed=1)
+        assert len(cars) == 10
+        assert len({position for _, position, _, _ in cars}) == 10
+        assert all(5 <= x < 15 and 5 <= y < 15 for _, (x, y), _, _ in cars)
+        assert all(len(commands) == 30 for _, _, _, commands in cars)
+
+    def test_instruction_mix(self):
+        """Test that the instruction mix weights the commands."""
+        cars = generate_cars(TINY._replace(mix=(1, 0, 0)))
+
+        assert all(set(commands) == {'F'} for _, _, _, commands in cars)
+
+    def test_too_many_cars(self):
+        """Test that a scenario needs room for its cars."""
+        with pytest.raises(ValueError, match="Too many cars for the field."):
+            generate_cars(ScenarioSpec("crowded", (3, 3), 10, 1, 1.0))
+
+    def test_scenario_text(self):
+        """Test that the scenario text parses into the same simulation as building it directly."""
+        cars = generate_cars(TINY)
+        parsed = parse_scenario(scenario_text(TINY, cars).splitlines())
+
+        assert [repr(car) for car in parsed.cars.values()] == [repr(car) for car in build_simulation(TINY, cars).cars.values()]
+
+
+class TestRunBenchmarks:
+    """Test Module for the benchmark runner."""
+
+    def test_run_suite(self):
+        """Test that every benchmark of a scenario reports its timings."""
+        results = run_suite([TINY], ['vectorized'], repeat=1, seed=0)
+
+        assert sorted(results) == ["tiny/add_car", "tiny/add_cars", "tiny/parse", "tiny/run/vectorized"]
+        assert results["tiny/run/vectorized"]['steps'] > 0
+        assert results["tiny/run/vectorized"]['commands_per_second'] > 0
+
+    def test_compare(self):
+        """Test that slowdowns beyond the threshold and new failures are regressions."""
+        baseline = {"a": {'seconds': 1.0}, "b": {'seconds': 1.0}, "c": {'seconds': 1.0}}
+        results = {"a": {'seconds': 1.1}, "b": {'seconds': 1.5}, "c": {'error': "ValueError: broken"}, "d": {'seconds': 9.0}}
+
+        assert compare(results, baseline, threshold=0.2) == [
+            "b: 1.0000s -> 1.5000s (1.50x)",
+            "c: now fails with ValueError: broken",
+        ]
+
+    def test_save_and_compare(self, tmp_path, capsys):
+        """Test saving a baseline and comparing a later run with it."""
+        baseline = tmp_path / "baseline.json"
+        arguments = ["--only", "baseline", "--engines", "vectorized", "--repeat", "1"]
+
+        assert main(arguments + ["--save", str(baseline)]) == 0
+        saved = json.loads(baseline.read_text())
+        assert sorted(saved['results']) == ["baseline/add_car", "baseline/add_cars", "baseline/parse", "baseline/run/vectorized"]
+        assert saved['meta']['python']
+
+        assert main(arguments + ["--compare", str(baseline), "--threshold", "1000"]) == 0
+        assert "0 regression(s)" in capsys.readouterr().out
@@ -0,0 +1,191 @@
+import pytest
+from src.binary_scenario import DeferredOccupancy, LazyCars, load_binary, save_binary
+from src.car import Car
+from src.CLI import CLI
+from src.event_driven import EventDrivenSimulation
+from src.occupancy import DictOccupancy, GridOccupancy
+from src.scenario import load_scenario
+from src.simulation import Simulation
+from tests.helpers import build_scenario, occupancy_snapshot, run, snapshot
+
+
+EXAMPLE_CARS = [
+    ("A", (1, 2), 'N', "FFRFFFFRRL"),
+    ("B", (7, 8), 'W', "FFLFFFFFFF"),
+    ("Bé", (0, 9), 'E', "FRF"),
+]
+
+
+def build_simulation(cars, field_size=(10, 10)):
+    """Return a simulation with the given cars, not run yet."""
+    simulation = Simulation(field_size=field_size)
+    for name, position, orientation, instructions in cars:
+        simulation.add_car(Car(name=name, position=position, orientation=orientation, instructions=instructions))
+    return simulation
+
+
+class TestBinaryScenario:
+    """Test Module for binary scenario files."""
+
+    def test_round_trip_before_run(self, tmp_path):
+        """Test that a saved scenario loads back and runs to the same result."""
+        path = str(tmp_path / "scenario.bin")
+        save_binary(build_simulation(EXAMPLE_CARS), path)
+
+        loaded = load_binary(path)
+        assert loaded.field.width == 10 and loaded.field.height == 10
+        assert loaded.car_names == {"A", "B", "Bé"}
+
+        loaded.run_simulation()
+        expected = run(Simulation, (10, 10), EXAMPLE_CARS)
+
+        assert snapshot(loaded) == snapshot(expected)
+        assert occupancy_snapshot(loaded) == occupancy_snapshot(expected)
+        assert loaded.step == expected.step
+
+    def test_results_after_run(self, tmp_path):
+        """Test that results written after a run load back with collisions, occupancy and step."""
+        path = str(tmp_path / "results.bin")
+        expected = run(Simulation, (10, 10), EXAMPLE_CARS)
+        save_binary(expected, path)
+
+        loaded = load_binary(path)
+
+        assert loaded.step == 7
+        assert loaded.cars[0].collision is loaded.cars[1]
+        assert loaded.cars[1].collision_step == 7
+        assert [str(car) for car in loaded.cars.values()] == [str(car) for car in expected.cars.values()]
+        assert occupancy_snapshot(loaded) == occupancy_snapshot(expected)
+
+    def test_cars_are_built_on_lookup(self, tmp_path):
+        """Test that cars are only built when looked up, with their programs read from the file."""
+        path = str(tmp_path / "scenario.bin")
+        save_binary(build_simulation(EXAMPLE_CARS), path)
+
+        loaded = load_binary(path)
+        assert isinstance(loaded.cars, LazyCars)
+        assert isinstance(loaded.cars_in_field, DeferredOccupancy)
+        assert len(loaded.cars) == 3
+        assert dict.__len__(loaded.cars) == 0
+
+        car = loaded.cars[2]
+        assert dict.__len__(loaded.cars) == 1
+        assert car.name == "Bé"
+        assert isinstance(car.program, memoryview)
+        assert loaded.cars[2] is car
+        assert 3 not in loaded.cars
+        with pytest.raises(KeyError):
+            loaded.cars[3]
+
+    def test_occupancy_is_built_on_use(self, tmp_path):
+        """Test that the occupancy map is built the first time it is used and then replaces the stand-in."""
+        path = str(tmp_path / "scenario.bin")
+        save_binary(build_simulation(EXAMPLE_CARS), path)
+
+        loaded = load_binary(path)
+        assert loaded.cars_in_field.occupant(1, 2) is loaded.cars[0]
+        assert isinstance(loaded.cars_in_field, DictOccupancy)
+        assert dict.__len__(loaded.cars) == 3
+
+    def test_grid_occupancy(self, tmp_path):
+        """Test loading with grid occupancy, which is built without building any car."""
+        path = str(tmp_path / "results.bin")
+        expected = run(Simulation, (10, 10), EXAMPLE_CARS)
+        save_binary(expected, path)
+
+        loaded = load_binary(path, occupancy='grid')
+        assert isinstance(loaded.cars_in_field, GridOccupancy)
+        assert dict.__len__(loaded.cars) == 0
+        assert occupancy_snapshot(loaded) == occupancy_snapshot(expected)
+
+    def test_add_car_after_load(self, tmp_path):
+        """Test adding a car to a loaded simulation."""
+        path = str(tmp_path / "scenario.bin")
+        save_binary(build_simulation(EXAMPLE_CARS), path)
+
+        loaded = load_binary(path)
+        loaded.add_car(Car(name="C", position=(9, 0), orientation='W', instructions="FF"))
+        with pytest.raises(ValueError, match="Car with this name already exists."):
+            loaded.add_car(Car(name="A", position=(9, 9), orientation='W', instructions="F"))
+
+        assert len(loaded.cars) == 4
+        assert loaded.cars[3].name == "C"
+
+        loaded.run_simulation()
+        assert loaded.cars[3].position == (7, 0)
+
+    def test_save_over_loaded_file(self, tmp_path):
+        """Test saving a loaded simulation back to the file it runs its programs from."""
+        path = str(tmp_path / "scenario.bin")
+        save_binary(build_simulation(EXAMPLE_CARS), path)
+
+        loaded = load_binary(path)
+        loaded.run_simulation()
+        save_binary(loaded, path)
+
+        assert snapshot(load_binary(path)) == snapshot(run(Simulation, (10, 10), EXAMPLE_CARS))
+        assert not (tmp_path / "scenario.bin.tmp").exists()
+
+    def test_other_engine(self, tmp_path):
+        """Test loading into another simulation class."""
+        path = str(tmp_path / "scenario.bin")
+        save_binary(build_simulation(EXAMPLE_CARS), path)
+
+        loaded = load_binary(path, EventDrivenSimulation)
+        loaded.run_simulation()
+
+        assert snapshot(loaded) == snapshot(run(Simulation, (10, 10), EXAMPLE_CARS))
+
+    @pytest.mark.parametrize("content", [b"", b"10 10\n", b"CARSTATE", b"10 10\n" * 50])
+    def test_not_a_binary_scenario(self, tmp_path, content):
+        """Test that files without a car state are rejected."""
+        path = tmp_path / "scenario.bin"
+        path.write_bytes(content)
+
+        with pytest.raises(ValueError, match="Not a binary scenario file."):
+            load_binary(str(path))
+
+    def test_truncated_binary_scenario(self, tmp_path):
+        """Test that a file cut short anywhere past its magic is rejected rather than read past its end."""
+        path = tmp_path / "scenario.bin"
+        save_binary(build_simulation(EXAMPLE_CARS), str(path))
+        content = path.read_bytes()
+
+        for size in (16, 64, len(content) // 2, len(content) - 1):
+            path.write_bytes(content[:size])
+            with pytest.raises(ValueError, match="Not a binary scenario file."):
+                load_binary(str(path))
+
+    def test_load_scenario_detects_binary(self, tmp_path):
+        """Test that load_scenario reads binary files as well as text files."""
+        path = str(tmp_path / "scenario.bin")
+        save_binary(build_simulation(EXAMPLE_CARS), path)
+
+        assert isinstance(load_scenario(path).cars, LazyCars)
+
+    def test_cli_writes_results(self, tmp_path, capsys):
+        """Test running a scenario file through the CLI and writing its results."""
+        path = tmp_path / "scenario.txt"
+        path.write_text("10 10\nA 1 2 N FFRFFFFRRL\nB 7 8 W FFLFFFFFFF\n")
+        output = str(tmp_path / "results.bin")
+
+        CLI().run_scenario_file(str(path), output=output)
+        printed = capsys.readouterr().out
+
+        # Running the results again changes nothing and prints the same
+        CLI().run_scenario_file(output)
+        assert capsys.readouterr().out == printed
+
+    @pytest.mark.parametrize("seed", range(50))
+    def test_random_results(self, tmp_path, seed):
+        """Test that results of random scenarios survive a round trip."""
+        field_size, cars = build_scenario(seed)
+
+        expected = run(Simulation, field_size, cars)
+
+        path = str(tmp_path / "results.bin")
+        save_binary(expected, path)
+        loaded = load_binary(path)
+
+        assert snapshot(loaded) == snapshot(expected)
+        assert occupancy_snapshot(loaded) == occupancy_snapshot(expected)
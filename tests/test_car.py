@@ -84,4 +84,154 @@ class TestCarMovement:
         car = Car(name="Mover", position=(1, 0), orientation='W', instructions="")
         
         car.move() # car moves forward
-        assert car.position == (0, 0)
\ No newline at end of file
+        assert car.position == (0, 0)
+
+class TestCarProgramCounter:
+    """Test Module for Car Program Counter."""
+
+    def test_car_instructions_follow_program_counter(self):
+        """Test that the remaining instructions are derived from the program counter."""
+        car = Car(name="Counter", position=(0, 0), orientation='N', instructions="FLR")
+        assert car.instructions == "FLR"
+        assert car.has_instructions() is True
+
+        car.program_counter = 2
+        assert car.instructions == "R"
+        assert car.program == b"FLR"  # The program itself is never sliced
+
+        car.program_counter = 3
+        assert car.instructions == ""
+        assert car.has_instructions() is False
+
+    def test_car_instructions_setter_resets_program_counter(self):
+        """Test that assigning instructions replaces the program and resets the counter."""
+        car = Car(name="Counter", position=(0, 0), orientation='N', instructions="FF")
+        car.program_counter = 1
+
+        car.instructions = "LF"
+        assert car.program == b"LF"
+        assert car.program_counter == 0
+        assert car.instructions == "LF"
+
+    def test_car_repr_shows_remaining_instructions(self):
+        """Test that the representation only lists commands not yet executed."""
+        car = Car(name="Counter", position=(1, 2), orientation='N', instructions="FFR")
+        car.program_counter = 1
+        assert repr(car) == "Counter, (1, 2) N, FR"
+
+        car.program_counter = 3
+        assert repr(car) == "Counter, (1, 2) N"
+
+
+class TestCarCompactRepresentation:
+    """Test Module for the compact Car representation."""
+
+    def test_car_has_no_instance_dict(self):
+        """Test that cars use slots instead of a per instance dict."""
+        car = Car(name="Compact", position=(1, 2), orientation='E', instructions="")
+
+        assert not hasattr(car, '__dict__')
+        with pytest.raises(AttributeError):
+            car.speed = 10
+
+    def test_car_integer_state(self):
+        """Test that the position and orientation are kept as integers."""
+        car = Car(name="Compact", position=(1, 2), orientation='S', instructions="")
+
+        assert (car.x, car.y) == (1, 2)
+        assert car.heading == Car.ORIENTATION_CODES['S']
+
+    def test_car_position_property(self):
+        """Test setting the position through the tuple property."""
+        car = Car(name="Compact", position=(1, 2), orientation='N', instructions="")
+        car.position = (4, 5)
+
+        assert (car.x, car.y) == (4, 5)
+        assert car.position == (4, 5)
+
+    def test_car_orientation_property(self):
+        """Test setting the orientation through the letter property."""
+        car = Car(name="Compact", position=(1, 2), orientation='N', instructions="")
+        car.orientation = 'W'
+
+        assert car.heading == 3
+        assert car.orientation == 'W'
+
+        with pytest.raises(ValueError, match="Invalid orientation."):
+            car.orientation = 'X'
+
+    def test_car_turn_tables(self):
+        """Test that the turn tables match four rotations of the car."""
+        car = Car(name="Compact", position=(0, 0), orientation='N', instructions="")
+
+        for expected in ['E', 'S', 'W', 'N']:
+            car.rotate('R')
+            assert car.orientation == expected
+
+        for expected in ['W', 'S', 'E', 'N']:
+            car.rotate('L')
+            assert car.orientation == expected
+
+    def test_car_next_position_does_not_move(self):
+        """Test that next_position leaves the car in place."""
+        car = Car(name="Compact", position=(3, 3), orientation='W', instructions="")
+
+        assert car.next_position() == (2, 3)
+        assert car.position == (3, 3)
+
+    def test_car_accepts_buffer_programs(self):
+        """Test that programs can be given as bytes or memoryviews without copying."""
+        buffer = memoryview(b"xxFFLRxx")[2:6]
+        car = Car(name="Buffered", position=(0, 0), orientation='N', instructions=buffer)
+
+        assert car.program is buffer
+        assert car.instructions == "FFLR"
+
+        car.instructions = b"RF"
+        assert car.program == b"RF"
+        assert car.instructions == "RF"
+
+
+class TestCarFromArrays:
+    """Test Module for building cars from columns."""
+
+    def test_from_arrays(self):
+        """Test that cars built from columns match cars built one by one."""
+        cars = Car.from_arrays(["A", "B"], [1, 7], [2, 8], "NW", ["FFRF", b"F2L"])
+
+        assert [repr(car) for car in cars] == [
+            repr(Car(name="A", position=(1, 2), orientation='N', instructions="FFRF")),
+            repr(Car(name="B", position=(7, 8), orientation='W', instructions=b"F2L")),
+        ]
+
+    def test_run_length_encoded_programs(self):
+        """Test that run length encoded programs are expanded."""
+        cars = Car.from_arrays(["A", "B"], [0, 0], [0, 1], "NN", ["F3", "LR"])
+
+        assert [bytes(car.program) for car in cars] == [b"FFF", b"LR"]
+
+    def test_numpy_columns(self):
+        """Test that NumPy columns give cars with Python ints."""
+        np = pytest.importorskip("numpy")
+        cars = Car.from_arrays(np.array(["A", "B"]), np.array([1, 2]), np.array([3, 4]), np.array(["N", "E"]), ["F", "L"])
+
+        assert [(car.name, car.position, car.orientation) for car in cars] == [("A", (1, 3), 'N'), ("B", (2, 4), 'E')]
+        assert type(cars[0].x) is int
+
+    def test_reports_every_invalid_row(self):
+        """Test that every invalid row is reported together, with the first reason for each."""
+        with pytest.raises(ValueError) as error:
+            Car.from_arrays(["A", "", "C", "D", "E"], [0, 1, -1, 3, 4], [0, 0, 0, 0, 0], "NNNXN", ["F", "F", "F", "F", 5])
+
+        assert str(error.value) == (
+            "4 invalid car(s):\n"
+            "- row 1: Name cannot be empty.\n"
+            "- row 2: Initial position must be a tuple of two positive integers.\n"
+            "- row 3: Invalid orientation.\n"
+            "- row 4: Instructions must be a string."
+        )
+
+    def test_columns_of_different_lengths(self):
+        """Test that every column must have a value for every car."""
+        with pytest.raises(ValueError, match="Columns must have the same length."):
+            Car.from_arrays(["A", "B"], [0], [0, 1], "NN", ["", ""])
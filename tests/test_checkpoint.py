@@ -0,0 +1,158 @@
+import pytest
+from src.car import Car
+from src.CLI import CLI
+from src.checkpoint import Checkpointer
+from src.simulation import Simulation
+from src.vectorized import VectorizedSimulation
+from tests.helpers import build, build_scenario, build_sparse_scenario, occupancy_snapshot, run, snapshot
+
+
+class Evicted(Exception):
+    """Raised to stop a run the way an evicted pod would."""
+
+
+class EvictingCheckpointer(Checkpointer):
+    """Checkpointer that stops the run right after writing a given number of checkpoints."""
+
+    def __init__(self, path, every_steps, evict_after):
+        super().__init__(path, every_steps)
+        self.evict_after = evict_after
+
+    def save(self, simulation):
+        super().save(simulation)
+        if self.saved == self.evict_after:
+            raise Evicted()
+
+
+def run_evicted(simulation_class, field_size, cars, path, every_steps, evict_after):
+    """Run a scenario until it is evicted and return the step of the last checkpoint, or None if it finished."""
+    simulation = simulation_class(field_size=field_size)
+    for name, position, orientation, instructions in cars:
+        simulation.add_car(Car(name=name, position=position, orientation=orientation, instructions=instructions))
+    simulation.checkpoints = EvictingCheckpointer(path, every_steps, evict_after)
+
+    try:
+        simulation.run_simulation()
+    except Evicted:
+        return simulation.step
+    return None
+
+
+def count_checkpoints(simulation_class, field_size, cars, path):
+    """Return how many checkpoints a run writes when one is due after every step."""
+    simulation = build(simulation_class, field_size, cars)
+    simulation.checkpoints = Checkpointer(path, every_steps=1)
+    simulation.run_simulation()
+    return simulation.checkpoints.saved
+
+
+class TestCheckpointer:
+    """Test Module for Checkpointer Class."""
+
+    @pytest.mark.parametrize("every_steps, every_seconds, message", [
+        (None, None, "Checkpoints need a number of steps or seconds."),
+        (0, None, "Checkpoint steps must be a positive integer."),
+        (1.5, None, "Checkpoint steps must be a positive integer."),
+        (None, -1, "Checkpoint seconds must be positive."),
+    ])
+    def test_invalid_intervals(self, every_steps, every_seconds, message):
+        """Test that checkpoint intervals must be positive."""
+        with pytest.raises(ValueError, match=message):
+            Checkpointer("checkpoint.bin", every_steps, every_seconds)
+
+    def test_due_every_steps(self):
+        """Test that checkpoints are due on multiples of the step interval."""
+        checkpointer = Checkpointer("checkpoint.bin", every_steps=3)
+
+        assert [step for step in range(1, 10) if checkpointer.due(step)] == [3, 6, 9]
+
+    def test_due_every_seconds(self, mocker, tmp_path):
+        """Test that checkpoints are due once the time interval has passed since the last one."""
+        clock = mocker.patch("src.checkpoint.time.monotonic", return_value=100.0)
+        checkpointer = Checkpointer(str(tmp_path / "checkpoint.bin"), every_seconds=5)
+
+        clock.return_value = 104.0
+        assert not checkpointer.due(1)
+        clock.return_value = 105.0
+        assert checkpointer.due(2)
+
+        checkpointer.save(Simulation(field_size=(3, 3)))
+        assert not checkpointer.due(3)
+        assert checkpointer.saved == 1
+
+    def test_enable_checkpoints(self, tmp_path):
+        """Test that a run writes a checkpoint that holds its state at the last checkpoint step."""
+        path = str(tmp_path / "checkpoint.bin")
+        simulation = Simulation(field_size=(10, 10))
+        simulation.add_car(Car(name="A", position=(0, 0), orientation='N', instructions="FFFFF"))
+        simulation.add_car(Car(name="B", position=(9, 0), orientation='N', instructions="FFFFFFF"))
+        simulation.enable_checkpoints(path, every_steps=2)
+        simulation.run_simulation()
+
+        assert simulation.checkpoints.saved == 2
+        resumed = Simulation.resume(path)
+        assert resumed.step == 4
+        assert resumed.cars[0].position == (0, 4)
+        assert resumed.cars[1].instructions == "FFF"
+
+
+class TestResume:
+    """Test Module for resuming simulations from checkpoints."""
+
+    def test_resume_after_eviction(self, tmp_path):
+        """Test that a run resumed from the checkpoint before an eviction ends like an uninterrupted run."""
+        cars = [
+            ("A", (1, 2), 'N', "FFRFFFFRRL"),
+            ("B", (7, 8), 'W', "FFLFFFFFFF"),
+            ("C", (0, 9), 'E', "FRFLLLLLLLLLL"),
+        ]
+        path = str(tmp_path / "checkpoint.bin")
+
+        assert run_evicted(Simulation, (10, 10), cars, path, every_steps=3, evict_after=2) == 6
+
+        resumed = Simulation.resume(path)
+        assert resumed.step == 6
+        resumed.run_simulation()
+        expected = run(Simulation, (10, 10), cars)
+
+        assert snapshot(resumed) == snapshot(expected)
+        assert occupancy_snapshot(resumed) == occupancy_snapshot(expected)
+        assert resumed.step == expected.step
+
+    @pytest.mark.parametrize("simulation_class", [Simulation, VectorizedSimulation])
+    @pytest.mark.parametrize("seed", range(40))
+    def test_random_resume(self, tmp_path, simulation_class, seed):
+        """Test that random runs evicted after a checkpoint resume to the same final state, collisions included."""
+        field_size, cars = build_scenario(seed) if seed % 2 else build_sparse_scenario(seed)
+        path = str(tmp_path / "checkpoint.bin")
+
+        expected = run(simulation_class, field_size, cars)
+        checkpointed = count_checkpoints(simulation_class, field_size, cars, str(tmp_path / "count.bin"))
+
+        if checkpointed:
+            # Space the checkpoints so the run is evicted on its last checkpoint at the latest
+            every_steps = max(1, checkpointed // (2 + seed % 4))
+            evict_after = min(2, checkpointed // every_steps)
+            assert run_evicted(simulation_class, field_size, cars, path, every_steps, evict_after) is not None
+        else:
+            # The whole run was fast forwarded, so resume from a checkpoint of the unstarted simulation
+            Checkpointer(path, every_steps=1).save(build(simulation_class, field_size, cars))
+
+        resumed = simulation_class.resume(path)
+        resumed.run_simulation()
+
+        assert snapshot(resumed) == snapshot(expected)
+        assert occupancy_snapshot(resumed) == occupancy_snapshot(expected)
+        assert resumed.step == expected.step
+
+    def test_cli_resume(self, tmp_path, capsys):
+        """Test writing checkpoints from the CLI and running the checkpoint file to resume."""
+        path = tmp_path / "scenario.txt"
+        path.write_text("10 10\nA 1 2 N FFRFFFFRRL\nB 7 8 W FFLFFFFFFF\n")
+        checkpoint = str(tmp_path / "run.ckpt")
+
+        CLI().run_scenario_file(str(path), checkpoint=checkpoint, checkpoint_steps=3)
+        printed = capsys.readouterr().out
+
+        CLI().run_scenario_file(checkpoint)
+        assert capsys.readouterr().out == printed
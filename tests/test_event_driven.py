@@ -0,0 +1,231 @@
+import pytest
+from src.car import Car
+from src.event_driven import EventDrivenSimulation, Segment, Trajectory, build_trajectory, meeting_step
+from src.simulation import Simulation
+from src.vectorized import VectorizedSimulation
+from tests.helpers import build_scenario, build_sparse_scenario, occupancy_snapshot, run, snapshot
+
+
+class TestTrajectory:
+    """Test Module for the trajectories used by EventDrivenSimulation."""
+
+    def test_build_trajectory(self):
+        """Test that runs of moves become moving segments and rotations stand still."""
+        simulation = EventDrivenSimulation(field_size=(10, 10))
+        trajectory = simulation.build_trajectory(Car(name="A", position=(1, 2), orientation='N', instructions="FFRFFFFRRL"))
+
+        assert [(segment.start, segment.end, segment.dx, segment.dy) for segment in trajectory.segments] == [
+            (0, 0, 0, 0), (1, 2, 0, 1), (3, 3, 0, 0), (4, 7, 1, 0), (8, 10, 0, 0), (11, trajectory.segments[-1].end, 0, 0),
+        ]
+        assert trajectory.state_at(10, b"FFRFFFFRRL")[:3] == (5, 4, 2)
+
+    def test_boundary_stops_the_car(self):
+        """Test that moves against the boundary leave the car where it is."""
+        simulation = EventDrivenSimulation(field_size=(3, 3))
+        car = Car(name="A", position=(0, 1), orientation='N', instructions="FFFR")
+        trajectory = simulation.build_trajectory(car)
+
+        assert trajectory.state_at(2, car.program) == (0, 2, 0, 2)
+        assert trajectory.state_at(4, car.program) == (0, 2, 1, 4)
+        assert list(trajectory.boxes()) == [(0, 1, 0, 1), (0, 2, 0, 2), (0, 2, 0, 2), (0, 2, 0, 2)]
+
+    def test_build_trajectory_until(self):
+        """Test that a trajectory stops before the command at the end given, part way into a run."""
+        simulation = EventDrivenSimulation(field_size=(10, 10))
+        car = Car(name="A", position=(1, 2), orientation='N', instructions="FFRRRFFF")
+        trajectory = build_trajectory(simulation, car, 4)
+
+        assert [(segment.start, segment.end, segment.dx, segment.dy) for segment in trajectory.segments] == [
+            (0, 0, 0, 0), (1, 2, 0, 1), (3, 4, 0, 0), (5, trajectory.segments[-1].end, 0, 0),
+        ]
+        assert trajectory.state_at(4, car.program) == (1, 4, 2, 4)
+        assert trajectory.segments[-1].heading == 2
+
+    def test_stopped_after(self):
+        """Test cutting a trajectory short in the middle of a run of rotations."""
+        program = b"FRRF"
+        trajectory = Trajectory([
+            Segment(0, 0, 0, 0, 0, 0, 0, 0, False),
+            Segment(1, 1, 0, 1, 0, 1, 0, 0, True),
+            Segment(2, 3, 0, 1, 0, 0, 0, 1, True),
+            Segment(4, 4, 0, 0, 0, -1, 2, 3, True),
+            Segment(5, 1 << 62, 0, 0, 0, 0, 2, 4, False),
+        ])
+        stopped = trajectory.stopped_after(2, program)
+
+        assert stopped.segments[-1][2:] == (0, 1, 0, 0, 1, 2, False)
+        assert not stopped.moves[-1].end > 2
+
+    def test_meeting_step(self):
+        """Test solving for the step at which two straight segments meet."""
+        move = Segment(1, 10, 1, 0, 1, 0, 1, 0, True)
+        parked = Segment(0, 1 << 62, 5, 0, 0, 0, 0, 0, False)
+        oncoming = Segment(1, 10, 7, 0, -1, 0, 3, 0, True)
+
+        assert meeting_step(move, parked, 0, 1, 10) == 5
+        assert meeting_step(move, parked, 0, 1, 4) is None
+        assert meeting_step(move, oncoming, 0, 1, 10) == 4
+        assert meeting_step(move, oncoming, 1, 1, 10) is None
+
+
+class TestEventDrivenSimulation:
+    """Test Module for EventDrivenSimulation Class."""
+
+    def test_run_simulation_single_car(self):
+        """Test running the example scenario with a single car."""
+        simulation = run(EventDrivenSimulation, (10, 10), [("A", (1, 2), 'N', "FFRFFFFRRL")])
+        car = simulation.cars[0]
+
+        assert repr(car) == "A, (5, 4) S"
+        assert car.instructions == ""
+        assert simulation.step == 10
+
+    def test_run_simulation_collision(self):
+        """Test the example scenario with two colliding cars."""
+        simulation = run(EventDrivenSimulation, (10, 10), [
+            ("A", (1, 2), 'N', "FFRFFFFRRL"),
+            ("B", (7, 8), 'W', "FFLFFFFFFF"),
+        ])
+        car_a, car_b = simulation.cars[0], simulation.cars[1]
+
+        assert car_a.collision is car_b
+        assert car_b.collision is car_a
+        assert car_a.position == car_b.position == (5, 4)
+        assert car_a.collision_step == car_b.collision_step == 7
+        assert car_a.instructions == "RRL"
+        assert simulation.cars_in_field[(5, 4)] == [car_b, car_a]
+        assert simulation.step == 7
+
+    def test_hit_car_skips_its_command(self):
+        """Test that a car hit before its turn in a step does not execute its command."""
+        simulation = run(EventDrivenSimulation, (10, 10), [
+            ("A", (0, 0), 'N', "F"),
+            ("B", (0, 1), 'E', "LF"),
+        ])
+        car_b = simulation.cars[1]
+
+        assert car_b.collision_step == 1
+        assert car_b.orientation == 'E'
+        assert car_b.instructions == "LF"
+
+    def test_car_order_decides_who_moves_first(self):
+        """Test that a car can follow a higher index car into its cell, but not a lower index one."""
+        follows = run(EventDrivenSimulation, (10, 10), [("A", (0, 0), 'E', "FF"), ("B", (1, 0), 'E', "FF")])
+        leads = run(EventDrivenSimulation, (10, 10), [("A", (1, 0), 'E', "FF"), ("B", (0, 0), 'E', "FF")])
+
+        assert follows.cars[0].collision is follows.cars[1]
+        assert follows.cars[0].collision_step == 1
+        assert not leads.cars[0].collision
+        assert leads.cars[1].position == (2, 0)
+
+    def test_long_routes_skip_idle_steps(self):
+        """Test that cars far apart on long routes only meet at the end."""
+        simulation = run(EventDrivenSimulation, (100000, 3), [
+            ("A", (0, 0), 'E', "F" * 49999),
+            ("B", (99999, 0), 'W', "F" * 49999),
+        ])
+
+        assert simulation.cars[0].position == (49999, 0)
+        assert simulation.cars[1].position == (50000, 0)
+        assert simulation.step == 49999
+        assert not simulation.cars[0].collision
+
+    def test_continues_after_previous_run(self):
+        """Test running again after giving the cars new commands."""
+        simulation = run(EventDrivenSimulation, (10, 10), [
+            ("A", (0, 0), 'N', "FF"),
+            ("B", (3, 3), 'W', "F"),
+        ])
+        simulation.cars[0].instructions = "RFFF"
+        simulation.cars[1].instructions = "LF"
+        simulation.run_simulation()
+
+        assert simulation.cars[0].position == (2, 2)
+        assert simulation.cars[1].position == (2, 2)
+        assert simulation.cars[0].collision_step == 5
+        assert simulation.step == 5
+
+    def test_dense_field_falls_back_to_stepping(self, monkeypatch):
+        """Test that a field where every route crosses is stepped through, with the same results as Simulation."""
+        steps = []
+        run_step = Simulation.run_step
+        monkeypatch.setattr(Simulation, 'run_step', lambda simulation: steps.append(simulation.step) or run_step(simulation))
+        cars = [(f"Car{car_index}", (car_index, car_index), 'N', "FRFRFRFL" * 20) for car_index in range(8)]
+
+        expected = run(Simulation, (8, 8), cars)
+        steps.clear()
+        actual = run(EventDrivenSimulation, (8, 8), cars)
+
+        assert steps
+        assert snapshot(actual) == snapshot(expected)
+        assert actual.step == expected.step
+
+    def test_sparse_field_skips_stepping(self, monkeypatch):
+        """Test that a field where few routes cross never steps."""
+        monkeypatch.setattr(Simulation, 'run_step', lambda simulation: pytest.fail("stepped"))
+
+        simulation = run(EventDrivenSimulation, (1000, 1000), [
+            ("A", (0, 0), 'E', "F" * 500),
+            ("B", (999, 0), 'W', "F" * 500),
+            ("C", (0, 999), 'E', "F" * 500),
+        ])
+
+        assert simulation.cars[0].collision is simulation.cars[1]
+        assert simulation.cars[2].position == (500, 999)
+
+    def test_dense_field_falls_back_before_building_trajectories(self, monkeypatch):
+        """Test that the pair work of a crowded field is judged too high from command counts alone."""
+        monkeypatch.setattr(EventDrivenSimulation, 'build_trajectory', lambda simulation, car: pytest.fail("built"))
+        cars = [(f"Car{car_index}", (car_index, car_index), 'N', "FRFRFRFL" * 20) for car_index in range(8)]
+
+        actual = run(EventDrivenSimulation, (8, 8), cars)
+
+        assert snapshot(actual) == snapshot(run(Simulation, (8, 8), cars))
+
+    def test_reach_box(self):
+        """Test that a car that never turns again reaches a line ahead of it, and one that turns a square."""
+        simulation = EventDrivenSimulation(field_size=(100, 100))
+        car = Car(name="A", position=(10, 50), orientation='W', instructions="F")
+
+        assert simulation.reach_box(car, 30, 0) == (0, 50, 10, 50)
+        assert simulation.reach_box(car, 30, 1) == (0, 20, 40, 80)
+
+    def test_footprints_computed_once(self, mocker):
+        """Test that a car's footprint is computed once for indexing and pairing, and again only when it stops."""
+        spy = mocker.spy(Trajectory, 'footprint')
+
+        simulation = run(EventDrivenSimulation, (1000, 1000), [
+            ("A", (0, 0), 'E', "F" * 500),
+            ("B", (999, 0), 'W', "F" * 500),
+            ("C", (0, 999), 'E', "F" * 500),
+        ])
+
+        assert simulation.cars[0].collision is simulation.cars[1]
+        assert spy.call_count == 5  # Three cars, then A and B once they collide
+
+    @pytest.mark.parametrize("seed", range(300))
+    def test_matches_simulation(self, seed, monkeypatch):
+        """Test that random scenarios produce the same final state as Simulation."""
+        monkeypatch.setattr(EventDrivenSimulation, 'MAX_PAIR_WORK_PER_COMMAND', None)
+        field_size, cars = build_scenario(seed)
+
+        expected = run(Simulation, field_size, cars)
+
+        actual = run(EventDrivenSimulation, field_size, cars)
+
+        assert snapshot(actual) == snapshot(expected)
+        assert occupancy_snapshot(actual) == occupancy_snapshot(expected)
+        assert actual.step == expected.step
+
+    @pytest.mark.parametrize("seed", range(100))
+    def test_matches_vectorized_on_long_routes(self, seed, monkeypatch):
+        """Test that sparse scenarios with long routes, including pile-ups, match VectorizedSimulation."""
+        monkeypatch.setattr(EventDrivenSimulation, 'MAX_PAIR_WORK_PER_COMMAND', None)
+        field_size, cars = build_sparse_scenario(seed)
+
+        expected = run(VectorizedSimulation, field_size, cars)
+        actual = run(EventDrivenSimulation, field_size, cars)
+
+        assert snapshot(actual) == snapshot(expected)
+        assert occupancy_snapshot(actual) == occupancy_snapshot(expected)
+        assert actual.step == expected.step
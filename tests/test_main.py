@@ -0,0 +1,46 @@
+import pytest
+from main import main
+
+
+class TestMain:
+    """Test Module for the command line entry point."""
+
+    def test_invalid_scenario_file(self, tmp_path, capsys):
+        """Test that an invalid scenario file prints the error and exits with a non-zero status."""
+        path = tmp_path / "scenario.txt"
+        path.write_text("10 10\nA 1 2 X FF\n")
+
+        with pytest.raises(SystemExit) as exit_info:
+            main(["--scenario", str(path)])
+
+        assert exit_info.value.code == 1
+        assert capsys.readouterr().out.startswith("Line 2: Invalid input.")
+
+    def test_missing_scenario_file(self, tmp_path, capsys):
+        """Test that a missing scenario file prints the error and exits with a non-zero status."""
+        path = tmp_path / "missing.txt"
+
+        with pytest.raises(SystemExit) as exit_info:
+            main(["--scenario", str(path)])
+
+        assert exit_info.value.code == 1
+        assert "No such file or directory" in capsys.readouterr().out
+
+    def test_missing_batch_file(self, tmp_path, capsys):
+        """Test that a missing batch file prints the error and exits with a non-zero status."""
+        path = tmp_path / "missing.jsonl"
+
+        with pytest.raises(SystemExit) as exit_info:
+            main(["--batch", str(path), "--workers", "1"])
+
+        assert exit_info.value.code == 1
+        assert "No such file or directory" in capsys.readouterr().out
+
+    def test_valid_scenario_file(self, tmp_path, capsys):
+        """Test that a valid scenario file runs without exiting."""
+        path = tmp_path / "scenario.txt"
+        path.write_text("10 10\nA 1 2 N FFRFFFFRRL\nB 7 8 W FFLFFFFFFF\n")
+
+        main(["--scenario", str(path)])
+
+        assert "- A, collides with B at (5,4) at step 7" in capsys.readouterr().out
@@ -0,0 +1,213 @@
+import random
+
+import pytest
+from main import main
+from src.metrics import SimulationMetrics, profiled
+from src.simulation import Simulation
+from src.vectorized import VectorizedSimulation
+from tests.helpers import EXAMPLE_CARS, build, snapshot
+
+
+class TestSimulationMetrics:
+    """Test Module for SimulationMetrics Class."""
+
+    def test_count_commands(self):
+        """Test counting a run of commands by kind."""
+        metrics = SimulationMetrics()
+        metrics.count_commands(b"FFLRRF")
+
+        assert (metrics.forward, metrics.left, metrics.right, metrics.other) == (3, 1, 2, 0)
+        assert metrics.commands == 6
+
+    def test_summary(self):
+        """Test that the summary lists every counter and timing."""
+        summary = SimulationMetrics().summary()
+
+        assert "forward: 0" in summary
+        assert "step_seconds: 0.000000" in summary
+        assert len(summary.splitlines()) == len(SimulationMetrics().as_dict())
+
+
+class TestInstrumentedSimulation:
+    """Test Module for metrics collected from a running Simulation."""
+
+    def test_example_scenario(self):
+        """Test the counters of the example scenario, where A and B collide at step 7."""
+        simulation = build(Simulation, (10, 10), EXAMPLE_CARS[:2])
+        metrics = simulation.enable_metrics()
+        simulation.run_simulation()
+
+        assert simulation.metrics is metrics
+        assert (metrics.forward, metrics.left, metrics.right) == (12, 1, 1)
+        assert metrics.occupancy_lookups == 12
+        assert metrics.collisions == 1
+        assert metrics.steps == simulation.step == 7
+        assert len(metrics.step_seconds) == 7
+        assert metrics.run_seconds >= sum(metrics.step_seconds) > 0
+
+    def test_out_of_bounds(self):
+        """Test that moves off the field are counted and do not look up the occupancy map."""
+        simulation = build(Simulation, (3, 3), [("A", (0, 0), 'S', "FFRF"), ("B", (2, 2), 'N', "FLLF")])
+        metrics = simulation.enable_metrics()
+        simulation.run_steps(4)
+
+        assert metrics.out_of_bounds == 4
+        assert metrics.occupancy_lookups == 1
+        assert metrics.collisions == 0
+
+    def test_fast_forward(self):
+        """Test that the commands of the last active car are counted when fast forwarded."""
+        simulation = build(Simulation, (10, 10), [("A", (0, 0), 'N', "F"), ("B", (5, 5), 'E', "FFFFFFLLRFFF")])
+        metrics = simulation.enable_metrics()
+        simulation.run_simulation()
+
+        assert (metrics.forward, metrics.left, metrics.right) == (10, 2, 1)
+        assert (metrics.out_of_bounds, metrics.occupancy_lookups) == (2, 8)
+        assert metrics.steps == simulation.step == 12
+        assert metrics.fast_forward_seconds > 0
+
+    def test_rotation_tails(self):
+        """Test that the commands of rotation tails finished at once are counted."""
+        simulation = build(Simulation, (10, 10), [("A", (0, 0), 'N', "FLLLL"), ("B", (5, 5), 'E', "RRR")])
+        metrics = simulation.enable_metrics()
+        simulation.run_simulation()
+
+        assert (metrics.forward, metrics.left, metrics.right) == (1, 4, 3)
+        assert len(metrics.step_seconds) == 1
+        assert metrics.steps == simulation.step == 5
+
+    def test_skipped_cycles(self):
+        """Test that the commands and steps of skipped cycles are counted."""
+        simulation = build(Simulation, (20, 20), [("A", (0, 0), 'N', "FFR" * 100), ("B", (10, 10), 'N', "FFL" * 200)])
+        metrics = simulation.enable_metrics()
+        simulation.run_simulation()
+
+        assert (metrics.forward, metrics.left, metrics.right) == (600, 200, 100)
+        assert len(metrics.step_seconds) == 0
+        assert metrics.steps == simulation.step == 600
+
+    def test_fast_forward_collision(self):
+        """Test that a move into another car ending a fast forward is counted once."""
+        simulation = build(Simulation, (10, 10), [("A", (0, 0), 'N', "FFFFF"), ("B", (0, 3), 'N', "")])
+        metrics = simulation.enable_metrics()
+        simulation.run_simulation()
+
+        assert metrics.forward == 3
+        assert metrics.occupancy_lookups == 3
+        assert metrics.collisions == 1
+        assert metrics.steps == simulation.step == 3
+
+    def test_skipped_boundary_pushes(self, mocker):
+        """Test that moves against the boundary skipped by suspended cars count as out of bounds."""
+        simulation = build(Simulation, (20, 20), [("A", (0, 15), 'N', "F" * 300 + "R"), ("B", (1, 1), 'S', "(FFFFR)100")])
+        metrics = simulation.enable_metrics()
+        spy = mocker.spy(simulation, 'suspend')
+        simulation.run_simulation()
+
+        # A pushes against the top after 4 moves, B against the bottom and left sides in its first block only
+        assert spy.call_count == 2
+        assert metrics.forward == 700
+        assert metrics.out_of_bounds == 296 + 6
+        assert metrics.occupancy_lookups == 4 + 394
+
+    @pytest.mark.parametrize("seed", range(40))
+    def test_run_matches_stepping(self, seed):
+        """Test that run_simulation, with everything it skips, counts the same as stepping through every command."""
+        rng = random.Random(seed)
+        size = (rng.randint(3, 30), rng.randint(3, 30))
+        cells = rng.sample([(x, y) for x in range(size[0]) for y in range(size[1])], min(rng.randint(1, 6), size[0] * size[1]))
+        cars = []
+        for car_index, cell in enumerate(cells):
+            block = ''.join(rng.choices('FFFLR', k=rng.randint(1, 6)))
+            instructions = ''.join(rng.choices('FFLR', k=rng.randint(0, 20))) + block * rng.randint(0, 300) + 'F' * rng.randint(0, 400)
+            cars.append((f"Car{car_index}", cell, rng.choice('NESW'), instructions + ''.join(rng.choices('LR', k=rng.randint(0, 5)))))
+
+        counters = []
+        for drive in (lambda simulation: simulation.run_simulation(), lambda simulation: list(simulation.iter_steps())):
+            simulation = build(Simulation, size, cars)
+            metrics = simulation.enable_metrics()
+            drive(simulation)
+            counters.append({name: value for name, value in metrics.as_dict().items() if not name.endswith('seconds')})
+
+        assert counters[0] == counters[1]
+
+    def test_results_unchanged(self):
+        """Test that instrumented runs end like plain ones, including for other engines."""
+        expected = build(Simulation, (10, 10), EXAMPLE_CARS)
+        expected.run_simulation()
+
+        for simulation_class in (Simulation, VectorizedSimulation):
+            simulation = build(simulation_class, (10, 10), EXAMPLE_CARS)
+            metrics = simulation.enable_metrics()
+            simulation.run_simulation()
+
+            assert snapshot(simulation) == snapshot(expected)
+            assert metrics.run_seconds > 0
+
+    def test_disable_metrics(self):
+        """Test that disabling metrics restores the class methods and keeps the metrics collected so far."""
+        simulation = build(Simulation, (10, 10), EXAMPLE_CARS)
+        metrics = simulation.enable_metrics()
+        simulation.run_steps(2)
+        simulation.disable_metrics()
+        simulation.run_steps(2)
+
+        assert simulation.run_step.__func__ is Simulation.run_step
+        assert simulation.move_car.__func__ is Simulation.move_car
+        assert simulation.metrics is metrics
+        assert metrics.steps == 2
+
+    def test_enable_twice(self):
+        """Test that enabling metrics again starts from zero instead of wrapping the wrappers."""
+        simulation = build(Simulation, (10, 10), EXAMPLE_CARS)
+        simulation.enable_metrics()
+        simulation.run_steps(2)
+        metrics = simulation.enable_metrics()
+        simulation.run_steps(1)
+
+        assert metrics.steps == 1
+        assert metrics.commands == 3
+
+
+class TestProfiled:
+    """Test Module for the profiled context manager."""
+
+    @pytest.mark.parametrize("mode, expected", [
+        ('cprofile', "function calls"),
+        ('tracemalloc', "Peak traced memory"),
+    ])
+    def test_modes(self, mode, expected):
+        """Test that each mode reports on the profiled body."""
+        reports = []
+        with profiled(mode, output=reports.append):
+            build(Simulation, (10, 10), EXAMPLE_CARS).run_simulation()
+
+        assert len(reports) == 1
+        assert expected in reports[0]
+
+    def test_no_mode(self):
+        """Test that no mode reports nothing."""
+        reports = []
+        with profiled(None, output=reports.append):
+            pass
+
+        assert reports == []
+
+    def test_invalid_mode(self):
+        """Test that unknown modes are rejected."""
+        with pytest.raises(ValueError, match="Profile mode must be 'cprofile' or 'tracemalloc'."):
+            with profiled('perf'):
+                pass
+
+    def test_cli(self, tmp_path, capsys):
+        """Test the metrics and profile options of the command line."""
+        path = tmp_path / "scenario.txt"
+        path.write_text("10 10\nA 1 2 N FFRFFFFRRL\nB 7 8 W FFLFFFFFFF\n")
+
+        main(["--scenario", str(path), "--metrics", "--profile", "cprofile"])
+        printed = capsys.readouterr().out
+
+        assert "- A, collides with B at (5,4) at step 7" in printed
+        assert "Metrics:\nforward: 12" in printed
+        assert "collisions: 1" in printed
+        assert "function calls" in printed
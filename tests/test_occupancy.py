@@ -0,0 +1,266 @@
+import random
+
+import pytest
+from src.car import Car
+from src.occupancy import CollisionCell, DictOccupancy, GridOccupancy
+from src.simulation import Simulation
+
+
+class TestCollisionCell:
+    """Test Module for CollisionCell Class."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup a cell where Car2 and then Car3 drove into Car1."""
+        self.cars = {
+            car_index: Car(name=f"Car{car_index + 1}", position=(car_index, 0), orientation='N', instructions="")
+            for car_index in range(3)
+        }
+        self.cell = CollisionCell(self.cars, [0, 1], 5)
+        self.cell.enter(2)
+
+    def test_record(self):
+        """Test the car that was hit and the cars that drove in."""
+        assert self.cell.owner == 0
+        assert self.cell.entered == [1, 2]
+        assert self.cell.step == 5
+        assert repr(self.cell) == "CollisionCell(car_indices=[0, 1, 2], step=5)"
+
+    def test_sequence(self):
+        """Test that the cell lists its cars newest first, ending with the car that was hit."""
+        assert list(self.cell) == [self.cars[2], self.cars[1], self.cars[0]]
+        assert self.cell == [self.cars[2], self.cars[1], self.cars[0]]
+        assert len(self.cell) == 3
+        assert self.cell[0] is self.cars[2]
+        assert self.cell[-1] is self.cars[0]
+        assert self.cell[:-1] == [self.cars[2], self.cars[1]]
+        assert self.cars[1] in self.cell
+
+        with pytest.raises(IndexError):
+            self.cell[3]
+
+    def test_equality(self):
+        """Test that cells with the same cars and step are equal."""
+        assert self.cell == CollisionCell(self.cars, [0, 1, 2], 5)
+        assert self.cell != CollisionCell(self.cars, [0, 1, 2], 6)
+        assert self.cell != CollisionCell(self.cars, [0, 2, 1], 5)
+
+
+class TestDictOccupancy:
+    """Test Module for DictOccupancy Class."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup an occupancy map with two cars."""
+        self.cars = {
+            0: Car(name="Car1", position=(0, 0), orientation='N', instructions=""),
+            1: Car(name="Car2", position=(1, 0), orientation='N', instructions=""),
+        }
+        self.occupancy = DictOccupancy(self.cars)
+
+    def test_place_and_vacate(self):
+        """Test placing a car in a cell and removing it again."""
+        self.occupancy.place(0, 0, 0)
+        assert self.occupancy.occupant(0, 0) is self.cars[0]
+        assert self.occupancy[(0, 0)] is self.cars[0]
+
+        self.occupancy.vacate(0, 0)
+        assert self.occupancy.occupant(0, 0) is None
+        assert (0, 0) not in self.occupancy
+
+        # Vacating an empty cell is a no-op
+        self.occupancy.vacate(0, 0)
+
+    def test_mark_collision(self):
+        """Test that a collision cell lists the entering car first."""
+        self.occupancy.place(0, 0, 0)
+        self.occupancy.mark_collision(0, 0, 1)
+
+        assert self.occupancy[(0, 0)] == [self.cars[1], self.cars[0]]
+
+    def test_pile_up(self):
+        """Test that later cars are appended to the same collision cell record."""
+        self.cars[2] = Car(name="Car3", position=(2, 0), orientation='N', instructions="")
+        self.occupancy.place(0, 0, 0)
+        self.occupancy.mark_collision(0, 0, 1, step=4)
+        cell = self.occupancy.occupant(0, 0)
+        self.occupancy.mark_collision(0, 0, 2)
+
+        assert self.occupancy.occupant(0, 0) is cell
+        assert cell.car_indices == [0, 1, 2]
+        assert cell.step == 4
+        assert list(self.occupancy.collision_cells()) == [cell]
+
+    def test_place_many(self):
+        """Test placing several cars at once."""
+        self.occupancy.place_many([(3, 4), (5, 6)], [0, 1])
+
+        assert self.occupancy.occupant(3, 4) is self.cars[0]
+        assert self.occupancy.occupant(5, 6) is self.cars[1]
+
+
+class TestGridOccupancy:
+    """Test Module for GridOccupancy Class."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup a grid with two cars."""
+        self.cars = {
+            0: Car(name="Car1", position=(0, 0), orientation='N', instructions=""),
+            1: Car(name="Car2", position=(2, 1), orientation='N', instructions=""),
+        }
+        self.grid = GridOccupancy(3, 2, self.cars)
+
+    def test_place_and_vacate(self):
+        """Test placing cars at their flat index and removing them again."""
+        self.grid.place(2, 1, 1)
+        assert self.grid.cells[1 * 3 + 2] == 1
+        assert self.grid.occupant(2, 1) is self.cars[1]
+        assert self.grid.occupant(0, 0) is None
+
+        self.grid.vacate(2, 1)
+        assert self.grid.cells[5] == GridOccupancy.EMPTY
+        assert self.grid.occupant(2, 1) is None
+
+    def test_place_many(self):
+        """Test placing several cars at their flat indices at once."""
+        self.grid.place_many([(0, 0), (2, 1)], [0, 1])
+
+        assert list(self.grid.cells) == [0, GridOccupancy.EMPTY, GridOccupancy.EMPTY, GridOccupancy.EMPTY, GridOccupancy.EMPTY, 1]
+
+    def test_cell_size(self):
+        """Test that cells are 4 bytes wide, keeping the largest automatic grid within 256 MiB."""
+        assert self.grid.cells.itemsize == 4
+        assert Simulation.GRID_MAX_CELLS * self.grid.cells.itemsize <= 256 << 20
+
+    def test_mark_collision(self):
+        """Test that collision cells hold the sentinel and list their cars."""
+        self.grid.place(0, 0, 0)
+        self.grid.mark_collision(0, 0, 1)
+
+        assert self.grid.cells[0] == GridOccupancy.COLLISION
+        assert self.grid.occupant(0, 0) == [self.cars[1], self.cars[0]]
+
+        self.grid.vacate(0, 0)
+        assert self.grid.collisions == {}
+
+    def test_pile_up(self):
+        """Test that later cars are appended to the same collision cell record."""
+        self.cars[2] = Car(name="Car3", position=(1, 1), orientation='N', instructions="")
+        self.grid.place(0, 0, 0)
+        self.grid.mark_collision(0, 0, 1, step=4)
+        self.grid.mark_collision(0, 0, 2)
+
+        assert self.grid.collisions == {0: CollisionCell(self.cars, [0, 1, 2], 4)}
+        assert list(self.grid.collision_cells()) == [self.grid.occupant(0, 0)]
+
+    def test_copy_collision_cell(self):
+        """Test that a grid built from a dict occupancy map holds copies of its collision cells."""
+        cells = DictOccupancy(self.cars)
+        cells.place(0, 0, 0)
+        cells.mark_collision(0, 0, 1, step=4)
+        grid = GridOccupancy.from_cells(3, 2, self.cars, cells)
+
+        assert grid.occupant(0, 0) == cells.occupant(0, 0)
+        assert grid.occupant(0, 0) is not cells.occupant(0, 0)
+
+    def test_mapping_interface(self):
+        """Test that the grid can be used like the position keyed dict."""
+        self.grid[(0, 0)] = self.cars[0]
+        self.grid[(2, 1)] = [self.cars[1], self.cars[0]]
+
+        assert (0, 0) in self.grid
+        assert (1, 0) not in self.grid
+        assert (5, 5) not in self.grid
+        assert self.grid[(2, 1)] == [self.cars[1], self.cars[0]]
+        assert len(self.grid) == 2
+        assert sorted(self.grid) == [(0, 0), (2, 1)]
+        assert self.grid.get((1, 1)) is None
+
+        del self.grid[(0, 0)]
+        assert (0, 0) not in self.grid
+
+        with pytest.raises(KeyError):
+            self.grid[(0, 0)]
+
+        with pytest.raises(KeyError):
+            self.grid[(3, 0)]
+
+    def test_from_cells(self):
+        """Test converting a dict occupancy map into a grid."""
+        cells = DictOccupancy(self.cars)
+        cells.place(0, 0, 0)
+        cells.place(2, 1, 1)
+
+        grid = GridOccupancy.from_cells(3, 2, self.cars, cells)
+        assert dict(grid) == dict(cells)
+
+
+class TestSimulationOccupancySelection:
+    """Test Module for occupancy selection in Simulation Class."""
+
+    def test_invalid_occupancy(self):
+        """Test that unknown occupancy modes are rejected."""
+        with pytest.raises(ValueError, match="Occupancy must be 'dict' or 'grid'."):
+            Simulation(field_size=(10, 10), occupancy='tree')
+
+    def test_small_simulation_keeps_dict(self):
+        """Test that small simulations keep the dict occupancy map."""
+        simulation = Simulation(field_size=(10, 10))
+        simulation.add_car(Car(name="Car1", position=(0, 0), orientation='N', instructions="F"))
+        simulation.run_simulation()
+
+        assert isinstance(simulation.cars_in_field, DictOccupancy)
+
+    def test_dense_simulation_switches_to_grid(self):
+        """Test that dense simulations switch to the grid when they run."""
+        simulation = Simulation(field_size=(100, 100))
+        for car_index in range(Simulation.GRID_MIN_CARS):
+            position = (car_index % 100, car_index // 100)
+            simulation.add_car(Car(name=f"Car{car_index}", position=position, orientation='N', instructions=""))
+
+        simulation.run_simulation()
+
+        assert isinstance(simulation.cars_in_field, GridOccupancy)
+        assert simulation.cars_in_field[(3, 2)] is simulation.cars[203]
+
+    def test_sparse_simulation_keeps_dict(self):
+        """Test that many cars on a huge field keep the dict occupancy map."""
+        simulation = Simulation(field_size=(100000, 100000))
+        for car_index in range(Simulation.GRID_MIN_CARS):
+            simulation.add_car(Car(name=f"Car{car_index}", position=(car_index, 0), orientation='N', instructions=""))
+
+        simulation.run_simulation()
+
+        assert isinstance(simulation.cars_in_field, DictOccupancy)
+
+    def test_explicit_grid_add_car(self):
+        """Test that adding cars to an explicit grid validates occupancy."""
+        simulation = Simulation(field_size=(10, 10), occupancy='grid')
+        simulation.add_car(Car(name="Car1", position=(0, 0), orientation='N', instructions=""))
+
+        with pytest.raises(ValueError, match="Position already occupied by another car."):
+            simulation.add_car(Car(name="Car2", position=(0, 0), orientation='N', instructions=""))
+
+    @pytest.mark.parametrize("seed", range(50))
+    def test_grid_matches_dict(self, seed):
+        """Test that both occupancy backends produce the same results."""
+        rng = random.Random(seed)
+        cars = [
+            (f"Car{car_index}", (x, y), rng.choice('NESW'), ''.join(rng.choice('FFFLR') for _ in range(30)))
+            for car_index, (x, y) in enumerate(rng.sample([(x, y) for x in range(12) for y in range(12)], 10))
+        ]
+
+        results = []
+        for occupancy in Simulation.OCCUPANCY_MODES:
+            simulation = Simulation(field_size=(12, 12), occupancy=occupancy)
+            for name, position, orientation, instructions in cars:
+                simulation.add_car(Car(name=name, position=position, orientation=orientation, instructions=instructions))
+            simulation.run_simulation()
+            cells = {
+                position: cell.name if isinstance(cell, Car) else [car.name for car in cell]
+                for position, cell in simulation.cars_in_field.items()
+            }
+            results.append(([repr(car) for car in simulation.cars.values()], cells))
+
+        assert results[0] == results[1]
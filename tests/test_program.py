@@ -0,0 +1,205 @@
+import random
+
+import pytest
+from src.car import Car
+from src.program import MOVE, CompiledProgram, ScannedProgram, command_counts, expand_program, is_run_length_encoded, last_move_end, net_turn, repeating_block, turn_from
+
+
+class TestExpandProgram:
+    """Test Module for run length encoded programs."""
+
+    @pytest.mark.parametrize("text, expected", [
+        ("", b""),
+        ("FFRL", b"FFRL"),
+        ("F3", b"FFF"),
+        ("F3R", b"FFFR"),
+        ("(FFL)2", b"FFLFFL"),
+        ("F2(R(FL)2)2", b"FFRFLFLRFLFL"),
+        ("(F)", b"F"),
+        ("F0R", b"R"),
+    ])
+    def test_expand_program(self, text, expected):
+        """Test expanding counts and nested groups."""
+        assert expand_program(text) == expected
+
+    def test_expand_long_runs(self):
+        """Test expanding the example from the request."""
+        program = expand_program("F1000R(FFL)50")
+
+        assert len(program) == 1000 + 1 + 150
+        assert program.startswith(b"F" * 1000 + b"R")
+        assert program.endswith(b"FFL" * 50)
+
+    @pytest.mark.parametrize("text, message", [
+        ("3F", "count without a command"),
+        ("F3 ", "Invalid program at position 2."),
+        ("FX", "Invalid program at position 1."),
+        ("(FF", "unmatched '\\('"),
+        ("FF)", "unmatched '\\)'"),
+        ("F3(2)", "count without a command"),
+    ])
+    def test_expand_invalid_program(self, text, message):
+        """Test that malformed programs are rejected."""
+        with pytest.raises(ValueError, match=message):
+            expand_program(text)
+
+    def test_expand_too_long_program(self, mocker):
+        """Test that programs expanding beyond the limit are rejected before allocating them."""
+        mocker.patch('src.program.MAX_PROGRAM_LENGTH', 100)
+
+        with pytest.raises(ValueError, match="Program is too long."):
+            expand_program("(F10)11")
+
+    @pytest.mark.parametrize("text", ["F60F60", "((F60)(F60))", "(F60F60)2", "F99LR"])
+    def test_expand_too_long_parts(self, mocker, text):
+        """Test that the limit covers the parts of a group together, before the group is joined."""
+        mocker.patch('src.program.MAX_PROGRAM_LENGTH', 100)
+
+        with pytest.raises(ValueError, match="Program is too long."):
+            expand_program(text)
+
+    def test_expand_up_to_the_limit(self, mocker):
+        """Test that programs of exactly the limit are expanded."""
+        mocker.patch('src.program.MAX_PROGRAM_LENGTH', 100)
+
+        assert expand_program("(F49R)2") == (b"F" * 49 + b"R") * 2
+
+    def test_is_run_length_encoded(self):
+        """Test detecting encoded programs."""
+        assert is_run_length_encoded("F10")
+        assert is_run_length_encoded("(FL)")
+        assert not is_run_length_encoded("FFLR")
+
+    def test_car_expands_encoded_program(self):
+        """Test that cars accept run length encoded programs."""
+        car = Car(name="Encoded", position=(0, 0), orientation='N', instructions="F2(RF)2")
+
+        assert car.program == b"FFRFRF"
+        assert car.instructions == "FFRFRF"
+
+
+class TestCompiledProgram:
+    """Test Module for CompiledProgram Class."""
+
+    def test_runs(self):
+        """Test that runs of moves and folded runs of rotations are compiled with their ends."""
+        compiled = CompiledProgram(b"FFLLLRFRR?F")
+
+        assert list(compiled.opcodes) == [MOVE, 2, MOVE, 2, MOVE]
+        assert list(compiled.ends) == [2, 6, 7, 10, 11]
+        assert compiled.last_move_end == 11
+        assert len(compiled) == 5
+
+    def test_run_at(self):
+        """Test looking up the run left at a program counter, including part way into a run of rotations."""
+        program = b"FFLLR"
+        compiled = CompiledProgram(program)
+
+        assert compiled.run_at(program, 0) == (MOVE, 2)
+        assert compiled.run_at(program, 1) == (MOVE, 1)
+        assert compiled.run_at(program, 2) == (3, 3)
+        assert compiled.run_at(program, 3) == (0, 2)
+        assert compiled.run_at(program, 4) == (1, 1)
+
+    def test_turn_after(self):
+        """Test the net turn of the rest of a program against counting it directly."""
+        rng = random.Random(0)
+        program = bytes(rng.choices(b"FLR?", k=300))
+        compiled = CompiledProgram(program)
+
+        for program_counter in range(len(program) + 1):
+            assert compiled.turn_after(program, program_counter) == net_turn(program[program_counter:])
+
+    def test_rotation_tail(self):
+        """Test that the commands after the last move are known to only rotate the car."""
+        compiled = CompiledProgram(memoryview(b"RFFLFRRL"))
+
+        assert compiled.last_move_end == 5
+        assert CompiledProgram(b"LLR").last_move_end == 0
+        assert CompiledProgram(b"").turn_after(b"", 0) == 0
+
+    @pytest.mark.parametrize("program", [b"", b"LLR", b"FRL", b"RFFLR", b"LF", b"F" * 10 + b"R" * 25])
+    def test_last_move_end(self, program):
+        """Test finding the end of the last move in buffers and in memory mapped programs read in chunks."""
+        expected = CompiledProgram(program).last_move_end
+
+        assert last_move_end(program) == expected
+        assert last_move_end(memoryview(program), chunk_size=4) == expected
+
+    @pytest.mark.parametrize("program", [b"", b"LLR", b"FRL", b"RFFLR", b"LF", b"F" * 10 + b"R" * 25 + b"L" * 7])
+    def test_turn_from(self, program):
+        """Test the net turn of the rest of a program in buffers and in memory mapped programs read in chunks."""
+        for start in range(len(program) + 1):
+            expected = net_turn(program[start:])
+
+            assert turn_from(program, start) == expected
+            assert turn_from(bytearray(program), start) == expected
+            assert turn_from(memoryview(program), start, chunk_size=4) == expected
+
+    @pytest.mark.parametrize("program", [b"", b"LLR", b"FRL?", b"F" * 10 + b"R" * 25 + b"L" * 7])
+    def test_command_counts(self, program):
+        """Test counting the moves and rotations of the rest of a program, in memory mapped programs read in chunks."""
+        for start in range(len(program) + 1):
+            expected = (program[start:].count(b"F"), program[start:].count(b"L") + program[start:].count(b"R"))
+
+            assert command_counts(program, start) == expected
+            assert command_counts(memoryview(program), start, chunk_size=4) == expected
+
+    def test_car_compiles_once(self):
+        """Test that a car compiles its program on first use and again once its program is replaced."""
+        car = Car(name="Compiled", position=(0, 0), orientation='N', instructions="FFL")
+        compiled = car.compiled_program()
+
+        assert car.compiled_program() is compiled
+        car.instructions = "RR"
+        assert list(car.compiled_program().opcodes) == [2]
+
+
+class TestScannedProgram:
+    """Test Module for ScannedProgram Class."""
+
+    @pytest.mark.parametrize("chunk_size", [64, 128, 1 << 20])
+    def test_matches_compiled_program(self, chunk_size):
+        """Test that scanning finds the same runs, turns and last move as compiling, with runs longer than a chunk."""
+        rng = random.Random(chunk_size)
+        program = b"".join(command * rng.choice((1, 2, 40, 150)) for command in rng.choices((b"F", b"L", b"R", b"?"), k=60))
+        compiled = CompiledProgram(program)
+        scanned = ScannedProgram(memoryview(program), chunk_size=chunk_size)
+
+        assert scanned.last_move_end == compiled.last_move_end
+        for program_counter in range(len(program)):
+            assert scanned.run_at(memoryview(program), program_counter) == compiled.run_at(program, program_counter)
+            assert scanned.turn_after(memoryview(program), program_counter) == compiled.turn_after(program, program_counter)
+
+    def test_car_scans_memory_mapped_program(self):
+        """Test that a car scans a memoryview program for its runs instead of compiling it."""
+        car = Car(name="Streamed", position=(0, 0), orientation='N', instructions=memoryview(b"FFLRRF"))
+
+        assert isinstance(car.compiled_program(), ScannedProgram)
+        assert car.compiled_program().run_at(car.program, 2) == (1, 3)
+        assert isinstance(Car(name="Plain", position=(0, 0), orientation='N', instructions="FFL").compiled_program(), CompiledProgram)
+
+
+class TestRepeatingBlock:
+    """Test Module for finding blocks of commands repeated back to back."""
+
+    @pytest.mark.parametrize("program, start, expected", [
+        (b"FFR" * 100 + b"L", 0, (3, 100)),
+        (b"F" * 50, 0, (1, 50)),
+        (b"LR" + b"FRFL" * 20 + b"FRF", 2, (4, 20)),
+        (b"FFRFFRFFL", 0, (3, 2)),
+        (b"FRFLFFRLLF" * 2, 0, (10, 2)),
+        (b"FLRRFLRLFFRL", 0, (0, 0)),
+        (b"", 0, (0, 0)),
+    ])
+    def test_repeating_block(self, program, start, expected):
+        """Test finding the shortest repeated block and counting its repeats."""
+        assert repeating_block(program, start) == expected
+        assert repeating_block(memoryview(program), start) == expected
+
+    def test_block_too_long(self):
+        """Test that blocks longer than the maximum length are not looked for."""
+        program = b"FRFLFFRLLF" * 10
+
+        assert repeating_block(program, 0, max_length=8) == (0, 0)
+        assert repeating_block(program, 0, max_length=10) == (10, 10)
@@ -0,0 +1,174 @@
+from array import array
+
+import pytest
+from src.recorder import EVENT_COLUMNS, TrajectoryReader, TrajectoryRecorder, pack_event, unpack_event
+from src.simulation import Simulation
+from src.vectorized import VectorizedSimulation
+from tests.helpers import EXAMPLE_CARS, build, build_scenario, build_sparse_scenario, snapshot
+
+
+def states_per_step(field_size, cars):
+    """Step through a scenario and return the (x, y, orientation) of every car at the end of every step."""
+    simulation = build(Simulation, field_size, cars)
+    states = [[(car.x, car.y, car.orientation) for car in simulation.cars.values()]]
+    for _ in simulation.iter_steps():
+        states.append([(car.x, car.y, car.orientation) for car in simulation.cars.values()])
+    return states
+
+
+class TestTrajectoryRecorder:
+    """Test Module for TrajectoryRecorder Class."""
+
+    def test_invalid_arguments(self):
+        """Test that the keyframe interval and chunk size must be positive."""
+        with pytest.raises(ValueError, match="Keyframe interval must be a positive integer."):
+            TrajectoryRecorder(keyframe_interval=0)
+        with pytest.raises(ValueError, match="Chunk size must be a positive integer."):
+            TrajectoryRecorder(chunk_events=0)
+
+    def test_records_events(self):
+        """Test that every executed command is an event with the car's state after it."""
+        simulation = build(Simulation, (10, 10), [("A", (0, 0), 'N', "FRF")])
+        recorder = simulation.enable_recording(keyframe_interval=2)
+        simulation.run_simulation()
+
+        assert list(recorder.steps) == [1, 2, 3]
+        assert list(recorder.step_ends) == [1, 2, 3]
+        assert list(recorder.cars) == [0, 0, 0]
+        assert [unpack_event(code) for code in recorder.codes] == [(ord('F'), True, 0), (ord('R'), False, 1), (ord('F'), True, 1)]
+        assert [keyframe.step for keyframe in recorder.keyframes] == [0, 2]
+        assert recorder.keyframes[1].event_index == 2
+
+    def test_steps_stored_once(self):
+        """Test that a step stores its number once however many cars execute commands in it."""
+        simulation = build(Simulation, (10, 10), [("A", (0, 0), 'N', "FF"), ("B", (5, 5), 'E', "FF"), ("C", (9, 0), 'W', "F")])
+        recorder = simulation.enable_recording()
+        simulation.run_simulation()
+
+        assert list(recorder.steps) == [1, 2]
+        assert list(recorder.step_ends) == [3, 5]
+        assert list(recorder.cars) == [0, 1, 2, 0, 1]
+
+    def test_event_size(self):
+        """Test that an event takes 5 bytes: a 4 byte car index and a packed code."""
+        assert sum(array(typecode).itemsize for _, typecode in EVENT_COLUMNS) == 5
+
+    def test_pack_event(self):
+        """Test that event codes round trip."""
+        for command in b"FLR?":
+            for moved in (False, True):
+                for heading in range(4):
+                    assert unpack_event(pack_event(command, moved, heading)) == (command, moved, heading)
+
+    def test_pack_other_command(self):
+        """Test that a command other than F, L and R packs as '?'."""
+        for command in (ord('X'), 0, 255):
+            assert unpack_event(pack_event(command, False, 2)) == (ord('?'), False, 2)
+
+    def test_records_no_op_commands(self):
+        """Test that unknown commands, which do nothing, are recorded as '?' events."""
+        simulation = build(Simulation, (10, 10), [("A", (0, 0), 'N', "FXF"), ("B", (5, 5), 'E', "Fé")])
+        recorder = simulation.enable_recording()
+        simulation.run_simulation()
+
+        assert list(recorder.cars) == [0, 1, 0, 1, 0]
+        assert [unpack_event(code) for code in recorder.codes] == [
+            (ord('F'), True, 0), (ord('F'), True, 1), (ord('?'), False, 0), (ord('?'), False, 1), (ord('F'), True, 0),
+        ]
+        reader = recorder.reader()
+        assert reader.state_at(0, 2) == (0, 1, 'N')
+        assert reader.state_at(0, 3) == (0, 2, 'N')
+        assert reader.state_at(1, 3) == (6, 5, 'E')
+
+    def test_boundary_push_is_not_a_move(self):
+        """Test that a forward command against the boundary is recorded as not moving the car."""
+        simulation = build(Simulation, (3, 3), [("A", (0, 1), 'N', "FFF")])
+        recorder = simulation.enable_recording()
+        simulation.run_simulation()
+
+        assert [unpack_event(code)[1] for code in recorder.codes] == [True, False, False]
+        assert recorder.reader().position_at(0, 3) == (0, 2)
+
+    def test_recording_does_not_change_results(self):
+        """Test that a recorded run ends like an unrecorded one, including for other engines."""
+        expected = build(Simulation, (10, 10), EXAMPLE_CARS)
+        expected.run_simulation()
+
+        for simulation_class in (Simulation, VectorizedSimulation):
+            simulation = build(simulation_class, (10, 10), EXAMPLE_CARS)
+            recorder = simulation.enable_recording()
+            simulation.run_simulation()
+
+            assert snapshot(simulation) == snapshot(expected)
+            assert simulation.step == expected.step
+            assert len(recorder.reader()) == recorder.event_count > 0
+
+
+class TestTrajectoryReader:
+    """Test Module for TrajectoryReader Class."""
+
+    def test_state_at_every_step(self):
+        """Test reconstructing every car at every step of the example scenario."""
+        simulation = build(Simulation, (10, 10), EXAMPLE_CARS)
+        recorder = simulation.enable_recording(keyframe_interval=3)
+        simulation.run_simulation()
+        reader = recorder.reader()
+
+        for step, states in enumerate(states_per_step((10, 10), EXAMPLE_CARS)):
+            assert [tuple(reader.state_at(car_index, step)) for car_index in range(3)] == states
+
+        assert reader.position_at(0, 7) == (5, 4)
+        assert reader.state_at(2, 1000) == (1, 9, 'N')
+
+    def test_invalid_queries(self):
+        """Test that steps before the recording and unknown cars are rejected."""
+        simulation = build(Simulation, (10, 10), EXAMPLE_CARS)
+        simulation.run_steps(2)
+        recorder = simulation.enable_recording()
+        simulation.run_simulation()
+        reader = recorder.reader()
+
+        with pytest.raises(ValueError, match="Step is before the recording started."):
+            reader.state_at(0, 1)
+        with pytest.raises(ValueError, match="Car was not recorded."):
+            reader.state_at(3, 5)
+        assert reader.position_at(0, 2) == (1, 4)
+
+    def test_spill_to_file(self, tmp_path):
+        """Test that a recording spilled in chunks reads back like one kept in memory."""
+        path = str(tmp_path / "recording.bin")
+        simulation = build(Simulation, (10, 10), EXAMPLE_CARS)
+        recorder = simulation.enable_recording(keyframe_interval=4, path=path, chunk_events=5)
+        simulation.run_simulation()
+
+        assert len(recorder.cars) < recorder.event_count
+        reader = recorder.reader()
+        assert len(reader.chunks) > 1
+        assert len(TrajectoryReader.open(path)) == len(reader)
+
+        for step, states in enumerate(states_per_step((10, 10), EXAMPLE_CARS)):
+            assert [tuple(reader.state_at(car_index, step)) for car_index in range(3)] == states
+
+    def test_not_a_recording(self, tmp_path):
+        """Test that opening an unrelated file fails."""
+        path = tmp_path / "recording.bin"
+        path.write_bytes(b"10 10\nA 1 2 N FFRFFFFRRL\n")
+
+        with pytest.raises(ValueError, match="Not a trajectory recording."):
+            TrajectoryReader.open(str(path))
+
+    @pytest.mark.parametrize("seed", range(40))
+    def test_random_trajectories(self, tmp_path, seed):
+        """Test reconstructing every car at every step of random scenarios, in memory and spilled to a file."""
+        field_size, cars = build_scenario(seed) if seed % 2 else build_sparse_scenario(seed)
+
+        expected = states_per_step(field_size, cars)
+
+        path = str(tmp_path / "recording.bin") if seed % 3 else None
+        simulation = build(Simulation, field_size, cars)
+        recorder = simulation.enable_recording(keyframe_interval=1 + seed % 7, path=path, chunk_events=1 + seed % 13)
+        simulation.run_simulation()
+        reader = recorder.reader()
+
+        for step, states in enumerate(expected):
+            assert [tuple(reader.state_at(car_index, step)) for car_index in range(len(cars))] == states
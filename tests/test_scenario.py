@@ -0,0 +1,195 @@
+import pytest
+from src.CLI import CLI
+from src.scenario import (
+    load_scenario,
+    parse_car_name,
+    parse_field_size,
+    parse_instructions,
+    parse_position_and_orientation,
+    parse_scenario,
+    validate_instructions_buffer,
+)
+
+
+class TestScenarioFieldParsing:
+    """Test Module for parsing scenario values."""
+
+    def test_parse_field_size(self):
+        """Test parsing a valid field size."""
+        assert parse_field_size("10 12") == (10, 12)
+
+    @pytest.mark.parametrize("text", ["10", "10 a", "-1 10", "10 10 10", ""])
+    def test_parse_field_size_invalid(self, text):
+        """Test that malformed field sizes are rejected."""
+        with pytest.raises(ValueError, match="Invalid input. Please enter two positive integers separated by a space."):
+            parse_field_size(text)
+
+    def test_parse_field_size_zero(self):
+        """Test that empty fields are rejected."""
+        with pytest.raises(ValueError, match="Width and height must be positive integers."):
+            parse_field_size("0 10")
+
+    def test_parse_car_name(self):
+        """Test parsing car names."""
+        assert parse_car_name("  Car A ") == "Car A"
+
+        with pytest.raises(ValueError, match="Car name cannot be empty."):
+            parse_car_name("   ")
+
+    def test_parse_position_and_orientation(self):
+        """Test parsing a position and orientation."""
+        assert parse_position_and_orientation(" 1 2 N ") == ((1, 2), 'N')
+
+        with pytest.raises(ValueError, match="Invalid input. Please enter in x y Direction format"):
+            parse_position_and_orientation("1 2 X")
+
+    def test_parse_instructions(self):
+        """Test parsing commands."""
+        assert parse_instructions(" FFRL ") == "FFRL"
+        assert parse_instructions("") == ""
+
+        with pytest.raises(ValueError, match="Invalid command. Only 'L', 'R', and 'F' are allowed."):
+            parse_instructions("FFU")
+
+
+class TestParseScenario:
+    """Test Module for parsing scenario files."""
+
+    def test_parse_scenario(self):
+        """Test building a simulation from scenario lines."""
+        simulation = parse_scenario([
+            "# Example from the specification",
+            "10 10",
+            "",
+            "A 1 2 N FFRFFFFRRL",
+            "Car B 7 8 W FFLFFFFFFF",
+            "Parked 0 0 E",
+        ])
+
+        assert simulation.field.width == 10
+        assert [repr(car) for car in simulation.cars.values()] == [
+            "A, (1, 2) N, FFRFFFFRRL",
+            "Car B, (7, 8) W, FFLFFFFFFF",
+            "Parked, (0, 0) E",
+        ]
+
+    def test_parse_scenario_missing_field(self):
+        """Test that a scenario needs a field size."""
+        with pytest.raises(ValueError, match="Scenario is missing the field size."):
+            parse_scenario(["# nothing here"])
+
+    @pytest.mark.parametrize("line, message", [
+        ("A 1 2 X FF", "Line 2: Invalid input. Please enter in x y Direction format"),
+        ("A 1 2 N FFU", "Line 2: Invalid command. Only 'L', 'R', and 'F' are allowed."),
+        ("A 1 N FF", "Line 2: Invalid car. Please enter name x y Direction commands."),
+        ("A 10 2 N FF", "Line 2: Position out of bounds."),
+    ])
+    def test_parse_scenario_invalid_car(self, line, message):
+        """Test that invalid cars report their line number."""
+        with pytest.raises(ValueError, match=message):
+            parse_scenario(["10 10", line])
+
+    def test_parse_scenario_duplicate_name(self):
+        """Test that duplicate car names are rejected."""
+        with pytest.raises(ValueError, match="Line 3: Car with this name already exists."):
+            parse_scenario(["10 10", "A 1 2 N", "A 3 3 N"])
+
+    def test_load_scenario_and_run(self, tmp_path, capsys):
+        """Test running a scenario file through the CLI."""
+        path = tmp_path / "scenario.txt"
+        path.write_text("10 10\nA 1 2 N FFRFFFFRRL\nB 7 8 W FFLFFFFFFF\n")
+
+        assert len(load_scenario(str(path)).cars) == 2
+
+        CLI().run_scenario_file(str(path))
+
+        captured = capsys.readouterr()
+        assert captured.out == (
+            "\nAfter simulation, the result is:\n"
+            "- A, collides with B at (5,4) at step 7)\n"
+            "- B, collides with A at (5,4) at step 7)\n"
+        )
+
+
+class TestStreamScenario:
+    """Test Module for streaming scenario files."""
+
+    def test_stream_scenario_matches_parse_scenario(self, tmp_path):
+        """Test that streaming and line parsing build the same simulation."""
+        content = "# comment\r\n10 10\r\n\r\nA 1 2 N FFRFFFFRRL\r\nCar 5 7 8 W\tFFLFFFFFFF\r\nParked 0 0 E\r\n"
+        path = tmp_path / "scenario.txt"
+        path.write_bytes(content.encode())
+
+        streamed = load_scenario(str(path))
+        parsed = parse_scenario(content.splitlines())
+
+        assert [repr(car) for car in streamed.cars.values()] == [repr(car) for car in parsed.cars.values()]
+        assert streamed.cars[1].name == "Car 5"
+
+    def test_stream_scenario_utf8_names(self, tmp_path):
+        """Test that car names may hold any UTF-8 text, like in parse_scenario."""
+        content = "10 10\nCafé 1 2 N FFR\nZoë 3 3 E\n"
+        path = tmp_path / "scenario.txt"
+        path.write_bytes(content.encode('utf-8'))
+
+        streamed = load_scenario(str(path))
+        parsed = parse_scenario(content.splitlines())
+
+        assert [repr(car) for car in streamed.cars.values()] == [repr(car) for car in parsed.cars.values()]
+        assert [car.name for car in streamed.cars.values()] == ["Café", "Zoë"]
+
+    def test_stream_scenario_keeps_commands_in_the_file(self, tmp_path):
+        """Test that programs are views into the mapped file rather than copies."""
+        path = tmp_path / "scenario.txt"
+        path.write_text("1000 10\nLong 0 0 E " + "F" * 200000 + "\n")
+
+        simulation = load_scenario(str(path))
+        car = simulation.cars[0]
+
+        assert isinstance(car.program, memoryview)
+        assert len(car.program) == 200000
+
+        simulation.run_simulation()
+        assert car.position == (999, 0)
+        assert car.instructions == ""
+
+    def test_stream_scenario_invalid_command_in_later_chunk(self, tmp_path, mocker):
+        """Test that invalid commands are found past the first validation chunk."""
+        mocker.patch('src.scenario.VALIDATION_CHUNK_SIZE', 16)
+        path = tmp_path / "scenario.txt"
+        path.write_text("10 10\nA 0 0 N " + "F" * 100 + "X" + "L" * 10 + "\n")
+
+        with pytest.raises(ValueError, match="Line 2: Invalid command. Only 'L', 'R', and 'F' are allowed."):
+            load_scenario(str(path))
+
+    def test_stream_scenario_invalid_utf8(self, tmp_path):
+        """Test that names which are not UTF-8 report the offending line."""
+        path = tmp_path / "scenario.txt"
+        path.write_bytes(b"10 10\nCaf\xe9 1 2 N FF\n")
+
+        with pytest.raises(ValueError, match="Line 2: Invalid text. Scenario files must be UTF-8 encoded."):
+            load_scenario(str(path))
+
+    def test_validate_instructions_buffer(self):
+        """Test chunked validation of command buffers."""
+        validate_instructions_buffer(memoryview(b"FLRFLR"), chunk_size=4)
+
+        with pytest.raises(ValueError, match="Invalid command."):
+            validate_instructions_buffer(memoryview(b"FLRFLRF "), chunk_size=4)
+
+    @pytest.mark.parametrize("content, message", [
+        ("", "Scenario is missing the field size."),
+        ("# only a comment\n", "Scenario is missing the field size."),
+        ("10\n", "Line 1: Invalid input. Please enter two positive integers"),
+        ("10 10\nA 1 2 X FF\n", "Line 2: Invalid input. Please enter in x y Direction format"),
+        ("10 10\nA 1 N FF\n", "Line 2: Invalid car. Please enter name x y Direction commands."),
+        ("10 10\nA 1 2 N\nA 3 3 N\n", "Line 3: Car with this name already exists."),
+        ("10 10\nA 1 2 N FFé\n", "Line 2: Invalid command. Only 'L', 'R', and 'F' are allowed."),
+    ])
+    def test_stream_scenario_invalid(self, tmp_path, content, message):
+        """Test that invalid scenario files report the offending line."""
+        path = tmp_path / "scenario.txt"
+        path.write_text(content)
+
+        with pytest.raises(ValueError, match=message):
+            load_scenario(str(path))
@@ -0,0 +1,199 @@
+import functools
+import random
+
+import pytest
+from src.car import Car
+from src.event_driven import EventDrivenSimulation
+from src.sharded import Shard, ShardedSimulation, run_shard
+from src.simulation import Simulation
+from src.vectorized import VectorizedSimulation
+from tests.helpers import build_scenario, build_sparse_scenario, occupancy_snapshot, run, snapshot
+
+
+class TestShardedSimulation:
+    """Test Module for ShardedSimulation Class."""
+
+    def test_invalid_workers(self):
+        """Test that the number of workers must be positive."""
+        with pytest.raises(ValueError, match="Workers must be a positive integer."):
+            ShardedSimulation(field_size=(10, 10), workers=0)
+
+    def test_find_groups(self):
+        """Test that cars are grouped by crossing paths, including through a third car."""
+        simulation = ShardedSimulation(field_size=(10, 10))
+        simulation.add_car(Car(name="A", position=(0, 0), orientation='E', instructions="FFF"))
+        simulation.add_car(Car(name="B", position=(2, 2), orientation='S', instructions="FF"))
+        simulation.add_car(Car(name="C", position=(2, 3), orientation='N', instructions="F"))
+        simulation.add_car(Car(name="D", position=(8, 8), orientation='N', instructions="F"))
+
+        groups = sorted(sorted(cars) for cars, _, _ in simulation.find_groups())
+
+        assert groups == [[0, 1], [2], [3]]
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_footprint_covers_route(self, seed):
+        """Test that a car's footprint covers every cell it drives over, with and without reaching the boundary."""
+        rng = random.Random(seed)
+        simulation = ShardedSimulation(field_size=(rng.randint(5, 40), rng.randint(5, 40)))
+        car = Car(name="A", position=(rng.randrange(simulation.field.width), rng.randrange(simulation.field.height)),
+                  orientation=rng.choice('NESW'), instructions=''.join(rng.choice('FFFLR') for _ in range(rng.randint(0, 200))))
+        simulation.add_car(car)
+        boxes = simulation.footprint(car, rng.randint(1, 10))
+
+        cells = {car.position}
+        while car.has_instructions():
+            simulation.execute_instructions(0)
+            cells.add(car.position)
+
+        for x, y in cells:
+            assert any(min_x <= x <= max_x and min_y <= y <= max_y for min_x, min_y, max_x, max_y in boxes)
+
+    def test_partition(self):
+        """Test that groups crossing a stripe border go to the coordinator."""
+        simulation = ShardedSimulation(field_size=(10, 10))
+        simulation.add_car(Car(name="A", position=(0, 0), orientation='N', instructions="FFF"))
+        simulation.add_car(Car(name="B", position=(4, 0), orientation='E', instructions="FF"))
+        simulation.add_car(Car(name="C", position=(9, 9), orientation='S', instructions="FF"))
+
+        shards, crossing = simulation.partition(2)
+
+        assert shards == [[0], [2]]
+        assert crossing == [1]
+
+    def test_footprint_within_steps(self):
+        """Test that a footprint limited to a number of steps only covers the start of the route."""
+        simulation = ShardedSimulation(field_size=(10, 10))
+        car = Car(name="A", position=(0, 0), orientation='N', instructions="FFFFRFFFF")
+        simulation.add_car(car)
+
+        assert simulation.footprint(car, 64, 3) == [(0, 0, 0, 3)]
+        assert simulation.footprint(car, 64, 20) == [(0, 0, 4, 4)]
+
+    def test_find_groups_within_steps(self):
+        """Test that cars whose routes only cross after the slice are in separate groups for that slice."""
+        simulation = ShardedSimulation(field_size=(20, 20))
+        simulation.add_car(Car(name="A", position=(0, 0), orientation='E', instructions="F" * 10))
+        simulation.add_car(Car(name="B", position=(9, 9), orientation='S', instructions="F" * 10))
+
+        assert sorted(sorted(cars) for cars, _, _ in simulation.find_groups(4)) == [[0], [1]]
+        assert sorted(sorted(cars) for cars, _, _ in simulation.find_groups()) == [[0, 1]]
+
+    def test_partition_large_random_field(self):
+        """Test that a large field of cars on long random routes splits into every stripe, with few cars crossing."""
+        rng = random.Random(7)
+        simulation = ShardedSimulation(field_size=(2000, 2000))
+        for car_index, cell in enumerate(rng.sample(range(2000 * 2000), 1000)):
+            instructions = ''.join(rng.choices('FFFLR', k=2000))
+            simulation.add_car(Car(name=f"Car{car_index}", position=divmod(cell, 2000), orientation='N', instructions=instructions))
+
+        # Whole routes wander over the field and join every car into one group
+        assert max(len(cars) for cars, _, _ in simulation.find_groups()) > 800
+
+        shards, crossing = simulation.partition(4, simulation.SLICE_STEPS)
+
+        assert all(len(cars) > 150 for cars in shards)
+        assert len(crossing) < 200
+        assert sorted(sum(shards, crossing)) == list(range(1000))
+
+    def test_partition_leaves_out_finished_groups(self):
+        """Test that groups in which every car has finished or collided are not run again."""
+        simulation = ShardedSimulation(field_size=(10, 10))
+        simulation.add_car(Car(name="A", position=(0, 0), orientation='N', instructions=""))
+        simulation.add_car(Car(name="B", position=(9, 9), orientation='S', instructions="FF"))
+
+        assert simulation.partition(2) == ([[], [1]], [])
+
+    def test_run_shard(self):
+        """Test running a shard on its own, writing results to the shared rows of its cars."""
+        simulation = ShardedSimulation(field_size=(10, 10))
+        simulation.add_car(Car(name="A", position=(0, 0), orientation='N', instructions="F"))
+        simulation.add_car(Car(name="B", position=(5, 5), orientation='N', instructions="F"))
+        simulation.add_car(Car(name="C", position=(0, 2), orientation='S', instructions="F"))
+
+        with simulation.export_state() as state:
+            assert run_shard(Shard(state.name, [0, 2], Simulation)) == 1
+            assert state.cars[['x', 'y', 'partner', 'collision_step', 'entered']].tolist() == [
+                (0, 1, 2, 1, 0), (5, 5, -1, 0, 0), (0, 1, 0, 1, 1),
+            ]
+            state.unlink()
+
+    def test_run_simulation_collision(self):
+        """Test the example scenario with two colliding cars."""
+        simulation = run(functools.partial(ShardedSimulation, workers=1), (10, 10), [
+            ("A", (1, 2), 'N', "FFRFFFFRRL"),
+            ("B", (7, 8), 'W', "FFLFFFFFFF"),
+        ])
+        car_a, car_b = simulation.cars[0], simulation.cars[1]
+
+        assert car_a.collision is car_b
+        assert car_b.collision is car_a
+        assert car_a.collision_step == car_b.collision_step == 7
+        assert simulation.cars_in_field[(5, 4)] == [car_b, car_a]
+        assert simulation.step == 7
+
+    def test_worker_processes(self):
+        """Test that stripes run in worker processes give the same result as one process."""
+        cars = [
+            ("A", (0, 0), 'N', "FFFFRFF"),
+            ("B", (2, 5), 'S', "FFF"),
+            ("C", (15, 0), 'N', "FFFF"),
+            ("D", (15, 9), 'S', "FFFFF"),
+            ("E", (9, 3), 'E', "FFFF"),
+            ("F", (12, 7), 'W', "FFFF"),
+        ]
+        expected = run(Simulation, (20, 10), cars)
+        actual = run(functools.partial(ShardedSimulation, workers=2), (20, 10), cars)
+
+        assert snapshot(actual) == snapshot(expected)
+        assert occupancy_snapshot(actual) == occupancy_snapshot(expected)
+        assert actual.step == expected.step
+
+    def test_default_engine(self):
+        """Test that shards run with the stepwise Simulation unless told otherwise."""
+        assert ShardedSimulation(field_size=(10, 10)).engine is Simulation
+
+    def test_event_driven_engine(self):
+        """Test running the shards with the EventDrivenSimulation."""
+        field_size, cars = build_sparse_scenario(3)
+        expected = run(VectorizedSimulation, field_size, cars)
+        actual = run(functools.partial(ShardedSimulation, workers=1, engine=EventDrivenSimulation), field_size, cars)
+
+        assert snapshot(actual) == snapshot(expected)
+
+    @pytest.mark.parametrize("seed", range(100))
+    def test_matches_simulation(self, seed):
+        """Test that random scenarios split into stripes produce the same final state as Simulation."""
+        field_size, cars = build_scenario(seed)
+
+        expected = run(Simulation, field_size, cars)
+
+        actual = run(functools.partial(ShardedSimulation, workers=1), field_size, cars)
+
+        assert snapshot(actual) == snapshot(expected)
+        assert occupancy_snapshot(actual) == occupancy_snapshot(expected)
+        assert actual.step == expected.step
+
+    @pytest.mark.parametrize("seed", range(100))
+    def test_short_slices_match_simulation(self, seed, monkeypatch):
+        """Test that regrouping the cars every few steps produces the same final state as Simulation."""
+        monkeypatch.setattr(ShardedSimulation, 'SLICE_STEPS', seed % 5 + 1)
+        field_size, cars = build_sparse_scenario(seed)
+
+        expected = run(Simulation, field_size, cars)
+        actual = run(functools.partial(ShardedSimulation, workers=1 if seed % 10 else 2), field_size, cars)
+
+        assert snapshot(actual) == snapshot(expected)
+        assert occupancy_snapshot(actual) == occupancy_snapshot(expected)
+        assert actual.step == expected.step
+
+    @pytest.mark.parametrize("seed", range(50))
+    def test_matches_vectorized_on_long_routes(self, seed):
+        """Test that sparse scenarios with long routes produce the same final state as VectorizedSimulation."""
+        field_size, cars = build_sparse_scenario(seed)
+
+        expected = run(VectorizedSimulation, field_size, cars)
+        actual = run(functools.partial(ShardedSimulation, workers=4), field_size, cars)
+
+        assert snapshot(actual) == snapshot(expected)
+        assert occupancy_snapshot(actual) == occupancy_snapshot(expected)
+        assert actual.step == expected.step
@@ -0,0 +1,125 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import pytest
+from src.car import Car
+from src.shared_state import CAR_DTYPE, CarStateBuffer, SharedCarState
+from src.simulation import Simulation
+from tests.helpers import occupancy_snapshot, run, snapshot
+
+
+def count_moves(state_name):
+    """Attach to a shared car state from another process and count the F commands of every car."""
+    state = SharedCarState.attach(state_name)
+    counts = [bytes(state.program(car_index)).count(b'F') for car_index in range(len(state))]
+    state.close()
+    return counts
+
+
+@pytest.fixture
+def collided_simulation():
+    """Return a simulation that ran into a pile-up free collision, with a car still driving."""
+    return run(Simulation, (10, 10), [
+        ("A", (1, 2), 'N', "FFRFFFFRRL"),
+        ("B", (7, 8), 'W', "FFLFFFFFFF"),
+        ("Bé", (0, 9), 'E', "FRF"),
+    ])
+
+
+class TestSharedCarState:
+    """Test Module for SharedCarState Class."""
+
+    def test_layout(self, collided_simulation):
+        """Test the header, car table and blobs of an exported state."""
+        with collided_simulation.export_state() as state:
+            assert state.step == 7
+            assert len(state) == 3
+            assert state.cars.dtype == CAR_DTYPE
+            assert state.cars[['x', 'y', 'heading', 'partner', 'collision_step', 'entered']].tolist() == [
+                (5, 4, 1, 1, 7, 0), (5, 4, 2, 0, 7, 1), (1, 8, 2, -1, 0, 0),
+            ]
+            assert bytes(state.program(0)) == b"FFRFFFFRRL"
+            assert state.car_name(2) == "Bé"
+            state.unlink()
+
+    def test_round_trip(self, collided_simulation):
+        """Test that importing an exported state gives the same cars, with programs read from the block."""
+        with collided_simulation.export_state() as state:
+            imported = Simulation.import_state(state)
+
+            assert snapshot(imported) == snapshot(collided_simulation)
+            assert occupancy_snapshot(imported) == occupancy_snapshot(collided_simulation)
+            assert imported.step == collided_simulation.step
+            assert isinstance(imported.cars[0].program, memoryview)
+
+            state.detach(imported)
+            state.unlink()
+
+        assert imported.cars[0].instructions == "RRL"
+
+    def test_selection(self, collided_simulation):
+        """Test importing some of the cars, in the order given."""
+        with collided_simulation.export_state() as state:
+            imported = Simulation.import_state(state, [2, 1, 0])
+            assert [car.name for car in imported.cars.values()] == ["Bé", "B", "A"]
+            assert imported.cars[1].collision is imported.cars[2]
+            state.detach(imported)
+
+            with pytest.raises(ValueError, match="Collision partner not in the selected cars."):
+                Simulation.import_state(state, [1])
+            state.unlink()
+
+    def test_write_and_read_cars(self):
+        """Test running part of the cars from the block and reading the results back."""
+        simulation = Simulation(field_size=(10, 10))
+        simulation.add_car(Car(name="A", position=(0, 0), orientation='N', instructions="FF"))
+        simulation.add_car(Car(name="B", position=(5, 5), orientation='E', instructions="F"))
+        simulation.add_car(Car(name="C", position=(0, 3), orientation='S', instructions="F"))
+
+        with simulation.export_state() as state:
+            part = Simulation.import_state(state, [0, 2])
+            part.run_simulation()
+            state.write_cars(part, [0, 2])
+            state.detach(part)
+            state.read_cars(simulation)
+            state.unlink()
+
+        assert simulation.cars[0].collision is simulation.cars[2]
+        assert simulation.cars[2].collision_step == 2
+        assert simulation.cars_in_field[(0, 2)] == [simulation.cars[0], simulation.cars[2]]
+        assert simulation.cars[1].position == (5, 5)
+
+    def test_attach_from_another_process(self, collided_simulation):
+        """Test that a worker process can read the state by name."""
+        with collided_simulation.export_state() as state:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                assert executor.submit(count_moves, state.name).result() == [6, 9, 2]
+            state.unlink()
+
+    def test_empty_simulation(self):
+        """Test exporting a simulation without cars."""
+        with Simulation(field_size=(3, 4)).export_state() as state:
+            imported = Simulation.import_state(state)
+            state.unlink()
+
+        assert imported.field.width == 3
+        assert imported.cars == {}
+
+    def test_truncated_buffer(self, collided_simulation):
+        """Test that a buffer shorter than its header says is rejected."""
+        buffer = bytearray(CarStateBuffer.layout_size(collided_simulation))
+        CarStateBuffer.write_layout(buffer, collided_simulation)
+
+        for size in (0, 16, len(buffer) - 1):
+            with pytest.raises(ValueError, match="Buffer does not hold a car state."):
+                CarStateBuffer(buffer[:size])
+
+    def test_not_a_car_state(self):
+        """Test that attaching to an unrelated block fails."""
+        memory = shared_memory.SharedMemory(create=True, size=1024)
+        try:
+            with pytest.raises(ValueError, match="Buffer does not hold a car state."):
+                SharedCarState.attach(memory.name)
+        finally:
+            memory.close()
+            memory.unlink()
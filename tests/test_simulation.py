@@ -1,6 +1,12 @@
+import random
+import time
+
 import pytest
+from benchmarks.scenarios import FULL_SUITE, generate_cars
 from src.car import Car
+from src.program import CompiledProgram
 from src.simulation import Simulation
+from tests.helpers import build_scenario, occupancy_snapshot, run, snapshot
 
 class TestSimulationInitialization:
     """Test Module for Simulation Class."""
@@ -96,7 +102,77 @@ class TestSimulationCarManagement:
         
         with pytest.raises(ValueError, match="Position already occupied by another car."):
             self.simulation.add_car(car2)
+
+    def test_car_index_of(self):
+        """Test that a car's index is found through the same lookup the occupancy maps use."""
+        car1 = Car(name="Car1", position=(0, 0), orientation='N', instructions="")
+        car2 = Car(name="Car2", position=(1, 1), orientation='E', instructions="")
+        self.simulation.add_car(car1)
+        self.simulation.add_car(car2)
+
+        assert self.simulation.car_index_of(car2) == 1
+        assert self.simulation.car_index_of(car1) == 0
+        with pytest.raises(ValueError, match="Car not in simulation."):
+            self.simulation.car_index_of(Car(name="Other", position=(2, 2), orientation='N', instructions=""))
         
+class TestSimulationAddCars:
+    """Test Module for adding cars in bulk to Simulation Class."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup a simulation with one car."""
+        self.simulation = Simulation(field_size=(10, 10))
+        self.simulation.add_car(Car(name="First", position=(0, 0), orientation='N', instructions="F"))
+
+    def test_add_cars(self):
+        """Test that cars added in bulk run like cars added one by one."""
+        indices = self.simulation.add_cars(["A", "B"], [1, 7], [2, 8], "NW", ["FFRFFFFRRL", "FFLFFFFFFF"])
+
+        expected = Simulation(field_size=(10, 10))
+        for car in (Car("First", (0, 0), 'N', "F"), Car("A", (1, 2), 'N', "FFRFFFFRRL"), Car("B", (7, 8), 'W', "FFLFFFFFFF")):
+            expected.add_car(car)
+
+        assert list(indices) == [1, 2]
+        assert self.simulation.car_names == {"First", "A", "B"}
+        assert self.simulation.cars_in_field.occupant(7, 8) is self.simulation.cars[2]
+
+        self.simulation.run_simulation()
+        expected.run_simulation()
+        assert [repr(car) for car in self.simulation.cars.values()] == [repr(car) for car in expected.cars.values()]
+
+    def test_grid_occupancy(self):
+        """Test adding cars in bulk to a grid occupancy map."""
+        simulation = Simulation(field_size=(10, 10), occupancy='grid')
+        simulation.add_cars(["A", "B"], [1, 7], [2, 8], "NW", ["", ""])
+
+        assert simulation.cars_in_field.occupant(1, 2) is simulation.cars[0]
+        assert simulation.cars_in_field.occupant(7, 8) is simulation.cars[1]
+
+    def test_reports_every_invalid_row(self):
+        """Test that names, bounds and cells are checked against the simulation and the batch, and nothing is added."""
+        with pytest.raises(ValueError) as error:
+            self.simulation.add_cars(
+                ["First", "A", "A", "B", "C", "D", "E"], [5, 1, 2, 10, 0, 1, 3], [5, 1, 2, 0, 0, 1, 3], "NNNNNNX", [""] * 7
+            )
+
+        assert str(error.value) == (
+            "6 invalid car(s):\n"
+            "- row 0: Car with this name already exists.\n"
+            "- row 2: Car with this name already exists.\n"
+            "- row 3: Position out of bounds.\n"
+            "- row 4: Position already occupied by another car.\n"
+            "- row 5: Position already occupied by another car.\n"
+            "- row 6: Invalid orientation."
+        )
+        assert len(self.simulation.cars) == 1
+        assert self.simulation.car_names == {"First"}
+
+    def test_columns_of_different_lengths(self):
+        """Test that every column must have a value for every car."""
+        with pytest.raises(ValueError, match="Columns must have the same length."):
+            self.simulation.add_cars(["A"], [1, 2], [1], "N", [""])
+
+
 class TestSimulationCarFieldMovement:
     """Test Module for Car Movement in Simulation Class."""
     
@@ -239,6 +315,49 @@ class TestSimulationCarCollision:
         assert car2 in self.simulation.cars_in_field[(0, 0)]
 
 
+class TestSimulationPileUp:
+    """Test Module for more than two cars colliding in one cell."""
+
+    @staticmethod
+    def build(simulation_class, occupancy=None):
+        """Return a simulation where A hits the parked C at step 2 and B drives into the same cell in that step."""
+        simulation = simulation_class(field_size=(10, 10), occupancy=occupancy)
+        simulation.add_car(Car(name="A", position=(5, 3), orientation='N', instructions="FF"))
+        simulation.add_car(Car(name="B", position=(3, 5), orientation='E', instructions="FFL"))
+        simulation.add_car(Car(name="C", position=(5, 5), orientation='S', instructions=""))
+        return simulation
+
+    def test_pile_up(self):
+        """Test that a car driving into a collision cell collides with the car that was hit, which keeps its partner."""
+        simulation = self.build(Simulation)
+        simulation.run_simulation()
+        car_a, car_b, car_c = simulation.cars.values()
+
+        assert car_b.collision is car_c
+        assert car_b.collision_step == 2
+        assert car_c.collision is car_a
+        assert repr(car_b) == "B, collides with C at (5,5) at step 2)"
+
+        cell = simulation.cars_in_field.occupant(5, 5)
+        assert cell.car_indices == [2, 0, 1]
+        assert cell.step == 2
+        assert simulation.entered_cars() == [0, 1]
+
+    @pytest.mark.parametrize("occupancy", Simulation.OCCUPANCY_MODES)
+    def test_pile_up_matches_other_engines(self, occupancy):
+        """Test that every engine ends a pile-up the same way."""
+        from src.event_driven import EventDrivenSimulation
+        from src.vectorized import VectorizedSimulation
+
+        results = []
+        for simulation_class in (Simulation, VectorizedSimulation, EventDrivenSimulation):
+            simulation = self.build(simulation_class, occupancy)
+            simulation.run_simulation()
+            results.append(([repr(car) for car in simulation.cars.values()], simulation.cars_in_field.occupant(5, 5)))
+
+        assert results[0] == results[1] == results[2]
+
+
 class TestSimulationInstructions:
     """Test Module for Car Instructions in Simulation Class."""
 
@@ -447,4 +566,603 @@ class TestSimulationRunExecution:
         assert car1.collision_step == 2
         assert car2.collision_step == 2
 
-        
\ No newline at end of file
+        
+class TestSimulationProgramCounter:
+    """Test Module for Program Counter based execution in Simulation Class."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup a simulation instance for testing."""
+        self.simulation = Simulation(field_size=(10, 10))
+
+    def test_execute_instructions_advances_program_counter(self):
+        """Test that executing a command advances the counter without rewriting the program."""
+        car = Car(name="Car1", position=(0, 0), orientation='N', instructions="FRF")
+        self.simulation.add_car(car)
+
+        self.simulation.execute_instructions(0)
+        assert car.program_counter == 1
+        assert car.program == b"FRF"
+        assert car.instructions == "RF"
+
+        self.simulation.execute_instructions(0)
+        self.simulation.execute_instructions(0)
+        assert car.program_counter == 3
+        assert car.instructions == ""
+
+        # Executing past the end of the program is a no-op
+        self.simulation.execute_instructions(0)
+        assert car.program_counter == 3
+        assert car.position == (1, 1)
+
+    def test_run_simulation_long_program(self):
+        """Test running a long program completes with the expected final state."""
+        car = Car(name="Car1", position=(0, 0), orientation='N', instructions="FRFL" * 5000)
+        self.simulation.add_car(car)
+
+        self.simulation.run_simulation()
+
+        assert car.position == (9, 9)
+        assert car.orientation == 'N'
+        assert car.instructions == ""
+        assert self.simulation.step == 20000
+
+
+class TestSimulationActiveCars:
+    """Test Module for Active Car tracking in Simulation Class."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup a simulation instance for testing."""
+        self.simulation = Simulation(field_size=(10, 10))
+
+    def test_refresh_active_cars(self):
+        """Test that only cars with remaining commands are active."""
+        self.simulation.add_car(Car(name="Car1", position=(0, 0), orientation='N', instructions="F"))
+        self.simulation.add_car(Car(name="Car2", position=(5, 5), orientation='N', instructions=""))
+        self.simulation.add_car(Car(name="Car3", position=(9, 9), orientation='S', instructions="LR"))
+
+        self.simulation.refresh_active_cars()
+        assert self.simulation.active_cars == [0, 2]
+
+    def test_finished_cars_leave_active_cars(self, mocker):
+        """Test that cars stop being visited once their program is done."""
+        self.simulation.add_car(Car(name="Car1", position=(0, 0), orientation='N', instructions="F"))
+        self.simulation.add_car(Car(name="Car2", position=(5, 5), orientation='N', instructions="FFFF"))
+        self.simulation.add_car(Car(name="Car3", position=(7, 5), orientation='N', instructions="FFFF"))
+
+        spy = mocker.spy(self.simulation, 'execute_instructions')
+        self.simulation.run_simulation()
+
+        # Car1 is executed once, Car2 and Car3 four times each
+        assert spy.call_count == 9
+        assert self.simulation.active_cars == []
+        assert self.simulation.step == 4
+
+    def test_car_hit_after_its_turn_leaves_active_cars(self):
+        """Test that a car collided by a higher index car is dropped at the end of the step."""
+        car1 = Car(name="Car1", position=(0, 0), orientation='E', instructions="LFFF")
+        car2 = Car(name="Car2", position=(1, 1), orientation='S', instructions="RF")
+        self.simulation.add_car(car1)
+        self.simulation.add_car(car2)
+
+        self.simulation.run_simulation()
+
+        assert car1.collision is car2
+        assert car2.collision is car1
+        assert car1.collision_step == 2
+        assert car1.instructions == "FF"
+        assert self.simulation.step == 2
+        assert self.simulation.active_cars == []
+
+
+class TestSimulationFastForward:
+    """Test Module for fast forwarding the last active car."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup a simulation instance for testing."""
+        self.simulation = Simulation(field_size=(100, 100))
+
+    def test_lone_car_skips_runs(self, mocker):
+        """Test that a lone car jumps over runs without executing single commands."""
+        car = Car(name="Car1", position=(0, 0), orientation='N', instructions="F50R(LR)1000F30")
+        self.simulation.add_car(car)
+
+        spy = mocker.spy(self.simulation, 'execute_instructions')
+        self.simulation.run_simulation()
+
+        assert spy.call_count == 0
+        assert car.position == (30, 50)
+        assert car.orientation == 'E'
+        assert car.instructions == ""
+        assert self.simulation.step == 50 + 1 + 2000 + 30
+        assert self.simulation.cars_in_field[(30, 50)] is car
+
+    def test_lone_car_pushes_against_boundary(self):
+        """Test that moves beyond the boundary are ignored while the steps still count."""
+        car = Car(name="Car1", position=(0, 95), orientation='N', instructions="F20L")
+        self.simulation.add_car(car)
+
+        self.simulation.run_simulation()
+
+        assert car.position == (0, 99)
+        assert car.orientation == 'W'
+        assert self.simulation.step == 21
+
+    def test_lone_car_collides_with_parked_car(self):
+        """Test that a lone car stops at the first parked car on its way."""
+        car = Car(name="Car1", position=(5, 0), orientation='N', instructions="F100")
+        parked_far = Car(name="Car2", position=(5, 60), orientation='E', instructions="")
+        parked_near = Car(name="Car3", position=(5, 40), orientation='E', instructions="")
+        parked_aside = Car(name="Car4", position=(6, 20), orientation='E', instructions="")
+        for added in (car, parked_far, parked_near, parked_aside):
+            self.simulation.add_car(added)
+
+        self.simulation.run_simulation()
+
+        assert car.collision is parked_near
+        assert parked_near.collision is car
+        assert car.position == (5, 40)
+        assert car.collision_step == 40
+        assert car.instructions == "F" * 60
+        assert self.simulation.step == 40
+
+    def test_last_car_fast_forwards_after_others_finish(self):
+        """Test that fast forwarding starts once the other cars are done."""
+        car1 = Car(name="Car1", position=(0, 0), orientation='E', instructions="FF")
+        car2 = Car(name="Car2", position=(0, 5), orientation='E', instructions="F10LF10")
+        self.simulation.add_car(car1)
+        self.simulation.add_car(car2)
+
+        self.simulation.run_simulation()
+
+        assert car1.position == (2, 0)
+        assert car2.position == (10, 15)
+        assert self.simulation.step == 21
+
+    @pytest.mark.parametrize("seed", range(100))
+    def test_matches_stepwise_simulation(self, seed):
+        """Test that fast forwarding gives the same results as stepping through every command."""
+        import random
+        from src.vectorized import VectorizedSimulation
+
+        rng = random.Random(seed)
+        width, height = rng.randint(2, 12), rng.randint(2, 12)
+        cells = rng.sample([(x, y) for x in range(width) for y in range(height)], min(width * height, rng.randint(2, 8)))
+        cars = [(f"Car{car_index}", cell, rng.choice('NESW'), "") for car_index, cell in enumerate(cells)]
+        # A few short programs, then one long program that outlives them
+        for car_index in range(min(2, len(cars) - 1)):
+            cars[car_index] = cars[car_index][:3] + (''.join(rng.choice('FLR') for _ in range(rng.randint(0, 5))),)
+        cars[-1] = cars[-1][:3] + (''.join(rng.choice('FFFFLRR') for _ in range(rng.randint(10, 60))),)
+
+        results = []
+        for simulation_class in (Simulation, VectorizedSimulation):
+            simulation = simulation_class(field_size=(width, height))
+            for name, position, orientation, instructions in cars:
+                simulation.add_car(Car(name=name, position=position, orientation=orientation, instructions=instructions))
+            simulation.run_simulation()
+            results.append(([repr(car) for car in simulation.cars.values()], simulation.step))
+
+        assert results[0] == results[1]
+
+
+class TestSimulationRotationTails:
+    """Test Module for finishing the run once only rotations are left."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup a simulation instance for testing."""
+        self.simulation = Simulation(field_size=(10, 10))
+
+    def test_rotation_tails_finish_at_once(self, mocker):
+        """Test that programs ending in long runs of rotations are finished without stepping through them."""
+        car1 = Car(name="Car1", position=(0, 0), orientation='N', instructions="FFR(LLR)300")
+        car2 = Car(name="Car2", position=(5, 5), orientation='E', instructions="FLL(RRL)100R")
+        self.simulation.add_car(car1)
+        self.simulation.add_car(car2)
+
+        spy = mocker.spy(self.simulation, 'run_step')
+        self.simulation.run_simulation()
+
+        assert spy.call_count == 2
+        assert (car1.position, car1.orientation) == ((0, 2), 'E')
+        assert (car2.position, car2.orientation) == ((6, 5), 'N')
+        assert not car1.has_instructions() and not car2.has_instructions()
+        assert self.simulation.step == 3 + 900
+        assert self.simulation.active_cars == []
+
+    def test_compiled_tails_use_the_folded_turns(self, mocker):
+        """Test that cars with compiled programs take the net turn of their tail from the compiled runs."""
+        car1 = Car(name="Car1", position=(0, 0), orientation='N', instructions="FFR(LLR)300")
+        car2 = Car(name="Car2", position=(5, 5), orientation='E', instructions="FLL(RRL)100R")
+        for car in (car1, car2):
+            car.compiled_program()
+            self.simulation.add_car(car)
+
+        spy = mocker.spy(CompiledProgram, 'turn_after')
+        self.simulation.run_simulation()
+
+        assert spy.call_count == 2
+        assert (car1.position, car1.orientation) == ((0, 2), 'E')
+        assert (car2.position, car2.orientation) == ((6, 5), 'N')
+        assert self.simulation.step == 3 + 900
+
+    def test_waits_for_the_last_move(self):
+        """Test that rotating cars keep stepping while another car still has moves that could hit them."""
+        rotating = Car(name="Rotating", position=(0, 3), orientation='N', instructions="L" * 10)
+        moving = Car(name="Moving", position=(0, 0), orientation='N', instructions="FFFF")
+        self.simulation.add_car(rotating)
+        self.simulation.add_car(moving)
+
+        self.simulation.run_simulation()
+
+        assert rotating.collision is moving
+        assert rotating.collision_step == 3
+        assert rotating.orientation == 'E'
+
+    def test_collided_car_does_not_hold_up_the_finish(self, mocker):
+        """Test that a car with moves left stops counting once it collides."""
+        self.simulation.add_car(Car(name="Parked", position=(0, 2), orientation='N', instructions=""))
+        self.simulation.add_car(Car(name="Blocked", position=(0, 0), orientation='N', instructions="F" * 50))
+        self.simulation.add_car(Car(name="Turning", position=(5, 5), orientation='N', instructions="F" + "R" * 99))
+        self.simulation.add_car(Car(name="Spinning", position=(7, 7), orientation='N', instructions="L" * 99))
+
+        spy = mocker.spy(self.simulation, 'run_step')
+        self.simulation.run_simulation()
+
+        assert spy.call_count == 2
+        assert self.simulation.cars[1].collision_step == 2
+        assert self.simulation.cars[2].orientation == 'W'
+        assert self.simulation.step == 100
+
+    @pytest.mark.parametrize("seed", range(30))
+    def test_matches_stepping(self, seed):
+        """Test that random programs with rotation tails end like stepping through every command."""
+        rng = random.Random(seed)
+        cars = [
+            (f"Car{car_index}", (x, y), rng.choice('NESW'),
+             ''.join(rng.choices('FLR', k=rng.randint(0, 8))) + ''.join(rng.choices('LR', k=rng.randint(0, 40))))
+            for car_index, (x, y) in enumerate(rng.sample([(x, y) for x in range(8) for y in range(8)], 12))
+        ]
+
+        results = []
+        for drive in (lambda simulation: simulation.run_simulation(), lambda simulation: simulation.run_steps(1000)):
+            simulation = Simulation(field_size=(8, 8))
+            for name, position, orientation, instructions in cars:
+                simulation.add_car(Car(name=name, position=position, orientation=orientation, instructions=instructions))
+            drive(simulation)
+            results.append(([repr(car) for car in simulation.cars.values()], simulation.step))
+
+        assert results[0] == results[1]
+
+
+class TestSimulationCycles:
+    """Test Module for skipping the cycles of cars that repeat a block of commands."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup a simulation instance for testing."""
+        self.simulation = Simulation(field_size=(20, 20))
+
+    def test_patrol_loops_are_skipped(self, mocker):
+        """Test that cars going around loops far from each other skip to the end of their repeats."""
+        patrol1 = Car(name="Patrol1", position=(0, 0), orientation='N', instructions="(FFR)801F")
+        patrol2 = Car(name="Patrol2", position=(10, 10), orientation='E', instructions="(FFFFL)1000")
+        self.simulation.add_car(patrol1)
+        self.simulation.add_car(patrol2)
+
+        spy = mocker.spy(self.simulation, 'run_step')
+        self.simulation.run_simulation()
+
+        assert spy.call_count == 1  # The last move of Patrol1, while Patrol2 is still suspended
+        assert (patrol1.position, patrol1.orientation) == ((1, 2), 'E')
+        assert (patrol2.position, patrol2.orientation) == ((10, 10), 'E')
+        assert self.simulation.step == 5000
+        assert not patrol1.has_instructions() and not patrol2.has_instructions()
+
+    def test_car_pushing_against_the_boundary(self, mocker):
+        """Test that a car stuck against the boundary skips the moves it cannot make, next to a car that steps."""
+        pinned = Car(name="Pinned", position=(0, 19), orientation='N', instructions="F" * 1000 + "RF")
+        driver = Car(name="Driver", position=(19, 0), orientation='N', instructions="FLFRF")
+        self.simulation.add_car(pinned)
+        self.simulation.add_car(driver)
+
+        spy = mocker.spy(self.simulation, 'suspend')
+        self.simulation.run_simulation()
+
+        assert spy.call_count == 1
+        assert (pinned.position, pinned.orientation) == ((1, 19), 'E')
+        assert driver.position == (18, 2)
+        assert self.simulation.step == 1002
+
+    def test_straight_runs_are_skipped(self, mocker):
+        """Test that several cars on long runs of moves jump along their segments, up to the boundary."""
+        simulation = Simulation(field_size=(1000, 10))
+        east = Car(name="East", position=(0, 0), orientation='E', instructions="F1500L")
+        west = Car(name="West", position=(999, 9), orientation='W', instructions="F600R")
+        simulation.add_car(east)
+        simulation.add_car(west)
+
+        spy = mocker.spy(simulation, 'run_step')
+        simulation.run_simulation()
+
+        assert spy.call_count == 1  # The last turn of West, while East is still suspended
+        assert (east.position, east.orientation) == ((999, 0), 'N')
+        assert (west.position, west.orientation) == ((399, 9), 'N')
+        assert simulation.step == 1501
+
+    def test_straight_run_stops_in_front_of_a_parked_car(self, mocker):
+        """Test that a segment ends in front of a parked car, which the car then drives into."""
+        simulation = Simulation(field_size=(1000, 1000))
+        driver = Car(name="Driver", position=(0, 0), orientation='E', instructions="F1000")
+        parked = Car(name="Parked", position=(700, 0), orientation='N', instructions="")
+        other = Car(name="Other", position=(0, 999), orientation='E', instructions="F1000")
+        for car in (driver, parked, other):
+            simulation.add_car(car)
+
+        spy = mocker.spy(simulation, 'suspend')
+        simulation.run_simulation()
+
+        assert spy.call_count == 2
+        assert driver.collision is parked
+        assert driver.position == (700, 0)
+        assert driver.collision_step == 700
+        assert other.position == (999, 999)
+
+    def test_segment_finds_the_car_ahead_without_looking_at_every_cell(self, mocker):
+        """Test that the car ahead of a segment is found from the rows and columns of the cars, so a long segment costs
+        no more than a short one.
+        """
+        simulation = Simulation(field_size=(10 ** 6, 10))
+        driver = Car(name="Driver", position=(0, 0), orientation='E', instructions="F" * 900000)
+        parked = Car(name="Parked", position=(800000, 0), orientation='N', instructions="")
+        simulation.add_car(driver)
+        simulation.add_car(parked)
+
+        spy = mocker.spy(simulation.cars_in_field, 'occupant')
+        cycle = simulation.find_segment(0)
+
+        assert spy.call_count == 1
+        assert cycle.state == (799999, 0, 1)
+        assert cycle.box == (0, 0, 799999, 0)
+
+    def test_dense_straight_runs_are_not_slower_than_stepping(self):
+        """Test that on a crowded field, where most segments cannot be skipped, checking them does not make the
+        simulation slower than stepping.
+        """
+        spec = next(spec for spec in FULL_SUITE if spec.name == "forward-only")
+        cars = generate_cars(spec)
+
+        results, timings = [], []
+        for min_skip in (Simulation.CYCLE_MIN_SKIP, 1 << 62):
+            simulation = Simulation(field_size=spec.field_size)
+            simulation.CYCLE_MIN_SKIP = min_skip
+            for name, position, orientation, instructions in cars:
+                simulation.add_car(Car(name=name, position=position, orientation=orientation, instructions=instructions))
+            start = time.perf_counter()
+            simulation.run_simulation()
+            timings.append(time.perf_counter() - start)
+            results.append(([repr(car) for car in simulation.cars.values()], simulation.step))
+
+        assert results[0] == results[1]
+        assert timings[0] < timings[1] * 1.25  # Leeway for timer noise, as both take about as long
+
+    def test_reachable_cycle_keeps_stepping(self):
+        """Test that a car that could drive into a loop stops the loop from being skipped, and hits the looping car."""
+        looping = Car(name="Looping", position=(0, 0), orientation='N', instructions="(FR)400")
+        driver = Car(name="Driver", position=(5, 1), orientation='W', instructions="F" * 10)
+        self.simulation.add_car(looping)
+        self.simulation.add_car(driver)
+
+        self.simulation.run_simulation()
+
+        assert driver.collision is looping
+        assert driver.position == (1, 1)
+        assert driver.collision_step == 4
+
+    def test_recording_does_not_skip(self, mocker):
+        """Test that every command of a cycle is executed while a recorder is attached."""
+        self.simulation.add_car(Car(name="Patrol1", position=(0, 0), orientation='N', instructions="(FFR)100"))
+        self.simulation.add_car(Car(name="Patrol2", position=(10, 10), orientation='N', instructions="(FFR)100"))
+        self.simulation.enable_recording()
+
+        spy = mocker.spy(self.simulation, 'suspend')
+        self.simulation.run_simulation()
+
+        assert spy.call_count == 0
+        assert self.simulation.step == 300
+
+    @pytest.mark.parametrize("seed", range(30))
+    def test_matches_stepping(self, seed):
+        """Test that random programs repeating blocks end like stepping through every command."""
+        rng = random.Random(seed)
+        size = (rng.randint(5, 40), rng.randint(5, 40))
+        cars = []
+        for car_index, (x, y) in enumerate(rng.sample([(x, y) for x in range(size[0]) for y in range(size[1])], rng.randint(2, 8))):
+            block = ''.join(rng.choices('FFLR', k=rng.randint(1, 6)))
+            instructions = ''.join(rng.choices('FLR', k=rng.randint(0, 10))) + block * rng.randint(1, 300) + ''.join(rng.choices('FLR', k=rng.randint(0, 10)))
+            cars.append((f"Car{car_index}", (x, y), rng.choice('NESW'), instructions))
+
+        results = []
+        for drive in (lambda simulation: simulation.run_simulation(), lambda simulation: simulation.run_steps(10000)):
+            simulation = Simulation(field_size=size)
+            for name, position, orientation, instructions in cars:
+                simulation.add_car(Car(name=name, position=position, orientation=orientation, instructions=instructions))
+            drive(simulation)
+            results.append(([repr(car) for car in simulation.cars.values()], simulation.step))
+
+        assert results[0] == results[1]
+
+
+    def test_many_cycling_cars_beat_stepping(self, mocker):
+        """Test that skipping the cycles of hundreds of patrolling cars takes less time than stepping through them."""
+        rng = random.Random(0)
+        cells = rng.sample(range(1000 * 1000), 400)
+        cars = [(f"Car{car_index}", (cell % 1000, cell // 1000), rng.choice('NESW'), "FFRFFRFFRFFR" * 100)
+                for car_index, cell in enumerate(cells)]
+
+        results, timings, suspended = [], [], []
+        for drive in (lambda simulation: simulation.run_simulation(), lambda simulation: simulation.run_steps(10000)):
+            simulation = Simulation(field_size=(1000, 1000))
+            for name, position, orientation, instructions in cars:
+                simulation.add_car(Car(name=name, position=position, orientation=orientation, instructions=instructions))
+            suspended.append(mocker.spy(simulation, 'suspend'))
+            start = time.perf_counter()
+            drive(simulation)
+            timings.append(time.perf_counter() - start)
+            results.append(([repr(car) for car in simulation.cars.values()], simulation.step))
+
+        assert results[0] == results[1]
+        assert suspended[0].call_count >= 390 and suspended[1].call_count == 0
+        assert timings[0] < timings[1]
+
+    def test_long_straight_runs_beat_stepping(self):
+        """Test that skipping the straight runs of cars spread over a huge field takes less time than stepping, with
+        the boxes of suspended cars kept across checks instead of indexed again every round.
+        """
+        rng = random.Random(0)
+        cars = [(f"Car{car_index}", (rng.randrange(10 ** 6), rng.randrange(10 ** 6)), rng.choice('NESW'),
+                 ''.join('F' * rng.randint(500, 5000) + rng.choice('LR') for _ in range(4)))
+                for car_index in range(40)]
+
+        results, timings = [], []
+        for min_skip in (Simulation.CYCLE_MIN_SKIP, 1 << 62):
+            simulation = Simulation(field_size=(10 ** 6, 10 ** 6))
+            simulation.CYCLE_MIN_SKIP = min_skip
+            for name, position, orientation, instructions in cars:
+                simulation.add_car(Car(name=name, position=position, orientation=orientation, instructions=instructions))
+            start = time.perf_counter()
+            simulation.run_simulation()
+            timings.append(time.perf_counter() - start)
+            results.append(([repr(car) for car in simulation.cars.values()], simulation.step))
+            assert not simulation.confined and not simulation.confined_boxes
+
+        assert results[0] == results[1]
+        assert timings[0] < timings[1]
+
+    def test_round_of_checks_is_capped(self):
+        """Test that once the cycles found in a round cover CYCLE_ROUND_TILES tiles, the other cars are checked later."""
+        simulation = Simulation(field_size=(10000, 1000))
+        simulation.CYCLE_ROUND_TILES = 4
+        for car_index in range(4):
+            simulation.add_car(Car(name=f"Car{car_index}", position=(car_index * 3000, 0), orientation='N', instructions="F" * 500))
+        simulation.refresh_active_cars()
+        checks = [(0, car_index, simulation.CYCLE_CHECK_INTERVAL) for car_index in range(4)]
+
+        # Each segment covers two tiles of the confined index
+        simulation.check_cycles(checks, {car_index: 500 for car_index in range(4)})
+
+        assert sorted(car_index for _, car_index, _ in simulation.suspended_cars) == [0, 1]
+        assert sorted(simulation.confined_boxes) == [0, 1]
+        assert sorted(checks) == [(1, 2, 64), (1, 3, 64)]
+
+
+class TestSimulationIncrementalStepping:
+    """Test Module for stepping a simulation incrementally."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup the example scenario with two colliding cars and a parked car."""
+        self.simulation = Simulation(field_size=(10, 10))
+        self.car_a = Car(name="A", position=(1, 2), orientation='N', instructions="FFRFFFFRRL")
+        self.car_b = Car(name="B", position=(7, 8), orientation='W', instructions="FFLFFFFFFF")
+        self.parked = Car(name="P", position=(9, 9), orientation='N', instructions="")
+        for car in (self.car_a, self.car_b, self.parked):
+            self.simulation.add_car(car)
+
+    def test_step_once(self):
+        """Test that a single step reports the cars that moved and rotated."""
+        delta = self.simulation.step_once()
+
+        assert delta == (1, [0, 1], [], [])
+        assert self.simulation.step == 1
+        assert self.car_a.position == (1, 3)
+        assert self.car_b.position == (6, 8)
+
+        assert self.simulation.step_once() == (2, [0, 1], [], [])
+        assert self.simulation.step_once() == (3, [], [0, 1], [])
+
+    def test_iter_steps(self):
+        """Test that iterating over the steps reports the collision and stops when every car is done."""
+        deltas = list(self.simulation.iter_steps())
+
+        assert [delta.step for delta in deltas] == list(range(1, 8))
+        assert deltas[-1] == (7, [0, 1], [], [0, 1])
+        assert self.car_a.collision is self.car_b
+        assert self.simulation.step_once() is None
+
+    def test_hit_car_is_reported(self):
+        """Test that a car hit while standing still is reported as collided."""
+        simulation = Simulation(field_size=(10, 10))
+        simulation.add_car(Car(name="A", position=(0, 0), orientation='N', instructions=""))
+        simulation.add_car(Car(name="B", position=(0, 1), orientation='S', instructions="F"))
+
+        assert simulation.step_once() == (1, [1], [], [0, 1])
+
+    def test_run_steps(self):
+        """Test running a bounded number of steps."""
+        assert self.simulation.run_steps(4) == 4
+        assert self.simulation.step == 4
+        assert self.car_a.position == (2, 4)
+
+        assert self.simulation.run_steps(100) == 3
+        assert self.simulation.step == 7
+        assert self.simulation.run_steps(5) == 0
+
+    def test_run_steps_invalid(self):
+        """Test that the number of steps cannot be negative."""
+        with pytest.raises(ValueError, match="Steps must be a non-negative integer."):
+            self.simulation.run_steps(-1)
+
+    def test_run_until_predicate(self):
+        """Test stopping as soon as a predicate holds."""
+        assert self.simulation.run_until(lambda simulation: simulation.cars[0].x == 3)
+        assert self.simulation.step == 5
+        assert self.car_a.position == (3, 4)
+
+    def test_run_until_max_steps(self):
+        """Test that run_until gives up after max_steps steps or when the simulation finishes."""
+        assert not self.simulation.run_until(lambda simulation: False, max_steps=2)
+        assert self.simulation.step == 2
+
+        assert not self.simulation.run_until(lambda simulation: False)
+        assert self.simulation.step == 7
+
+    def test_run_until_finished(self):
+        """Test that run_until without a predicate reports whether the simulation finished."""
+        assert not self.simulation.run_until(max_steps=6)
+        assert self.simulation.run_until(max_steps=6)
+        assert self.simulation.step == 7
+
+    def test_run_until_needs_a_bound(self):
+        """Test that run_until needs a predicate or a number of steps."""
+        with pytest.raises(ValueError, match="Run until needs a predicate or a maximum number of steps."):
+            self.simulation.run_until()
+
+    def test_add_car_between_steps(self):
+        """Test that a car added between steps takes part from the next step."""
+        self.simulation.run_steps(2)
+        late = Car(name="Late", position=(0, 0), orientation='E', instructions="FF")
+        self.simulation.add_car(late)
+
+        self.simulation.run_steps(2)
+
+        assert late.position == (2, 0)
+
+    @pytest.mark.parametrize("seed", range(50))
+    def test_matches_run_simulation(self, seed):
+        """Test that stepping in slices and then finishing with run_simulation gives the same result as one run."""
+        field_size, cars = build_scenario(seed)
+        expected = run(Simulation, field_size, cars)
+        simulation = Simulation(field_size=field_size)
+        for name, position, orientation, instructions in cars:
+            simulation.add_car(Car(name=name, position=position, orientation=orientation, instructions=instructions))
+        simulation.run_steps(seed % 5)
+        for _ in zip(range(3), simulation.iter_steps()):
+            pass
+        simulation.run_simulation()
+
+        assert snapshot(simulation) == snapshot(expected)
+        assert occupancy_snapshot(simulation) == occupancy_snapshot(expected)
+        assert simulation.step == expected.step
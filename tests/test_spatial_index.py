@@ -0,0 +1,131 @@
+import random
+
+import pytest
+from src.car import Car
+from src.spatial_index import SpatialIndex, box_distance
+
+
+class TestSpatialIndex:
+    """Test Module for SpatialIndex Class."""
+
+    def test_invalid_tile_size(self):
+        """Test that the tile size must be a positive integer."""
+        with pytest.raises(ValueError, match="Tile size must be a positive integer."):
+            SpatialIndex(tile_size=0)
+
+    def test_query_points(self):
+        """Test finding points inside a box across tiles."""
+        index = SpatialIndex(tile_size=4)
+        index.add_point("A", 1, 1)
+        index.add_point("B", 5, 5)
+        index.add_point("C", 20, 3)
+
+        assert index.query(0, 0, 5, 5) == {"A", "B"}
+        assert index.query(2, 2, 3, 3) == set()
+        assert index.query(20, 3, 20, 3) == {"C"}
+
+    def test_query_lines(self):
+        """Test that a line spanning several tiles is found from any of them, once."""
+        index = SpatialIndex(tile_size=4)
+        index.add("A", 0, 2, 15, 2)
+        index.add("A", 15, 2, 15, 9)
+
+        assert index.query(7, 0, 7, 10) == {"A"}
+        assert index.query(15, 8, 15, 8) == {"A"}
+        assert index.query(0, 3, 14, 9) == set()
+
+    def test_discard(self):
+        """Test removing a key and adding it again at a new cell."""
+        index = SpatialIndex(tile_size=4)
+        index.add("A", 0, 0, 10, 0)
+        index.discard("A")
+        index.add_point("A", 30, 30)
+
+        assert index.query(0, 0, 10, 0) == set()
+        assert index.query(30, 30, 30, 30) == {"A"}
+        assert len(index.tiles) == 1
+
+        index.discard("A")
+        index.discard("A")
+
+        assert "A" not in index
+        assert len(index) == 0
+        assert not index.tiles
+
+    def test_negative_coordinates(self):
+        """Test that boxes reaching past the field origin are tiled consistently."""
+        index = SpatialIndex(tile_size=4)
+        index.add_point("A", 0, 0)
+
+        assert index.query(-3, -3, 0, 0) == {"A"}
+        assert index.reachable(-1, -1, -1, -1, 2) == {"A"}
+
+    def test_reachable(self):
+        """Test that only cars within the number of steps in Manhattan distance are returned."""
+        index = SpatialIndex.from_cars({
+            0: Car(name="A", position=(3, 3), orientation='N', instructions=""),
+            1: Car(name="B", position=(6, 3), orientation='N', instructions=""),
+            2: Car(name="C", position=(5, 5), orientation='N', instructions=""),
+        }, tile_size=2)
+
+        assert index.reachable(3, 3, 3, 3, 0) == {0}
+        assert index.reachable(4, 3, 4, 3, 2) == {0, 1}
+        assert index.reachable(4, 3, 4, 3, 3) == {0, 1, 2}
+        assert index.reachable(0, 0, 0, 0, 5) == set()
+        assert index.reachable(0, 0, 0, 0, 6) == {0}
+
+    def test_large_field(self):
+        """Test coordinates of a 10^6 x 10^6 field without allocating tiles for empty space."""
+        index = SpatialIndex()
+        index.add_point("A", 999999, 999999)
+        index.add_point("B", 0, 999999)
+
+        assert index.reachable(999990, 999999, 999990, 999999, 9) == {"A"}
+        assert len(index.tiles) == 2
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_matches_brute_force(self, seed):
+        """Test random reachability queries against checking every point."""
+        rng = random.Random(seed)
+        points = {key: (rng.randrange(100), rng.randrange(100)) for key in range(50)}
+        index = SpatialIndex(tile_size=rng.randint(1, 20))
+        for key, (x, y) in points.items():
+            index.add_point(key, x, y)
+
+        for _ in range(20):
+            x, y, steps = rng.randrange(100), rng.randrange(100), rng.randrange(30)
+            expected = {key for key, (px, py) in points.items() if abs(px - x) + abs(py - y) <= steps}
+            assert index.reachable(x, y, x, y, steps) == expected
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_reachable_boxes_match_brute_force(self, seed):
+        """Test random reachability queries from boxes to boxes against checking every box."""
+        rng = random.Random(seed)
+        index = SpatialIndex(tile_size=rng.randint(1, 20))
+        boxes = {}
+        for key in range(30):
+            x, y = rng.randrange(100), rng.randrange(100)
+            boxes[key] = (x, y, x + rng.randrange(10), y + rng.randrange(10))
+            index.add(key, *boxes[key])
+
+        for _ in range(20):
+            x, y, steps = rng.randrange(100), rng.randrange(100), rng.randrange(30)
+            query_box = (x, y, x + rng.randrange(10), y + rng.randrange(10))
+            expected = {key for key, box in boxes.items() if box_distance(box, query_box) <= steps}
+            assert index.reachable(*query_box, steps) == expected
+
+    def test_box_distance(self):
+        """Test the number of steps between two boxes."""
+        assert box_distance((0, 0, 2, 2), (1, 1, 5, 5)) == 0
+        assert box_distance((0, 0, 2, 2), (4, 1, 5, 5)) == 2
+        assert box_distance((0, 0, 2, 2), (4, 6, 5, 7)) == 6
+        assert box_distance((4, 6, 5, 7), (0, 0, 2, 2)) == 6
+
+    def test_query_larger_than_stored_tiles(self):
+        """Test that a query covering far more tiles than are stored goes through the stored tiles."""
+        index = SpatialIndex(tile_size=1)
+        index.add_point("A", 5, 5)
+        index.add_point("B", 999999, 999999)
+
+        assert index.query(0, 0, 999998, 999998) == {"A"}
+        assert index.reachable(0, 0, 0, 0, 2 * 999999) == {"A", "B"}
@@ -0,0 +1,68 @@
+import pytest
+from src.simulation import Simulation
+from src.vectorized import VectorizedSimulation
+from tests.helpers import build_scenario, occupancy_snapshot, run, snapshot
+
+
+class TestVectorizedSimulation:
+    """Test Module for VectorizedSimulation Class."""
+
+    def test_run_simulation_single_car(self):
+        """Test running the example scenario with a single car."""
+        simulation = run(VectorizedSimulation, (10, 10), [("A", (1, 2), 'N', "FFRFFFFRRL")])
+        car = simulation.cars[0]
+
+        assert car.position == (5, 4)
+        assert car.orientation == 'S'
+        assert car.instructions == ""
+        assert repr(car) == "A, (5, 4) S"
+        assert simulation.step == 10
+
+    def test_run_simulation_collision(self):
+        """Test the example scenario with two colliding cars."""
+        simulation = run(VectorizedSimulation, (10, 10), [
+            ("A", (1, 2), 'N', "FFRFFFFRRL"),
+            ("B", (7, 8), 'W', "FFLFFFFFFF"),
+        ])
+        car_a, car_b = simulation.cars[0], simulation.cars[1]
+
+        assert car_a.collision is car_b
+        assert car_b.collision is car_a
+        assert car_a.position == car_b.position == (5, 4)
+        assert car_a.collision_step == car_b.collision_step == 7
+        assert simulation.cars_in_field[(5, 4)] == [car_b, car_a]
+
+    def test_hit_car_skips_its_command(self):
+        """Test that a car hit before its turn in a step does not execute its command."""
+        simulation = run(VectorizedSimulation, (10, 10), [
+            ("A", (0, 0), 'N', "F"),
+            ("B", (0, 1), 'E', "LF"),
+        ])
+        car_b = simulation.cars[1]
+
+        assert car_b.collision_step == 1
+        assert car_b.orientation == 'E'
+        assert car_b.instructions == "LF"
+
+    def test_blocked_car_keeps_its_cell(self):
+        """Test that a car pushing against the boundary can still be hit."""
+        simulation = run(VectorizedSimulation, (3, 3), [
+            ("A", (0, 2), 'N', "FF"),
+            ("B", (0, 0), 'N', "FF"),
+        ])
+
+        assert simulation.cars[0].collision is simulation.cars[1]
+        assert simulation.cars[1].collision_step == 2
+
+    @pytest.mark.parametrize("seed", range(300))
+    def test_matches_simulation(self, seed):
+        """Test that random scenarios produce the same final state as Simulation."""
+        field_size, cars = build_scenario(seed)
+
+        expected = run(Simulation, field_size, cars)
+
+        actual = run(VectorizedSimulation, field_size, cars)
+
+        assert snapshot(actual) == snapshot(expected)
+        assert occupancy_snapshot(actual) == occupancy_snapshot(expected)
+        assert actual.step == expected.step